@@ -0,0 +1,191 @@
+"""
+Image files referenced by the generated pages.
+
+Exported images are laid out as ``<dir>/<asset kind>/<game id>.png``, eg.
+``unit_icon/HG_0000000.png`` or ``equip_icon/EQ_DUAL_SABER_000000.png``, and
+are mapped to the file names the page templates link, like
+``GB4_Icon_Unit_Gundam_Exia.png``. Files already named like on the wiki are
+taken as they are. The SHA-1 of the files on the wiki is read in batches, so
+only new and changed files are uploaded.
+"""
+import hashlib
+import logging
+from pathlib import Path
+from typing import NamedTuple
+
+from gb4_wiki_gen.generator.equip_page import collect_equipment
+from gb4_wiki_gen.pages import select_suit_ids
+from gb4_wiki_gen.utils import slugify
+
+log = logging.getLogger(__name__)
+
+# titles per prop=imageinfo request, the API limit for content queries
+IMAGEINFO_BATCH = 50
+# from this many files on, listing every image with list=allimages takes
+# fewer requests than asking for each file
+ALLIMAGES_THRESHOLD = 500
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def unit_icon_name(name):
+    return f"GB4_Icon_Unit_{slugify(name)}.png"
+
+
+def unit_main_name(name):
+    return f"GB4_{slugify(name)}_Main.png"
+
+
+def equip_icon_name(name):
+    return f"GB4_Icon_Equip_{slugify(name)}.png"
+
+
+def series_icon_name(name):
+    return f"GB4_Icon_Series_{slugify(name)}.png"
+
+
+def file_key(name) -> str:
+    """
+    file name as MediaWiki normalizes it, spaces for underscores and the
+    first letter in upper case
+    """
+    name = name.replace("_", " ").strip()
+    return name[:1].upper() + name[1:]
+
+
+def expected_files(registry) -> dict:
+    """
+    wiki file names by game id per asset kind, as linked by the pages
+    """
+    mslist = registry["MSList"]
+    unit_icon = {}
+    unit_main = {}
+    for suit_id in select_suit_ids(registry, ["all"]):
+        if suit_id not in registry.validity.suits:
+            continue
+        suit = mslist[suit_id]
+        name = suit.ms_name_localized._text
+        for id in (suit.id, suit.gradeless_id):
+            unit_icon[id] = unit_icon_name(name)
+            unit_main[id] = unit_main_name(name)
+
+    equip_icon = {}
+    for key, entry in collect_equipment(registry).items():
+        equip = entry["equip"]
+        if equip.id not in registry.validity.equipment:
+            continue
+        name = equip_icon_name(equip.name_localized)
+        equip_icon[key] = name
+        equip_icon[equip.id] = name
+
+    series_icon = {
+        item.id: series_icon_name(item._text)
+        for item in registry["localized_text_gundam_series"]
+    }
+    return {
+        "unit_icon": unit_icon,
+        "unit_main": unit_main,
+        "equip_icon": equip_icon,
+        "series_icon": series_icon,
+    }
+
+
+class AssetMap(NamedTuple):
+    # local path by wiki file name
+    files: dict
+    # local images matching no expected file
+    unmapped: list
+    # expected file names without a local image
+    missing: list
+
+
+def map_assets(image_dir, expected) -> AssetMap:
+    """
+    match the images below `image_dir` with the `expected` files
+    """
+    names = {
+        file_key(name): name
+        for by_id in expected.values()
+        for name in by_id.values()
+    }
+    files = {}
+    unmapped = []
+    for path in sorted(Path(image_dir).rglob("*")):
+        if path.suffix.lower() not in IMAGE_SUFFIXES or not path.is_file():
+            continue
+        kind = path.parent.name
+        name = expected.get(kind, {}).get(path.stem)
+        if name is None:
+            name = names.get(file_key(path.name))
+        if name is None:
+            unmapped.append(path)
+            continue
+        if name in files:
+            log.debug(f"{path} is also mapped to {name}, keeping {files[name]}")
+            continue
+        files[name] = path
+    missing = sorted(set(names.values()) - files.keys())
+    return AssetMap(files, unmapped, missing)
+
+
+def file_sha1(path) -> str:
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as fp:
+        while chunk := fp.read(2 ** 16):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def remote_sha1s(client, names) -> dict:
+    """
+    sha1 of the current version of the files `names` on the wiki by
+    ``file_key``, files missing on the wiki are left out
+    """
+    keys = {file_key(it) for it in names}
+    sha1s = {}
+    if len(keys) >= ALLIMAGES_THRESHOLD:
+        params = {"list": "allimages", "aiprop": "sha1", "ailimit": "max"}
+        for response_data in client.query(params):
+            for image in response_data["query"]["allimages"]:
+                key = file_key(image["name"])
+                if key in keys:
+                    sha1s[key] = image["sha1"]
+        return sha1s
+
+    keys = sorted(keys)
+    for start in range(0, len(keys), IMAGEINFO_BATCH):
+        params = {
+            "prop": "imageinfo",
+            "iiprop": "sha1",
+            "titles": "|".join(f"File:{it}" for it in keys[start:start + IMAGEINFO_BATCH]),
+        }
+        for response_data in client.query(params):
+            for page in response_data["query"]["pages"]:
+                # files of a shared repository are "missing" locally but
+                # have imageinfo, uploading would shadow them
+                if not page.get("imageinfo"):
+                    continue
+                sha1s[file_key(page["title"].split(":", 1)[1])] = page["imageinfo"][0]["sha1"]
+    return sha1s
+
+
+class AssetStatus(NamedTuple):
+    new: list
+    changed: list
+    unchanged: list
+
+
+def compare_assets(files, sha1s) -> AssetStatus:
+    """
+    compare the local `files` by wiki name with the `sha1s` of
+    ``remote_sha1s``, hashing every local file
+    """
+    status = AssetStatus([], [], [])
+    for name, path in files.items():
+        remote = sha1s.get(file_key(name))
+        if remote is None:
+            status.new.append(name)
+        elif remote == file_sha1(path):
+            status.unchanged.append(name)
+        else:
+            status.changed.append(name)
+    return status
@@ -0,0 +1,320 @@
+"""
+Benchmark suite for loading, index building and page rendering.
+
+Runs against synthetic exports (see ``gb4_wiki_gen.synthetic``) at several
+scales and stores results as JSON, one file per run, so runs of different
+commits can be compared with ``benchmark compare``.
+"""
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import click
+
+from gb4_wiki_gen import synthetic
+from gb4_wiki_gen.database import data_sources, load_data, table_types
+from gb4_wiki_gen.generator.equip_page import collect_equipment, make_equip_page_content
+from gb4_wiki_gen.generator.kit_page import make_kit_page_content
+from gb4_wiki_gen.generator.suit_page import make_suit_page_content
+from gb4_wiki_gen.models import DataTable, Registry
+from gb4_wiki_gen.memory import MB, grouped_sizes, measure_stages, over_budget, \
+    parse_budgets, registry_sizes
+from gb4_wiki_gen.templates import fragment_cache
+
+log = logging.getLogger(__name__)
+
+
+def measure(fn, repeat):
+    """
+    call fn `repeat` times, returns timings and the last result
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "mean": statistics.mean(timings),
+        "repeat": repeat,
+    }, result
+
+
+def measure_memory(fn):
+    """
+    call fn once under tracemalloc, returns the peak and the retained size of
+    its result in bytes
+    """
+    tracemalloc.start()
+    try:
+        result = fn()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"retained": retained, "peak": peak}
+
+
+def load_memory(dir_path):
+    return {
+        "load.full_rows": measure_memory(lambda: load_data(dir_path, full_rows=True)),
+        "load.projected": measure_memory(lambda: load_data(dir_path)),
+    }
+
+
+def memory_sizes(dir_path):
+    """
+    sizes by section and table and per stage of a full render, see
+    ``memory-report``
+    """
+    registry, stages = measure_stages(dir_path)
+    sizes = registry_sizes(registry)
+    return {**grouped_sizes(sizes), "total": sizes["total"], **stages}
+
+
+def parse_sources(dir_path):
+    raw_tables = []
+    for path, types in data_sources.items():
+        with open(Path(dir_path) / path, "r", encoding="utf8") as fp:
+            raw_tables.append((types, json.load(fp)[0]))
+    return raw_tables
+
+
+def build_tables(raw_tables, timings=None):
+    registry = Registry()
+    for types, raw in raw_tables:
+        row_type, table_type = table_types(types)
+        start = time.perf_counter()
+        table_type(registry, row_type, raw)
+        if timings is not None:
+            timings.setdefault(raw["Name"], []).append(time.perf_counter() - start)
+    return registry
+
+
+def render_pages(make_page, items):
+    pages = 0
+    failures = 0
+    for item in items:
+        try:
+            make_page(item)
+            pages += 1
+        except Exception:
+            failures += 1
+    return pages, failures
+
+
+def render_suits(registry):
+    suit_ids = [it for it in registry["MSList"].keys() if "HG_" in it]
+    return render_pages(
+        lambda suit_id: make_suit_page_content(registry, suit_id, "Generated"),
+        suit_ids
+    )
+
+
+def render_kits(registry):
+    return render_pages(
+        lambda kit_id: make_kit_page_content(registry, kit_id, "Generated"),
+        list(registry["ItemGunplaBox"].keys())
+    )
+
+
+def render_equipment(registry):
+    return render_pages(
+        lambda entry: make_equip_page_content(registry, entry, "Generated"),
+        collect_equipment(registry).values()
+    )
+
+
+renderers = {
+    "suit": render_suits,
+    "kit": render_kits,
+    "equipment": render_equipment,
+}
+
+
+def run_scale(dir_path, repeat):
+    results = {}
+
+    results["load"], registry = measure(lambda: load_data(dir_path), repeat)
+    results["parse"], raw_tables = measure(lambda: parse_sources(dir_path), repeat)
+
+    table_timings = {}
+    measure(lambda: build_tables(raw_tables, table_timings), repeat)
+    for table_name, timings in table_timings.items():
+        # plain DataTable construction does no work, only time index building
+        if type(registry[table_name]) is DataTable:
+            continue
+        results[f"index.{table_name}"] = {
+            "min": min(timings),
+            "mean": statistics.mean(timings),
+            "repeat": repeat,
+        }
+
+    def render_cold(render):
+        # run-scoped caches would turn repeats into cache hits
+        registry.clear_caches()
+        fragment_cache.clear()
+        return render(registry)
+
+    for page_type, render in renderers.items():
+        result, (pages, failures) = measure(lambda: render_cold(render), repeat)
+        result["pages"] = pages
+        result["failures"] = failures
+        result["per_page"] = result["min"] / pages if pages else None
+        results[f"render.{page_type}"] = result
+
+    def end_to_end():
+        registry = load_data(dir_path)
+        for render in renderers.values():
+            render(registry)
+
+    results["end_to_end"], _ = measure(end_to_end, repeat)
+    rows = {name: len(table.rows) for name, table in registry.items()}
+    return rows, results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def ensure_dataset(data_dir, scale, seed):
+    dir_path = Path(data_dir) / f"scale-{scale:g}-seed-{seed}"
+    marker = dir_path / "counts.json"
+    if not marker.exists():
+        log.info(f"generating synthetic data scale={scale:g} into {dir_path}")
+        counts = synthetic.generate(dir_path, scale, seed)
+        marker.write_text(json.dumps(counts, indent=2))
+    return dir_path
+
+
+@click.group()
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(levelname)s %(name)s %(message)s"
+    )
+
+
+@main.command()
+@click.argument("dir_path", type=click.Path(file_okay=False, path_type=Path))
+@click.option("--scale", type=float, default=1)
+@click.option("--seed", type=int, default=0)
+def generate(dir_path, scale, seed):
+    """
+    write a synthetic export into DIR_PATH
+    """
+    counts = synthetic.generate(dir_path, scale, seed)
+    for name, count in counts.items():
+        print(f"{name:<45} {count:>8}")
+
+
+@main.command()
+@click.option("--scale", "scales", type=float, multiple=True, default=(1, 10),
+              help="dataset scale, repeat for multiple scales (1, 10, 100)")
+@click.option("--seed", type=int, default=0)
+@click.option("--repeat", type=int, default=3)
+@click.option("--data-dir", type=click.Path(file_okay=False, path_type=Path),
+              default=Path(".benchmarks/data"))
+@click.option("--results-dir", type=click.Path(file_okay=False, path_type=Path),
+              default=Path(".benchmarks/results"))
+@click.option("--memory-budget", "memory_budgets", multiple=True, metavar="KEY=MB",
+              help="fail when a memory-report KEY exceeds MB at any scale, repeatable")
+def run(scales, seed, repeat, data_dir, results_dir, memory_budgets):
+    """
+    benchmark load, index build, rendering and end-to-end runs
+    """
+    try:
+        budgets = parse_budgets(memory_budgets)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--memory-budget")
+    exceeded = []
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "seed": seed,
+        "scales": {},
+    }
+    for scale in scales:
+        dir_path = ensure_dataset(data_dir, scale, seed)
+        log.info(f"benchmarking scale={scale:g}")
+        rows, results = run_scale(dir_path, repeat)
+        memory = load_memory(dir_path)
+        sizes = memory_sizes(dir_path)
+        report["scales"][f"{scale:g}"] = {
+            "rows": rows, "results": results, "memory": memory, "memory_sizes": sizes,
+        }
+        print_results(f"scale {scale:g}", results)
+        print_memory(memory)
+        exceeded.extend((scale, *it) for it in over_budget(sizes, budgets))
+
+    results_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    result_path = results_dir / f"{stamp}-{commit}.json"
+    result_path.write_text(json.dumps(report, indent=2))
+    log.info(f"results written to {result_path}")
+    for scale, key, size, budget in exceeded:
+        log.error(f"scale {scale:g}: {key} uses {size / MB:.2f}MB, over its budget of {budget:g}MB")
+    if exceeded:
+        raise SystemExit(1)
+
+
+@main.command()
+@click.argument("baseline", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument("current", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+def compare(baseline, current):
+    """
+    compare two result files, ratio < 1 means CURRENT is faster
+    """
+    baseline_report = json.loads(baseline.read_text())
+    current_report = json.loads(current.read_text())
+    print(f"baseline {baseline_report['commit']}, current {current_report['commit']}")
+    for scale, current_scale in current_report["scales"].items():
+        baseline_scale = baseline_report["scales"].get(scale)
+        if baseline_scale is None:
+            continue
+        print(f"\n== scale {scale} ==")
+        print(f"{'metric':<40} {'baseline':>10} {'current':>10} {'ratio':>7}")
+        for metric, result in current_scale["results"].items():
+            baseline_result = baseline_scale["results"].get(metric)
+            if baseline_result is None:
+                continue
+            ratio = result["min"] / baseline_result["min"] if baseline_result["min"] else float("nan")
+            print(f"{metric:<40} {baseline_result['min']:>10.4f} {result['min']:>10.4f} {ratio:>7.2f}")
+        baseline_sizes = baseline_scale.get("memory_sizes", {})
+        for key, size in current_scale.get("memory_sizes", {}).items():
+            if not baseline_sizes.get(key):
+                continue
+            print(f"{'memory.' + key:<40} {baseline_sizes[key] / MB:>8.2f}MB {size / MB:>8.2f}MB "
+                  f"{size / baseline_sizes[key]:>7.2f}")
+
+
+def print_results(title, results):
+    print(f"\n== {title} ==")
+    print(f"{'metric':<40} {'min':>10} {'mean':>10} {'pages':>7}")
+    for metric, result in results.items():
+        print(f"{metric:<40} {result['min']:>10.4f} {result['mean']:>10.4f} {result.get('pages', ''):>7}")
+
+
+def print_memory(memory):
+    print(f"\n{'memory':<40} {'retained':>10} {'peak':>10}")
+    for metric, result in memory.items():
+        print(f"{metric:<40} {result['retained'] / 2**20:>8.1f}MB {result['peak'] / 2**20:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import threading
+from functools import wraps
+
+
+class MemoCache:
+    """
+    thread-safe memo of computed values with hit/miss counters, values may be
+    computed twice when two workers miss at the same time, the first stored
+    value wins
+    """
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = {}
+        self._lock = threading.Lock()
+        # table reads of computing each value, recorded while pages are
+        # tracked, see DependencyTracker
+        self.reads = {}
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_or_compute(self, key, compute):
+        try:
+            value = self._data[key]
+        except KeyError:
+            value = compute()
+            with self._lock:
+                self.misses += 1
+                return self._data.setdefault(key, value)
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def items(self):
+        with self._lock:
+            return list(self._data.items())
+
+    def preload(self, values):
+        """
+        add precomputed values, eg. persisted by an earlier run
+        """
+        with self._lock:
+            for key, value in values:
+                self._data.setdefault(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.reads.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self):
+        return (f"MemoCache({self.name!r}, entries={len(self)}, hits={self.hits}, "
+                f"misses={self.misses}, hit_rate={self.hit_rate:.1%})")
+
+
+def memoize(name, key):
+    """
+    memoize a function of a row object in the run-scoped cache `name` of the
+    row's registry, `key(row)` returns the cache key
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(row):
+            caches = getattr(getattr(row, "registry", None), "caches", None)
+            if caches is None:
+                return fn(row)
+            cache = caches.get(name) or row.registry.cache(name)
+            return cache.get_or_compute(key(row), lambda: fn(row))
+        return wrapper
+    return decorator
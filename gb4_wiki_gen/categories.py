@@ -0,0 +1,115 @@
+"""
+Interned category columns.
+
+Category values like ``MS_EQUIP_CATEGORY::SHIELD`` or
+``EAbilityCartridgeCategory::EX_MELEE`` repeat across thousands of rows.
+While loading, every occurrence is replaced by one shared ``CategoryValue``
+per distinct string. It is still a ``str``, so comparisons, sorting and
+hashing of rows are unchanged, and it carries its display name and skill
+bucket, computed once instead of per page.
+
+The enums belong to a registry and only hold values weakly, values of
+reloaded tables that no row refers to anymore are dropped.
+"""
+from weakref import WeakValueDictionary
+
+# skill list on suit and kit pages (ex, op, awaken) and on equipment pages
+# (normal, ex, op, awaken), by position in the returned tuples
+PART_SKILL_BUCKETS = ("ex", "op", "awaken")
+EQUIP_SKILL_BUCKETS = ("normal", "ex", "op", "awaken")
+
+
+def ability_bucket(ability_type, normal=True):
+    if normal and "NML_" in ability_type:
+        return "normal"
+    if "ORIGINAL" in ability_type:
+        return "awaken"
+    if "EX" in ability_type:
+        return "ex"
+    if "OP" in ability_type:
+        return "op"
+    return None
+
+
+class CategoryValue(str):
+    # value without the enum namespace, or without "Parts" for performance
+    # groups, as shown on the pages
+    display: str
+    # list of the skill on equipment pages and on suit and kit pages, None
+    # for skills listed on neither
+    bucket: str = None
+    part_bucket: str = None
+
+
+class CategoryEnum:
+    """
+    distinct values of one category column
+    """
+    def __init__(self, name, display, skill_buckets=False):
+        self.name = name
+        self._display = display
+        self._skill_buckets = skill_buckets
+        self._values = WeakValueDictionary()
+
+    def intern(self, value) -> CategoryValue:
+        interned = self._values.get(value)
+        if interned is None:
+            interned = CategoryValue(value)
+            interned.display = self._display(value)
+            if self._skill_buckets:
+                interned.bucket = ability_bucket(interned.display)
+                interned.part_bucket = ability_bucket(interned.display, normal=False)
+            self._values[value] = interned
+        return interned
+
+    def __repr__(self):
+        return f"CategoryEnum({self.name!r}, values={len(self._values)})"
+
+
+def _enum_name(value):
+    return value.split("::", 1)[-1]
+
+
+class Categories:
+    """
+    category enums of one registry, by table and column
+    """
+    def __init__(self):
+        parts_categories = CategoryEnum("parts_category", _enum_name)
+        # nested fields as tuples of keys
+        self.columns = {
+            "PartsParameter": {
+                ("_PartsCategory",): parts_categories,
+                ("_Other", "_PerformanceGroupName"): CategoryEnum(
+                    "performance_group", lambda value: value.replace("Parts", "")),
+            },
+            "EquipParameter": {
+                ("_PartsCategory",): parts_categories,
+            },
+            "SkillIdInfo": {
+                ("_AbilityCartridgeCategory",): CategoryEnum(
+                    "ability_cartridge_category", _enum_name, skill_buckets=True),
+            },
+        }
+
+    def intern(self, raw):
+        """
+        replace the category values of a raw table with interned values, in
+        place
+        """
+        columns = self.columns.get(raw["Name"])
+        if columns is None:
+            return raw
+        for row in raw["Rows"].values():
+            for path, enum in columns.items():
+                *parents, field = path
+                obj = row
+                for key in parents:
+                    obj = obj.get(key)
+                    if not isinstance(obj, dict):
+                        break
+                else:
+                    value = obj.get(field)
+                    if isinstance(value, str):
+                        obj[field] = enum.intern(value)
+        return raw
@@ -1,32 +1,97 @@
+import json
 import logging
 import tomllib
-from concurrent.futures.thread import ThreadPoolExecutor
-from contextlib import suppress
+from functools import partial
+from itertools import chain
 from pathlib import Path
 from pprint import pprint
+from time import perf_counter
 import click
 
 
+from gb4_wiki_gen import metrics, profiling, queries, templates
+from gb4_wiki_gen.assets import compare_assets, expected_files, map_assets, remote_sha1s
 from gb4_wiki_gen.database import load_data
-from gb4_wiki_gen.generator.equip_page import collect_equipment, make_equip_page_content
-from gb4_wiki_gen.generator.kit_page import make_kit_page_content
-from gb4_wiki_gen.generator.suit_page import make_suit_page_content
-from gb4_wiki_gen.models import DataTableIndexError
+from gb4_wiki_gen.export_diff import affected_pages, load_shared
+from gb4_wiki_gen.generator.equip_page import collect_equipment
+from gb4_wiki_gen.generator.overview_page import make_overview_pages
+from gb4_wiki_gen.generator.mission_page import make_mission_rewards_page_content
+from gb4_wiki_gen.generator.series_page import make_series_page_content
+from gb4_wiki_gen.generator.skill_page import skill_page_ids
+from gb4_wiki_gen.lua_export import MAX_CHUNK_BYTES, lua_modules, write_modules
+from gb4_wiki_gen.metrics import MetricsWriter, Progress, write_metrics
+from gb4_wiki_gen.memory import MB, grouped_sizes, measure_stages, over_budget, \
+    parse_budgets, registry_sizes
+from gb4_wiki_gen.name_search import MIN_SCORE, name_index, resolve_ids
+from gb4_wiki_gen.mirror import MirrorStore, WikiMirror, compare_pages, mirror_upload
+from gb4_wiki_gen.pages import PAGE_TYPES, make_pages, page_key, plan_all_pages, \
+    render_pages, select_kit_ids, select_suit_ids, try_make_equip_page, \
+    try_make_kit_page, try_make_skill_page, try_make_suit_page
+from gb4_wiki_gen.pipeline import PipelineResult, render_page, stream_pages, upload_pages
+from gb4_wiki_gen.server import serve
+from gb4_wiki_gen.sharding import ShardType, merge_manifests, write_manifest
+from gb4_wiki_gen.templates import load_fragments, save_fragments
+from gb4_wiki_gen.transclusion import TransclusionGraph, UploadLog, purge_pages, \
+    stale_dependents
+from gb4_wiki_gen.watch import WatchSession
 from gb4_wiki_gen.wiki_client import ApiSession
-from gb4_wiki_gen.utils import slugify
+from gb4_wiki_gen.xml_dump import XmlDumpWriter, open_dump
 
 
 log = logging.getLogger(__name__)
 
+WIKI_URL = "https://gundambreaker.miraheze.org/w/"
+
+
+class ContextObj(dict):
+    """
+    command context, the registry is loaded on first access so commands not
+    reading the export skip loading it
+    """
+    def __missing__(self, key):
+        if key != "registry":
+            raise KeyError(key)
+        registry = self["registry"] = load_data(self["dir_path"], self["full_rows"])
+        return registry
+
 
 @click.group()
 @click.argument("dir_path", type=click.Path(
     exists=True, file_okay=False, dir_okay=True, readable=True, path_type=Path))
+@click.option("--profile", is_flag=True, default=False,
+              help="record wall time and call counts per stage, print a summary")
+@click.option("--profile-output", type=click.Path(dir_okay=False, path_type=Path),
+              help="also write cProfile stats (pstats format) to this file")
+@click.option("--fragment-cache", type=click.Path(dir_okay=False, path_type=Path),
+              help="load rendered template fragments from this file and save "
+                   "them back on exit, to reuse them between runs")
+@click.option("--full-rows", is_flag=True, default=False,
+              help="keep every field of the loaded rows instead of only those "
+                   "the generators read, for debugging the raw export")
+@click.option("--metrics", "metrics_path", type=click.Path(dir_okay=False, path_type=Path),
+              help="write page counts, latency histograms, retries and failures "
+                   "to this file at the end, JSON for .json, else Prometheus text")
+@click.option("--metrics-interval", type=float, default=0, show_default=True,
+              help="also write the metrics file every this many seconds")
+@click.option("--progress", is_flag=True, default=False,
+              help="show pages done, rate and ETA while running")
 @click.pass_context
-def main(context, dir_path):
-    context.ensure_object(dict)
+def main(context, dir_path, profile, profile_output, fragment_cache, full_rows,
+         metrics_path, metrics_interval, progress):
+    context.ensure_object(ContextObj)
+    if metrics_path is not None or progress:
+        _enable_metrics(context, metrics_path, metrics_interval, progress)
+    if fragment_cache is not None:
+        count = load_fragments(fragment_cache)
+        log.info(f"loaded {count} fragments from {fragment_cache}")
+        context.call_on_close(lambda: save_fragments(fragment_cache))
+    if profile or profile_output:
+        profiling.enable(cprofile=profile_output is not None)
+        context.call_on_close(lambda: _finish_profile(profile_output))
     context.obj["config"] = tomllib.load(open("config.toml", "rb"))
-    context.obj["registry"] = load_data(dir_path)
+    context.obj["dir_path"] = dir_path
+    context.obj["full_rows"] = full_rows
+    context.call_on_close(lambda: _log_cache_stats(context.obj.get("registry")))
 
 
 @main.command()
@@ -37,32 +102,39 @@ def derives_into(context, part_id):
     (debug) information about derives
     """
     registry = context.obj["registry"]
-    derive_table = registry["DerivedSynthesizeParameter"]
-    part_name_table = registry["localized_text_parts_name"]
-    recipes = derive_table.find_derives_into(part_id)
-    recipes_named = []
-    for t, s1, s2 in recipes:
-        t_name = part_name_table[t]._text
-        s1_name = part_name_table[s1]._text
-        s2_name = part_name_table[s2]._text
-        recipes_named.append((
-            f"{t} {t_name}", f"{s1} {s1_name}", f"{s2} {s2_name}"
-        ))
-
+    part_id, = resolve_ids(registry, [part_id], "PartsParameter", {"part"})
+    recipes_named = queries.derives_into(registry, part_id)
     pprint(recipes_named)
 
 
+@main.command()
+@click.argument("text", nargs=-1, required=True)
+@click.option("--kind", "kinds", multiple=True,
+              help="only entities of this kind (suit, part, equipment, skill, kit, ...), "
+                   "repeatable")
+@click.option("--limit", type=int, default=10, show_default=True)
+@click.pass_context
+def find(context, text, kinds, limit):
+    """
+    find ids by localized name, fuzzy and ranked best first
+    """
+    names = name_index(context.obj["registry"])
+    start = perf_counter()
+    matches = names.search(" ".join(text), set(kinds), limit)
+    elapsed = perf_counter() - start
+    for match in matches:
+        print(f"{match.score:.2f} {match.kind:<12} {match.id:<32} {match.name}")
+    log.info(f"{len(matches)} of {len(names)} names matched in {elapsed * 1000:.2f}ms")
+
+
 @main.command()
 @click.pass_context
 def suits_grades(context):
     """
     (debug) suit grades
     """
-    registry = context.obj["registry"]
-    mslist = registry["MSList"]
-    for suit in mslist:
-        grades = mslist.grade_variants(suit)
-        print(f"{suit.id}, {grades}")
+    for suit_id, grades in queries.suits_grades(context.obj["registry"]).items():
+        print(f"{suit_id}, {grades}")
 
 
 @main.command()
@@ -71,25 +143,104 @@ def suits_localized(context):
     """
     (debug) info on suits (main id, parts ids, gunpla box)
     """
+    for suit in queries.suits_localized(context.obj["registry"]):
+        parts_ids = " ".join(str(id) for id in suit["parts_ids"])
+        box_id = suit["box_id"] or "-/-"
+        shop_price = "-/-" if suit["shop_price"] is None else suit["shop_price"]
+        print(suit["id"], parts_ids, suit["name"] or "-/-", f"[{box_id} {shop_price}]")
+
+
+@main.command()
+@click.option("--limit", type=int, default=50, show_default=True,
+              help="dangling references listed per table and field")
+@click.pass_context
+def integrity(context, limit):
+    """
+    (debug) report rows with complete data and dangling references
+    """
+    registry = context.obj["registry"]
+    validity = registry.validity
+    for name, count in validity.summary().items():
+        print(f"{name:<14} {count:>8}")
+
+    grouped = {}
+    for ref in validity.dangling:
+        grouped.setdefault((ref.table, ref.field, ref.target_table), []).append(ref)
+    for (table, field_name, target_table), refs in sorted(grouped.items()):
+        print(f"\n== {table}.{field_name} -> {target_table}: {len(refs)} dangling ==")
+        for ref in refs[:limit]:
+            print(f"{ref.row_id} -> {ref.key}")
+        if len(refs) > limit:
+            print(f"... {len(refs) - limit} more")
+
+
+@main.command()
+@click.argument("ids", type=str, nargs=-1, required=True)
+@click.pass_context
+def resolve(context, ids):
+    """
+    (debug) show owning tables and localized name of ids
+    """
     registry = context.obj["registry"]
-    boxes = registry["ItemGunplaBox"]
-    for suit in registry["MSList"]:
-        try:
-            box = boxes.find_by_suit_id(suit.id)
-            box_id = box.id
-            shop_price = box.shop_item.price
-        except Exception:
-            box_id = "-/-"
-            shop_price = "-/-"
-        try:
-            parts_ids = " ".join(str(id) for id in suit.parts_ids)
-        except Exception:
-            pass
-        try:
-            name = " ".join(suit.ms_name_localized._text.split())
-            print(suit.id, parts_ids, name, f"[{box_id} {shop_price}]")
-        except DataTableIndexError:
-            print(suit.id, parts_ids, "-/-", f"[{box_id} {shop_price}]")
+    for id in ids:
+        if id not in registry.ids:
+            matches = name_index(registry).search(id, limit=1)
+            if matches and matches[0].score >= MIN_SCORE:
+                id = matches[0].id
+        resolved = queries.resolve(registry, id)
+        if resolved is None:
+            print(f"{id}: unknown id")
+            continue
+        print(f"{id}: {resolved['name'] or '-/-'}")
+        for owner in resolved["owners"]:
+            print(f"  {owner['kind']:<20} {owner['table']}")
+
+
+@main.command()
+@click.argument("old_dir", type=click.Path(
+    exists=True, file_okay=False, dir_okay=True, readable=True, path_type=Path))
+@click.argument("new_dir", required=False, type=click.Path(
+    exists=True, file_okay=False, dir_okay=True, readable=True, path_type=Path))
+@click.option("--limit", type=int, default=20, show_default=True,
+              help="row keys listed per table and change kind")
+@click.option("--wiki-namespace", type=str, default="Generated")
+@click.pass_context
+def diff_exports(context, old_dir, new_dir, limit, wiki_namespace):
+    """
+    report rows changed between OLD_DIR and NEW_DIR (default: the loaded
+    export) and the suit, kit and equipment pages they affect
+    """
+    if new_dir is None:
+        new_dir = context.obj["dir_path"]
+    # changes to fields dropped by the projection are reported as well
+    if new_dir.resolve() == context.obj["dir_path"].resolve() and context.obj["full_rows"]:
+        new_registry = context.obj["registry"]
+    else:
+        new_registry = load_data(new_dir, full_rows=True)
+    old_registry, diffs = load_shared(new_registry, old_dir)
+
+    print(f"{'table':<45} {'added':>7} {'removed':>8} {'modified':>9} {'shared':>8}")
+    for diff in diffs:
+        print(f"{diff.name:<45} {len(diff.added):>7} {len(diff.removed):>8} "
+              f"{len(diff.modified):>9} {diff.shared:>8}")
+    for diff in diffs:
+        for kind in ("added", "removed", "modified"):
+            keys = getattr(diff, kind)
+            if not keys:
+                continue
+            print(f"\n== {diff.name} {kind}: {len(keys)} ==")
+            print("\n".join(keys[:limit]))
+            if len(keys) > limit:
+                print(f"... {len(keys) - limit} more")
+
+    pages = affected_pages(old_registry, new_registry, diffs, wiki_namespace)
+    for kind, keys in (("added", pages.added), ("changed", pages.changed)):
+        print(f"\n== {kind} pages: {len(keys)} ==")
+        for (page_type, item_id), title in keys.items():
+            print(f"{page_type:<10} {item_id:<30} {title or '(no page)'}")
+    print(f"\n== removed pages: {len(pages.removed)} ==")
+    for page_type, item_id in pages.removed:
+        print(f"{page_type:<10} {item_id}")
 
 
 @main.command()
@@ -108,51 +259,50 @@ def missions(context):
 
 
 @main.command()
+@click.option("--wiki-namespace", type=str, default="Generated")
 @click.pass_context
-def mission_rewards(context):
+def mission_rewards(context, wiki_namespace):
     """
     (incomplete) generate mission pages with drops
     """
     registry = context.obj["registry"]
-    mission_reward_table = registry["MissionRewardTable"]
-    suit_names = registry["localized_text_preset_character_name"]
-    bpart_names = registry["localized_text_bparts_name"]
-    part_names = registry["localized_text_parts_name"]
-    weapon_names = registry["localized_text_weapon_name"]
-    shield_names = registry["localized_text_shield_name"]
-    story_names = registry["localized_text_story_title_name"]
-
-    def get_reward_name(reward_id):
-        with suppress(Exception):
-            return suit_names[reward_id]._text
-        with suppress(Exception):
-            return part_names[reward_id]._text
-        with suppress(Exception):
-            return weapon_names[reward_id]._text
-        with suppress(Exception):
-            return shield_names[reward_id]._text
-        with suppress(Exception):
-            return bpart_names[reward_id]._text
-        return reward_id
-
-    def get_mission_name(mission_reward_id: str) -> str:
-        try:
-            story_name_key = mission_reward_id.replace("MissionReward", "TextId")
-            return story_names[story_name_key]._text
-        except DataTableIndexError:
-            return mission_reward_id
-
-    print("= Mission Rewards =")
-    for reward_id, mission_list in mission_reward_table.reward_item_mapped.items():
-        reward_name = str(get_reward_name(reward_id)).replace("\n", " ")
-
-        print(f"== {reward_name} ==")
-        for mission_id in mission_list:
-            mission_name = get_mission_name(mission_id)
-            if mission_name == mission_id:
-                print(f"* {mission_name}")
-            else:
-                print(f"* '''{mission_name}''' ")
+    page_title, page_content = make_mission_rewards_page_content(registry, wiki_namespace)
+    print(page_content, end="")
+
+
+def pipeline_options(command):
+    """
+    options for the streaming render-to-upload pipeline
+    """
+    command = click.option("--queue-size", type=int, default=32, show_default=True,
+                           help="rendered pages buffered for upload")(command)
+    command = click.option("--upload-workers", type=int, default=4, show_default=True)(command)
+    command = click.option("--render-workers", type=int, default=1, show_default=True)(command)
+    command = click.option("--mirror", type=click.Path(exists=True, dir_okay=False, path_type=Path),
+                           help="skip uploading pages unchanged in this mirror or last "
+                                "edited by someone else, see the mirror command")(command)
+    return command
+
+
+def purge_option(command):
+    """
+    option for refreshing the pages transcluding uploaded pages
+    """
+    return click.option("--purge", is_flag=True, default=False,
+                        help="upload transcluded pages first and purge the pages "
+                             "transcluding uploaded pages afterwards")(command)
+
+
+def shard_options(command):
+    """
+    options for splitting page generation across independent runs
+    """
+    command = click.option("--manifest", type=click.Path(dir_okay=False, path_type=Path),
+                           help="write rendered, uploaded and failed pages and "
+                                "timings as JSON, see merge-manifests")(command)
+    command = click.option("--shard", type=ShardType(), default=None,
+                           help="only generate pages of shard i of N, eg. 2/4")(command)
+    return command
 
 
 @main.command()
@@ -160,8 +310,11 @@ def mission_rewards(context):
 @click.option("--upload", is_flag=True, default=False)
 @click.option("--dump", is_flag=True, default=False)
 @click.option("--wiki-namespace", type=str, default="Generated")
+@pipeline_options
+@purge_option
+@shard_options
 @click.pass_context
-def suit(context, suit_id, upload, dump, wiki_namespace):
+def suit(context, suit_id, upload, dump, wiki_namespace, shard, manifest, **pipeline):
     """
     generate mediawiki page for selected suit_ids or `all`, with optional upload
     """
@@ -169,38 +322,12 @@ def suit(context, suit_id, upload, dump, wiki_namespace):
         return
 
     registry = context.obj["registry"]
-
-    suit_ids = []
-    if "all" in suit_id:
-        suit_ids = [it for it in registry["MSList"].keys() if "HG_" in it]
-    else:
-        for it in suit_id:
-            suit_ids.extend(it.split(" "))
-
-    def try_make_pages(registry, suit_ids, wiki_namespace):
-        for suit_id in suit_ids:
-            try:
-                yield make_suit_page_content(registry, suit_id, wiki_namespace)
-            except DataTableIndexError as e:
-                log.exception(f"failed making suit page {suit_id}")
-            except Exception:
-                log.exception(f"failed making suit page {suit_id}")
-
-    pages = list(try_make_pages(registry, suit_ids, wiki_namespace))
-
-    if pages and upload:
-        csrf_token, wiki_client = _init_wiki_client(context.obj["config"])
-        for page_title, page_content in pages:
-            wiki_client.edit(csrf_token, page_title, page_content)
-            log.info(f"Upload okay: {page_title}")
-    elif dump:
-        for page_title, page_content in pages:
-            print(page_title, page_content)
-            if not click.confirm("continue?", default=True):
-                return
-    else:
-        for page_title, page_content in pages:
-            log.info(page_title)
+    suit_ids = select_suit_ids(registry, suit_id)
+    if shard is not None:
+        suit_ids = shard.select(suit_ids)
+    make_page = partial(try_make_suit_page, registry, wiki_namespace=wiki_namespace)
+    _publish_sharded(context, "suit", make_page, suit_ids, upload, dump, pipeline,
+                     shard, manifest)
 
 
 @main.command()
@@ -208,8 +335,11 @@ def suit(context, suit_id, upload, dump, wiki_namespace):
 @click.option("--upload", is_flag=True, default=False)
 @click.option("--dump", is_flag=True, default=False)
 @click.option("--wiki-namespace", type=str, default="Generated")
+@pipeline_options
+@purge_option
+@shard_options
 @click.pass_context
-def kit(context, kit_id, upload, dump, wiki_namespace):
+def kit(context, kit_id, upload, dump, wiki_namespace, shard, manifest, **pipeline):
     """
     generate mediawiki page for selected kit_ids or `all`, with optional upload
     """
@@ -217,121 +347,509 @@ def kit(context, kit_id, upload, dump, wiki_namespace):
         return
 
     registry = context.obj["registry"]
+    kit_ids = select_kit_ids(registry, kit_id)
+    if shard is not None:
+        kit_ids = shard.select(kit_ids)
+    make_page = partial(try_make_kit_page, registry, wiki_namespace=wiki_namespace)
+    _publish_sharded(context, "kit", make_page, kit_ids, upload, dump, pipeline,
+                     shard, manifest)
 
-    kit_ids = []
-    if "all" in kit_id:
-        kit_ids = list(registry["ItemGunplaBox"].keys())
-    else:
-        for it in kit_id:
-            kit_ids.extend(it.split(" "))
 
-    def try_make_pages(registry, kit_ids, wiki_namespace):
-        for kit_id in kit_ids:
-            try:
-                yield make_kit_page_content(registry, kit_id, wiki_namespace)
-            except DataTableIndexError as e:
-                if e.table_name == "ShopGoodsTable":
-                    pass
-                else:
-                    log.exception(f"failed making kit {kit_id} page")
-            except Exception:
-                log.exception(f"failed making kit {kit_id} page")
+@main.command()
+@click.option("--upload", is_flag=True, default=False)
+@click.option("--wiki-namespace", type=str, default="Generated")
+@pipeline_options
+@purge_option
+@click.pass_context
+def series(context, upload, wiki_namespace, **pipeline):
+    """
+    generate mediawiki category pages for series, with optional upload
+    """
+    registry = context.obj["registry"]
+    make_page = partial(make_series_page_content, wiki_namespace=wiki_namespace)
+    _publish_pages(context, make_page, registry["localized_text_gundam_series"],
+                   upload, False, pipeline)
 
 
-    pages = list(try_make_pages(registry, kit_ids, wiki_namespace))
+@main.command()
+@click.option("--upload", is_flag=True, default=False)
+@click.option("--dump", is_flag=True, default=False)
+@click.option("--wiki-namespace", type=str, default="Generated")
+@pipeline_options
+@purge_option
+@shard_options
+@click.pass_context
+def equipment(context, upload, dump, wiki_namespace, shard, manifest, **pipeline):
+    """
+    generate mediawiki pages for all equipment, with optional upload
+    """
+    registry = context.obj["registry"]
+    with profiling.stage("collect.equipment"):
+        equip_params = collect_equipment(registry)
+    equip_items = list(equip_params.items())
+    if shard is not None:
+        equip_items = shard.select(equip_items, key=lambda item: item[0])
+    make_page = partial(try_make_equip_page, registry, wiki_namespace=wiki_namespace)
+    _publish_sharded(context, "equipment", make_page, equip_items, upload, dump, pipeline,
+                     shard, manifest)
 
-    if pages and upload:
-        csrf_token, wiki_client = _init_wiki_client(context.obj["config"])
-        for page_title, page_content in pages:
-            wiki_client.edit(csrf_token, page_title, page_content)
-            log.info(f"Upload okay: {page_title}")
-    elif dump:
-        for page_title, page_content in pages:
-            print(page_title, page_content)
-            if not click.confirm("continue?", default=True):
-                return
+
+@main.command()
+@click.argument("skill_id", type=str, nargs=-1)
+@click.option("--upload", is_flag=True, default=False)
+@click.option("--dump", is_flag=True, default=False)
+@click.option("--wiki-namespace", type=str, default="Generated")
+@pipeline_options
+@purge_option
+@shard_options
+@click.pass_context
+def skills(context, skill_id, upload, dump, wiki_namespace, shard, manifest, **pipeline):
+    """
+    generate mediawiki pages listing the parts, equipment, suits and kits
+    granting selected skill_ids or `all`, with optional upload
+    """
+    if not skill_id:
+        return
+
+    registry = context.obj["registry"]
+    if "all" in skill_id:
+        skill_ids = skill_page_ids(registry)
     else:
-        for page_title, page_content in pages:
-            log.info(page_title)
+        skill_ids = resolve_ids(registry, skill_id, "SkillIdInfo", {"skill"})
+    if shard is not None:
+        skill_ids = shard.select(skill_ids)
+    make_page = partial(try_make_skill_page, registry, wiki_namespace=wiki_namespace)
+    _publish_sharded(context, "skills", make_page, skill_ids, upload, dump, pipeline,
+                     shard, manifest)
 
 
 @main.command()
 @click.option("--upload", is_flag=True, default=False)
+@click.option("--dump", is_flag=True, default=False)
 @click.option("--wiki-namespace", type=str, default="Generated")
+@pipeline_options
 @click.pass_context
-def series(context, upload, wiki_namespace):
+def overview(context, upload, dump, wiki_namespace, **pipeline):
     """
-    generate mediawiki category pages for series, with optional upload
+    generate sortable list pages of suits by series, kits by grade,
+    equipment by category and parts by slot, with optional upload
     """
     registry = context.obj["registry"]
-    pages = []
+    start = perf_counter()
+    with profiling.stage("collect.overview"):
+        pages = make_overview_pages(registry, wiki_namespace)
+    log.info(f"aggregated {len(pages)} overview pages in {perf_counter() - start:.2f}s")
+    _publish_pages(context, lambda page: page, pages, upload, dump, pipeline)
 
-    for item in registry["localized_text_gundam_series"]:
-        page_name = slugify(item._text)
-        pages.append(
-            (
-                f"{wiki_namespace}:{page_name}",
-                "<includeonly>\n"
-                '<div class="series-include">\n'
-                f"[[File:{wiki_namespace}:Series_Icon_{page_name}.png|left|frameless]]\n <span>[[{wiki_namespace}:{page_name}|{item._text}]]</span>\n"
-                "</div>\n"
-                "</includeonly>\n"
-                "<noinclude>\n"
-                f"= {item._text} =\n\n"
-                "[[Category:Gundam Breaker 4]]\n"
-                "[[Category:Series]]\n"
-                "</noinclude>\n"
-            )
-        )
 
-    if pages and upload:
+@main.command()
+@click.argument("output", type=click.Path(dir_okay=False, writable=True, path_type=Path))
+@click.option("--gzip", "compress", is_flag=True, default=False,
+              help="write gzip compressed output")
+@click.option("--upload", is_flag=True, default=False,
+              help="import the dump via API action=import, requires the `importupload` right")
+@click.option("--namespace-id", type=int, default=None,
+              help="id of the wiki namespace, omitted from the dump by default")
+@click.option("--wiki-namespace", type=str, default="Generated")
+@click.pass_context
+def export_xml(context, output, compress, upload, namespace_id, wiki_namespace):
+    """
+    write all pages into a MediaWiki XML dump for Special:Import or importDump.php
+    """
+    registry = context.obj["registry"]
+    plan = plan_all_pages(registry, wiki_namespace)
+    pages = chain.from_iterable(
+        make_pages(make_page, items) for make_page, items in plan.values()
+    )
+
+    with open_dump(output, compress) as fp:
+        with XmlDumpWriter(fp, namespace_id=namespace_id) as writer:
+            for page_title, page_content in pages:
+                writer.write_page(page_title, page_content)
+                log.info(page_title)
+    log.info(f"wrote {writer.page_count} pages to {output}")
+
+    if upload:
         csrf_token, wiki_client = _init_wiki_client(context.obj["config"])
-        for page_title, page_content in pages:
-            wiki_client.edit(csrf_token, page_title, page_content)
-            log.info(f"Upload okay: {page_title}")
-    else:
-        for page_title, page_content in pages:
-            log.info(page_title)
+        result = wiki_client.import_xml(csrf_token, output)
+        log.info(f"Import okay: {len(result)} pages")
 
 
 @main.command()
+@click.argument("output_dir", type=click.Path(file_okay=False, path_type=Path))
+@click.option("--max-bytes", type=int, default=MAX_CHUNK_BYTES, show_default=True,
+              help="size limit of one data chunk module")
+@click.option("--xml", type=click.Path(dir_okay=False, writable=True, path_type=Path),
+              help="also write the modules into a MediaWiki XML dump")
 @click.option("--upload", is_flag=True, default=False)
-@click.option("--dump", is_flag=True, default=False)
+@click.option("--wiki-namespace", type=str, default="Generated",
+              help="modules are written as Module:<wiki-namespace>/...")
+@pipeline_options
+@click.pass_context
+def export_lua(context, output_dir, max_bytes, xml, upload, wiki_namespace, **pipeline):
+    """
+    write suit, part, equipment, skill and kit data as Scribunto data modules
+    for mw.loadData, split into chunks of at most --max-bytes
+    """
+    registry = context.obj["registry"]
+    modules = list(lua_modules(registry, wiki_namespace, max_bytes))
+    print(f"{'module':<40} {'bytes':>9}")
+    for module, path in write_modules(modules, output_dir):
+        print(f"{module.title:<40} {len(module.text.encode('utf8')):>9}")
+    log.info(f"wrote {len(modules)} modules to {output_dir}")
+
+    if xml is not None:
+        with open_dump(xml, xml.suffix == ".gz") as fp:
+            with XmlDumpWriter(fp) as writer:
+                for module in modules:
+                    writer.write_page(module.title, module.text, "Scribunto", "text/plain")
+        log.info(f"wrote {writer.page_count} modules to {xml}")
+
+    mirror = pipeline.pop("mirror")
+    if upload:
+        _, upload_page = _init_upload_page(context.obj["config"], mirror)
+        result = stream_pages(lambda module: module, modules, upload_page, **pipeline)
+        log.info(f"skipped {result.skipped}, uploaded {result.uploaded}, "
+                 f"unchanged {result.unchanged}, conflicts {result.conflicts}, "
+                 f"failed {len(result.failed)}")
+
+
+@main.command()
+@click.option("--upload", is_flag=True, default=False)
+@click.option("--only", "page_types", type=click.Choice(PAGE_TYPES), multiple=True,
+              help="restrict to page type, repeat for multiple types")
 @click.option("--wiki-namespace", type=str, default="Generated")
+@pipeline_options
+@purge_option
+@shard_options
 @click.pass_context
-def equipment(context, upload, dump, wiki_namespace):
+def build_all(context, upload, page_types, wiki_namespace, shard, manifest, **pipeline):
     """
-    generate mediawiki pages for all equipment, with optional upload
+    generate all page types in one run, with optional upload
     """
     registry = context.obj["registry"]
+    start = perf_counter()
+    with profiling.stage("collect.shared"):
+        plan = plan_all_pages(registry, wiki_namespace)
+    log.info(f"shared data ready in {perf_counter() - start:.2f}s")
+
+    mirror = pipeline.pop("mirror")
+    purge = pipeline.pop("purge")
+    if upload:
+        wiki_client, upload_page = _init_upload_page(context.obj["config"], mirror)
+        if purge:
+            graph, upload_log = _init_transclusions(mirror)
+            upload_page = upload_log.wrap(upload_page)
+
+    report = {}
+    for page_type, (make_page, items) in plan.items():
+        if page_types and page_type not in page_types:
+            continue
+        if shard is not None:
+            items = shard.select(items, key=lambda item: page_key(page_type, item)[1])
+        start = perf_counter()
+        if upload and purge:
+            result = _upload_ordered(make_page, items, upload_page, graph, pipeline)
+        elif upload:
+            result = stream_pages(make_page, items, upload_page, **pipeline)
+        else:
+            result = render_pages(make_page, items)
+        report[page_type] = result, perf_counter() - start
+        log.info(f"{page_type}: rendered {result.rendered} in {report[page_type][1]:.2f}s")
+
+    print(f"{'page type':<12} {'rendered':>9} {'skipped':>8} {'uploaded':>9} "
+          f"{'unchanged':>10} {'conflicts':>10} {'failed':>7} {'seconds':>8}")
+    for page_type, (result, seconds) in report.items():
+        print(f"{page_type:<12} {result.rendered:>9} {result.skipped:>8} "
+              f"{result.uploaded:>9} {result.unchanged:>10} {result.conflicts:>10} "
+              f"{len(result.failed):>7} {seconds:>8.2f}")
+    if upload and purge:
+        _purge_dependents(wiki_client, graph, upload_log)
+    if manifest is not None:
+        write_manifest(manifest, shard, "build-all", report)
+
+
+@main.command("merge-manifests")
+@click.argument("manifests", nargs=-1, required=True,
+                type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path),
+              help="also write the merged report as JSON")
+def merge_manifests_command(manifests, output):
+    """
+    combine the manifests written by sharded runs into one report
+    """
+    try:
+        merged = merge_manifests(
+            json.loads(path.read_text(encoding="utf8")) for path in manifests
+        )
+    except ValueError as e:
+        paths = ", ".join(str(path) for path in manifests)
+        raise click.BadParameter(f"{e} ({paths})", param_hint="MANIFESTS")
+    print(f"{'page type':<12} {'rendered':>9} {'skipped':>8} {'uploaded':>9} "
+          f"{'unchanged':>10} {'conflicts':>10} {'failed':>7} {'seconds':>8} {'wall':>8}")
+    for page_type, total in merged["page_types"].items():
+        print(f"{page_type:<12} {total['rendered']:>9} {total['skipped']:>8} "
+              f"{total['uploaded']:>9} {total['unchanged']:>10} {total['conflicts']:>10} "
+              f"{len(total['failed']):>7} "
+              f"{total['seconds']:>8.2f} {total['wall_seconds']:>8.2f}")
+    for page_type, total in merged["page_types"].items():
+        for failure in total["failed"]:
+            print(f"failed {failure['stage']} {page_type}: {failure['page']}")
+    if merged["missing_shards"]:
+        log.warning(f"missing shards: {', '.join(merged['missing_shards'])}")
+    if merged["duplicate_shards"]:
+        log.warning(f"duplicate shards: {', '.join(merged['duplicate_shards'])}")
+    if output is not None:
+        output.write_text(json.dumps(merged, indent=2), encoding="utf8")
 
-    def try_make_pages(registry, wiki_namespace):
-        equip_params = collect_equipment(registry)
-        for equip_id, entry in equip_params.items():
-            try:
-                yield make_equip_page_content(registry, entry, wiki_namespace)
-            except Exception:
-                log.exception(f"failed making equip page f{equip_id}")
 
-    pages = list(try_make_pages(registry, wiki_namespace))
+@main.command()
+@click.option("--output", type=click.Path(file_okay=False, path_type=Path),
+              default=Path("generated"), show_default=True,
+              help="directory the wikitext files are written to")
+@click.option("--interval", type=float, default=1.0, show_default=True,
+              help="seconds between checks for changed files")
+@click.option("--print", "echo", is_flag=True, default=False,
+              help="also print every regenerated page")
+@click.option("--wiki-namespace", type=str, default="Generated")
+@click.pass_context
+def watch(context, output, interval, echo, wiki_namespace):
+    """
+    regenerate the pages affected by changes to the export or the templates
+    """
+    session = WatchSession(
+        context.obj["dir_path"], output, wiki_namespace,
+        registry=context.obj["registry"], echo=click.echo if echo else None
+    )
+    try:
+        session.run(interval)
+    except KeyboardInterrupt:
+        log.info("stopped watching")
+
 
-    if pages and upload:
-        csrf_token, wiki_client = _init_wiki_client(context.obj["config"])
-        pool = ThreadPoolExecutor(max_workers=4)
-        for page_title, page_content in pages:
-            pool.submit(_wiki_upload_page, wiki_client, csrf_token, page_title, page_content)
+@main.command()
+@click.option("--budget", "budget_values", multiple=True, metavar="KEY=MB",
+              help="fail when KEY exceeds MB, repeatable, added to the "
+                   "[memory_budget] section of config.toml")
+@click.option("--detail", is_flag=True, default=False,
+              help="list every table, index and cache instead of totals per section")
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path),
+              help="also write the report as JSON")
+@click.option("--wiki-namespace", type=str, default="Generated")
+@click.pass_context
+def memory_report(context, budget_values, detail, output, wiki_namespace):
+    """
+    report memory per table, index, cache and stage of loading, planning
+    and rendering all pages
+    """
+    try:
+        budgets = {
+            **context.obj["config"].get("memory_budget", {}),
+            **parse_budgets(budget_values),
+        }
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--budget")
+    registry, stages = measure_stages(
+        context.obj["dir_path"], wiki_namespace, context.obj["full_rows"])
+    context.obj["registry"] = registry
+    sizes = registry_sizes(registry)
+    groups = grouped_sizes(sizes)
+    report = {**sizes, **groups, **stages}
+
+    if detail:
+        shown = {key: size for key, size in sizes.items() if key != "total"}
+    else:
+        shown = {**groups, **{key: size for key, size in sizes.items() if key.startswith("cache.")}}
+    print(f"{'memory':<60} {'MB':>9}")
+    for key, size in sorted(shown.items(), key=lambda it: -it[1]):
+        print(f"{key:<60} {size / MB:>9.2f}")
+    for key, size in stages.items():
+        print(f"{key:<60} {size / MB:>9.2f}")
+    print(f"{'total':<60} {sizes['total'] / MB:>9.2f}")
+    if output is not None:
+        output.write_text(json.dumps(report, indent=2), encoding="utf8")
+
+    exceeded = over_budget(report, budgets)
+    unknown = sorted(budgets.keys() - report.keys())
+    if unknown:
+        log.warning(f"budgets for unknown keys: {', '.join(unknown)}")
+    for key, size, budget in exceeded:
+        log.error(f"{key} uses {size / MB:.2f}MB, over its budget of {budget:g}MB")
+    if exceeded:
+        context.exit(1)
 
-        pool.shutdown(wait=True)
 
-    elif dump:
-        for page_title, page_content in pages:
+@main.command()
+@click.option("--store", type=click.Path(dir_okay=False, path_type=Path),
+              default=Path("mirror.sqlite3"), show_default=True,
+              help="sqlite3 file the mirrored pages are kept in")
+@click.option("--full", is_flag=True, default=False,
+              help="download every page again instead of reading recent changes")
+@click.option("--offline", is_flag=True, default=False,
+              help="do not sync, only use the pages already in the store")
+@click.option("--compare", is_flag=True, default=False,
+              help="render all pages and compare them with the mirror")
+@click.option("--limit", type=int, default=20, show_default=True,
+              help="page titles listed per status with --compare")
+@click.option("--wiki-namespace", type=str, default="Generated")
+@click.pass_context
+def mirror(context, store, full, offline, compare, limit, wiki_namespace):
+    """
+    keep a local copy of the pages in the wiki namespace, synced through
+    recent changes after the first download
+    """
+    config = context.obj["config"]
+    mirror_store = MirrorStore(store)
+    try:
+        if not offline:
+            client = ApiSession(_wiki_url(config))
+            if _bot_user(config) is not None:
+                # logged in bots get higher query limits
+                client.bot_login(config["wiki_client"]["username"],
+                                 config["wiki_client"]["password"])
+            start = perf_counter()
+            result = WikiMirror(client, mirror_store, wiki_namespace).sync(full)
+            log.info(f"{'full' if result.full else 'incremental'} sync: {result.updated} "
+                     f"updated, {result.deleted} deleted in {perf_counter() - start:.2f}s")
+        print(f"{len(mirror_store)} pages mirrored, last sync "
+              f"{mirror_store.get_meta('last_sync')}")
+        if not compare:
+            return
+
+        registry = context.obj["registry"]
+        pages = chain.from_iterable(
+            make_pages(make_page, items)
+            for make_page, items in plan_all_pages(registry, wiki_namespace).values()
+        )
+        status = compare_pages(mirror_store.revisions(), pages, _bot_user(config))
+    finally:
+        mirror_store.close()
+    for name, titles in status._asdict().items():
+        print(f"{name:<10} {len(titles):>6}")
+    for name in ("conflicts", "changed", "new"):
+        titles = getattr(status, name)
+        for page_title in titles[:limit]:
+            print(f"{name}: {page_title}")
+        if len(titles) > limit:
+            print(f"{name}: ... {len(titles) - limit} more")
+
+
+@main.command()
+@click.argument("image_dir", type=click.Path(
+    exists=True, file_okay=False, dir_okay=True, readable=True, path_type=Path))
+@click.option("--upload", is_flag=True, default=False,
+              help="upload new and changed files, otherwise only list them")
+@click.option("--upload-workers", type=int, default=4, show_default=True)
+@click.option("--limit", type=int, default=20, show_default=True,
+              help="file names listed per status")
+@click.pass_context
+def assets(context, image_dir, upload, upload_workers, limit):
+    """
+    map exported images to the file names the pages link, compare them with
+    the files on the wiki by SHA-1 and upload new and changed ones
+    """
+    config = context.obj["config"]
+    asset_map = map_assets(image_dir, expected_files(context.obj["registry"]))
+    log.info(f"{len(asset_map.files)} images mapped, {len(asset_map.unmapped)} unmapped, "
+             f"{len(asset_map.missing)} expected files without image")
+
+    if upload:
+        csrf_token, client = _init_wiki_client(config)
+    else:
+        client = ApiSession(_wiki_url(config))
+    start = perf_counter()
+    sha1s = remote_sha1s(client, asset_map.files)
+    status = compare_assets(asset_map.files, sha1s)
+    log.info(f"compared {len(asset_map.files)} files in {perf_counter() - start:.2f}s")
+
+    listed = {
+        **status._asdict(),
+        "unmapped": [str(it) for it in asset_map.unmapped],
+        "missing": asset_map.missing,
+    }
+    for name, names in listed.items():
+        print(f"{name:<10} {len(names):>6}")
+    for name in ("new", "changed", "unmapped", "missing"):
+        names = listed[name]
+        for file_name in names[:limit]:
+            print(f"{name}: {file_name}")
+        if len(names) > limit:
+            print(f"{name}: ... {len(names) - limit} more")
+    if not upload:
+        return
+
+    def upload_file(file_name, path):
+        client.upload(csrf_token, file_name, path)
+        log.info(f"Upload okay: {file_name}")
+
+    result = stream_pages(
+        lambda file_name: (file_name, asset_map.files[file_name]),
+        status.new + status.changed, upload_file, upload_workers=upload_workers,
+    )
+    log.info(f"uploaded {result.uploaded}, failed {len(result.failed)}")
+    for failure in result.failed:
+        print(f"failed: {failure.page}")
+
+
+@main.command()
+@click.option("--host", type=str, default="127.0.0.1", show_default=True)
+@click.option("--port", type=int, default=8000, show_default=True)
+@click.option("--wiki-namespace", type=str, default="Generated")
+@click.pass_context
+def preview_server(context, host, port, wiki_namespace):
+    """
+    serve rendered pages and debug queries from the loaded registry
+    """
+    app = serve(context.obj["registry"], host, port, wiki_namespace)
+    for endpoint, stats in app.latency.summary().items():
+        log.info(f"{endpoint}: {stats}")
+
+
+def _publish_sharded(context, page_type, make_page, items, upload, dump, pipeline,
+                     shard, manifest):
+    start = perf_counter()
+    result = _publish_pages(context, make_page, items, upload, dump, pipeline)
+    if manifest is not None:
+        report = {page_type: (result, perf_counter() - start)}
+        write_manifest(manifest, shard, page_type, report)
+
+
+def _publish_pages(context, make_page, items, upload, dump, pipeline) -> PipelineResult:
+    """
+    upload pages through the streaming pipeline, or render them one by one
+    for dump and listing
+    """
+    mirror = pipeline.pop("mirror")
+    purge = pipeline.pop("purge", False)
+    if upload:
+        wiki_client, upload_page = _init_upload_page(context.obj["config"], mirror)
+        if purge:
+            graph, upload_log = _init_transclusions(mirror)
+            result = _upload_ordered(make_page, items, upload_log.wrap(upload_page),
+                                     graph, pipeline)
+            _purge_dependents(wiki_client, graph, upload_log)
+        else:
+            result = stream_pages(make_page, items, upload_page, **pipeline)
+        log.info(f"rendered {result.rendered}, skipped {result.skipped}, "
+                 f"uploaded {result.uploaded}, unchanged {result.unchanged}, "
+                 f"conflicts {result.conflicts}, failed {len(result.failed)}")
+        return result
+
+    result = PipelineResult()
+    for item in metrics.planned(items):
+        page = render_page(make_page, item, result)
+        if page is None:
+            continue
+        page_title, page_content = page
+        if dump:
             print(page_title, page_content)
             if not click.confirm("continue?", default=True):
-                return
-    else:
-        for page_title, page_content in pages:
+                break
+        else:
             log.info(page_title)
-        log.info(f"len pages: {len(pages)}")
+    if not dump:
+        log.info(f"len pages: {result.rendered}, failed {len(result.failed)}")
+    return result
 
 
 def _init_wiki_client(config):
@@ -345,12 +863,112 @@ def _init_wiki_client(config):
                         "with `username`, `password`")
 
     wiki_client_config = config["wiki_client"]
-    wiki_client = ApiSession("https://gundambreaker.miraheze.org/w/")
+    wiki_client = ApiSession(_wiki_url(config))
     wiki_client.bot_login(wiki_client_config["username"], wiki_client_config["password"])
     csrf_token = wiki_client.csrf_token()
     return csrf_token, wiki_client
 
 
+def _wiki_url(config):
+    """
+    script path of the wiki, `url` of the ``[wiki_client]`` section to run
+    against another wiki or a local API stand-in
+    """
+    return config.get("wiki_client", {}).get("url", WIKI_URL)
+
+
+def _bot_user(config):
+    """
+    user name the bot edits as, the part of the bot password name before "@"
+    """
+    username = config.get("wiki_client", {}).get("username")
+    return username.split("@")[0] if username else None
+
+
+def _init_upload_page(config, mirror=None):
+    csrf_token, wiki_client = _init_wiki_client(config)
+    upload_page = partial(_wiki_upload_page, wiki_client, csrf_token)
+    if mirror is not None:
+        store = MirrorStore(mirror)
+        revisions = store.revisions()
+        store.close()
+        log.info(f"skipping uploads by {len(revisions)} mirrored pages from {mirror}")
+        upload_page = mirror_upload(upload_page, revisions, _bot_user(config))
+    return wiki_client, upload_page
+
+
+def _init_transclusions(mirror=None):
+    """
+    transclusion graph, with the edges of the mirrored pages for the pages
+    not rendered in this run, and the log of the uploads to purge after
+    """
+    graph = TransclusionGraph()
+    if mirror is not None:
+        store = MirrorStore(mirror)
+        for page_title, page_content in store.contents():
+            graph.add(page_title, page_content)
+        store.close()
+    return graph, UploadLog()
+
+
+def _upload_ordered(make_page, items, upload_page, graph, pipeline) -> PipelineResult:
+    """
+    render all pages first to record their transclusions, then upload
+    transcluded pages before the pages transcluding them
+    """
+    pages = []
+    result = render_pages(make_page, items, pages.append)
+    for page_title, page_content in pages:
+        graph.add(page_title, page_content)
+    return upload_pages(graph.order(pages), upload_page, result,
+                        upload_workers=pipeline["upload_workers"])
+
+
+def _purge_dependents(wiki_client, graph, upload_log):
+    stale = stale_dependents(graph, upload_log)
+    log.info(f"{len(upload_log.finished)} pages uploaded, purging {len(stale)} "
+             f"pages transcluding them")
+    if stale:
+        purged = purge_pages(wiki_client, stale)
+        log.info(f"purged {purged}/{len(stale)} pages")
+
+
+def _enable_metrics(context, metrics_path, metrics_interval, progress):
+    run_metrics = metrics.enable()
+    if metrics_path is not None:
+        context.call_on_close(lambda: _finish_metrics(metrics_path))
+        if metrics_interval > 0:
+            writer = MetricsWriter(run_metrics, metrics_path, metrics_interval).start()
+            context.call_on_close(writer.stop)
+    if progress:
+        context.call_on_close(Progress(run_metrics).start().stop)
+
+
+def _finish_metrics(metrics_path):
+    run_metrics = metrics.disable()
+    if run_metrics is not None:
+        write_metrics(run_metrics, metrics_path)
+        log.info(f"metrics written to {metrics_path}")
+
+
+def _log_cache_stats(registry):
+    if registry is not None:
+        for cache in (registry.caches or {}).values():
+            log.info(repr(cache))
+    if templates.fragment_cache.hits or templates.fragment_cache.misses:
+        log.info(repr(templates.fragment_cache))
+
+
+def _finish_profile(profile_output):
+    profiler = profiling.disable()
+    if profiler is None:
+        return
+    click.echo(profiler.summary(), err=True)
+    if profile_output is not None:
+        profiler.cprofile.dump_stats(profile_output)
+        click.echo(f"cProfile stats written to {profile_output}", err=True)
+
+
 def _wiki_upload_page(wiki_client, csrf_token, page_title, page_content):
     wiki_client.edit(csrf_token, page_title, page_content)
     log.info(f"Upload okay: {page_title}")
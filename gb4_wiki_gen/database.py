@@ -4,10 +4,15 @@ from pathlib import Path
 
 import argparse
 
+from gb4_wiki_gen import profiling
+from gb4_wiki_gen.id_index import IdIndex
+from gb4_wiki_gen.integrity import check_integrity
+from gb4_wiki_gen.skill_index import SkillIndex, SkillTitles
 from gb4_wiki_gen.models import DataTable, BaseRowType, \
     DataMSList, DataItemGunplaBox, DataPartsParameter, DataSkillIdInfoData, \
     DataEquipParameter, MissionRewardTable, MSListTable, \
-    DerivedSynthesizeParameterTable, ItemGunplaBoxTable
+    DerivedSynthesizeParameterTable, ItemGunplaBoxTable, Registry, UField, UReference, \
+    UReferenceObjectArray
 
 data_sources = {
     "GB4/Content/Text/en/Common/localized_text_ability_cartridge_name.json": (
@@ -41,7 +46,7 @@ data_sources = {
         BaseRowType,
     ),
     "GB4/Content/Text/en/Common/localized_text_gundam_series.json": (
-        BaseRowType
+        BaseRowType,
     ),
     "GB4/Content/Text/en/Menu/localized_text_story_title_name.json": (
         BaseRowType,
@@ -94,21 +99,125 @@ data_sources = {
 }
 
 
-def load_data(dir_path) -> Mapping[str, DataTable]:
-    registry = dict()
-    for path, types in data_sources.items():
-        match types:
-            case (row_type,):
-                table_type = DataTable
-            case (row_type, table_type,):
-                pass
+def row_projection(row_type) -> dict:
+    """
+    fields of `row_type` marked with ``UField(project=...)`` and the fields
+    its references resolve
+    """
+    projection = {}
+    for descriptor in vars(row_type).values():
+        if isinstance(descriptor, UField) and descriptor.project:
+            nested = descriptor.project
+            projection[descriptor._attr] = nested if isinstance(nested, dict) else None
+        elif isinstance(descriptor, UReferenceObjectArray):
+            projection.setdefault(descriptor._attr[0], None)
+        elif isinstance(descriptor, UReference) and descriptor._attr != "id":
+            projection.setdefault(descriptor._attr, None)
+    return projection
+
+
+# fields kept per table, everything else is dropped while loading. The
+# integrity check, indexes and generators only read the projected fields of
+# these tables, tables without an entry keep every field.
+projections = {
+    "PartsParameter": row_projection(DataPartsParameter),
+    "EquipParameter": row_projection(DataEquipParameter),
+    "SkillIdInfo": row_projection(DataSkillIdInfoData),
+}
+
+
+def project(value, projection):
+    if projection is None:
+        return value
+    return {
+        field: project(value[field], nested)
+        for field, nested in projection.items()
+        if field in value
+    }
+
+
+def project_rows(raw, projections):
+    """
+    replace the rows of a raw table with their projection, in place
+    """
+    projection = (projections or {}).get(raw["Name"])
+    if projection is not None:
+        raw["Rows"] = {
+            key: project(row, projection) for key, row in raw["Rows"].items()
+        }
+    return raw
+
+
+# tables whose index building reads other tables, by the tables they read
+index_dependencies = {
+    "DerivedSynthesizeParameter": ("MSList",),
+}
+
+
+def table_types(types):
+    match types:
+        case (row_type,):
+            table_type = DataTable
+        case (row_type, table_type,):
+            pass
+    return row_type, table_type
 
-        with open(Path(dir_path) / path, "r", encoding="utf8") as fp:
+
+def load_table(registry, dir_path, path) -> DataTable:
+    row_type, table_type = table_types(data_sources[path])
+    name = Path(path).stem
+    with open(Path(dir_path) / path, "r", encoding="utf8") as fp:
+        with profiling.stage(f"load.parse.{name}"):
             raw = json.load(fp)
-            table_type(registry, row_type, raw[0])
+    with profiling.stage(f"load.project.{name}"):
+        project_rows(raw[0], registry.projections)
+        registry.categories.intern(raw[0])
+    with profiling.stage(f"load.table.{name}"):
+        return table_type(registry, row_type, raw[0])
+
+
+def build_registry_indexes(registry):
+    with profiling.stage("load.integrity"):
+        registry.validity = check_integrity(registry)
+    with profiling.stage("load.id_index"):
+        registry.ids = IdIndex(registry)
+    with profiling.stage("load.skill_index"):
+        registry.skill_index = SkillIndex(registry)
+    with profiling.stage("load.skill_titles"):
+        registry.skill_titles = SkillTitles(registry)
+
+
+def load_data(dir_path, full_rows=False) -> Registry:
+    """
+    load every table of `data_sources`, rows are projected to the used
+    fields unless `full_rows` is set
+    """
+    registry = Registry()
+    registry.projections = None if full_rows else projections
+    with profiling.stage("load"):
+        for path in data_sources:
+            load_table(registry, dir_path, path)
+        build_registry_indexes(registry)
     return registry
 
 
+def reload_tables(registry, dir_path, paths) -> list[str]:
+    """
+    reload the tables of changed source files, rebuild the tables whose
+    indexes read them and the registry-wide indexes, returns the names of
+    all rebuilt tables
+    """
+    names = [load_table(registry, dir_path, path).data["Name"] for path in paths]
+    for name, dependencies in index_dependencies.items():
+        if name not in names and set(dependencies).intersection(names):
+            table = registry[name]
+            type(table)(registry, table.row_type, table.data)
+            names.append(name)
+    build_registry_indexes(registry)
+    registry.clear_caches()
+    return names
+
+
 def load_from_args() -> Mapping[str, DataTable]:
     ap = argparse.ArgumentParser()
     ap.add_argument("dir")
@@ -0,0 +1,245 @@
+"""
+Record which table rows and index entries each generated page reads.
+
+While a page is rendered inside ``DependencyTracker.track(page_key)`` every
+table lookup, membership test and index query is recorded as a
+``(table, key)`` pair, iterating a whole table is recorded as
+``(table, "*")``. After the export changes, ``affected`` maps the changed
+pairs back to the pages that read them, so only those are rendered again.
+
+The reads of computing a memoized value are kept with the value in its
+``MemoCache`` and replayed whenever a tracked page hits it.
+"""
+from contextlib import contextmanager
+
+from gb4_wiki_gen.cache import MemoCache
+from gb4_wiki_gen.models import DataTable, DerivedSynthesizeParameterTable, \
+    ItemGunplaBoxTable, MSListTable
+from gb4_wiki_gen.patching import Patches
+
+ALL = "*"
+
+# validity sets by the table of the entities they contain
+validity_tables = {
+    "suits": "MSList",
+    "boxes": "ItemGunplaBox",
+    "priced_boxes": "ItemGunplaBox",
+    "parts": "PartsParameter",
+    "equipment": "EquipParameter",
+    "skills": "SkillIdInfo",
+}
+
+# tables each page reads as its own entity, in addition to the tracked reads
+entity_tables = {
+    "suit": "MSList",
+    "kit": "ItemGunplaBox",
+    "series": "localized_text_gundam_series",
+}
+
+
+def _part_id(part):
+    return getattr(part, "id", part)
+
+
+class DependencyTracker:
+    def __init__(self):
+        self.reads = {}
+        self._pages_by_read = {}
+        self._current = None
+        self._patches = Patches()
+
+    def install(self):
+        """
+        wrap table lookups and index queries to record reads
+        """
+        self.wrap(DataTable, "__getitem__",
+                  lambda table, key: [(table.data["Name"], _part_id(key))])
+        self.wrap(DataTable, "get", lambda table, key: [(table.data["Name"], key)])
+        self.wrap(DataTable, "__contains__", lambda table, key: [(table.data["Name"], key)])
+        self.wrap(DataTable, "__iter__", lambda table: [(table.data["Name"], ALL)])
+        self.wrap(DataTable, "keys", lambda table: [(table.data["Name"], ALL)])
+        self.wrap(MSListTable, "primary_suit_by_part_id",
+                  lambda table, part: [("MSList#part", _part_id(part))])
+        self.wrap(MSListTable, "suits_by_part_id",
+                  lambda table, part: [("MSList#part", _part_id(part))])
+        self.wrap(DerivedSynthesizeParameterTable, "find_derives_from",
+                  lambda table, part_id: [("DerivedSynthesizeParameter#part", part_id)])
+        self.wrap(DerivedSynthesizeParameterTable, "find_derives_into",
+                  lambda table, part_id: [("DerivedSynthesizeParameter#part", part_id)])
+        self.wrap(ItemGunplaBoxTable, "find_by_suit_id",
+                  lambda table, suit_id: [("ItemGunplaBox#box_art", f"{suit_id}_")])
+        self.wrap(ItemGunplaBoxTable, "find_by_parts_ids",
+                  lambda table, parts_ids: [("ItemGunplaBox#item", it) for it in parts_ids])
+        self._patches.wrap(MemoCache, "get_or_compute", self._replaying)
+
+    def _replaying(self, original):
+        def get_or_compute(cache, key, compute):
+            if self._current is None:
+                return original(cache, key, compute)
+            reads = cache.reads.get(key)
+            if reads is None:
+                # computed now or before tracking, the reads are recorded once
+                outer, self._current = self._current, set()
+                try:
+                    value = compute()
+                finally:
+                    reads, self._current = self._current, outer
+                cache.reads[key] = reads
+                value = original(cache, key, lambda: value)
+            else:
+                value = original(cache, key, compute)
+            self._current.update(reads)
+            return value
+        return get_or_compute
+
+    def wrap(self, owner, attr, reads_fn):
+        """
+        replace owner.attr with a wrapper recording the reads returned by
+        `reads_fn` for the call arguments while a page is tracked
+        """
+        def make_wrapper(original):
+            def recording(*args, **kwargs):
+                if self._current is not None:
+                    self._current.update(reads_fn(*args, **kwargs))
+                return original(*args, **kwargs)
+            return recording
+
+        self._patches.wrap(owner, attr, make_wrapper)
+
+    def uninstall(self):
+        self._patches.restore()
+
+    @contextmanager
+    def track(self, page_key, implicit_reads=()):
+        """
+        record the reads of rendering one page, replacing its previous reads,
+        pages are expected to be rendered one at a time
+        """
+        reads = set(implicit_reads)
+        self._current = reads
+        try:
+            yield reads
+        finally:
+            self._current = None
+            self.forget(page_key)
+            self.reads[page_key] = reads
+            for read in reads:
+                self._pages_by_read.setdefault(read, set()).add(page_key)
+
+    def forget(self, page_key):
+        for read in self.reads.pop(page_key, ()):
+            pages = self._pages_by_read.get(read)
+            if pages is not None:
+                pages.discard(page_key)
+
+    def affected(self, changed) -> set:
+        """
+        keys of the pages that read any of the `changed` (table, key) pairs,
+        a change to any key of a table affects pages that iterated it
+        """
+        pages = set()
+        for table, key in changed:
+            pages.update(self._pages_by_read.get((table, key), ()))
+            pages.update(self._pages_by_read.get((table, ALL), ()))
+        return pages
+
+
+def row_changes(table_name, old_rows, new_rows) -> set:
+    """
+    (table, key) pairs of rows added, removed or modified between two
+    versions of a table
+    """
+    changed = {(table_name, key) for key in old_rows.keys() ^ new_rows.keys()}
+    changed.update(
+        (table_name, key)
+        for key in old_rows.keys() & new_rows.keys()
+        if old_rows[key] != new_rows[key]
+    )
+    return changed
+
+
+def index_changes(old_snapshot, new_snapshot) -> set:
+    """
+    (index, key) pairs whose lookup result differs between two index
+    snapshots, see ``DataTable.index_snapshot``
+    """
+    changed = set()
+    for index_name in old_snapshot.keys() | new_snapshot.keys():
+        old_index = old_snapshot.get(index_name, {})
+        new_index = new_snapshot.get(index_name, {})
+        changed.update(
+            (index_name, key)
+            for key in old_index.keys() | new_index.keys()
+            if old_index.get(key) != new_index.get(key)
+        )
+    return changed
+
+
+def validity_changes(old_validity, new_validity) -> set:
+    """
+    entity rows whose validity changed, a page checking membership in a
+    validity set has also read the entity row itself
+    """
+    changed = set()
+    for attr, table_name in validity_tables.items():
+        ids = getattr(old_validity, attr) ^ getattr(new_validity, attr)
+        changed.update((table_name, it) for it in ids)
+    return changed
+
+
+def skill_index_changes(old_index, new_index) -> set:
+    """
+    skills whose carriers differ between two skill indexes
+    """
+    return {
+        ("SkillIndex", skill_id)
+        for skill_id in set(old_index) | set(new_index)
+        if old_index.carriers(skill_id) != new_index.carriers(skill_id)
+    }
+
+
+def skill_title_changes(old_titles, new_titles) -> set:
+    """
+    skill page titles whose skills differ between two versions
+    """
+    return {
+        ("SkillTitle", title)
+        for title in set(old_titles) | set(new_titles)
+        if old_titles.skill_ids_of(title) != new_titles.skill_ids_of(title)
+    }
+
+
+def implicit_reads(registry, key, item):
+    """
+    reads of a planned page that happen outside of tracked lookups
+    """
+    page_type, entity_id = key
+    if page_type in entity_tables:
+        return [(entity_tables[page_type], entity_id)]
+    if page_type == "equipment":
+        return [("EquipParameter", item[1]["equip"].id)]
+    if page_type == "skills":
+        # skills sharing the name share the page and its carriers
+        title = registry.skill_titles.title(entity_id)
+        skill_ids = registry.skill_titles.skill_ids_of(title) or [entity_id]
+        return [("SkillIdInfo", entity_id), ("SkillTitle", title)] + [
+            ("SkillIndex", skill_id) for skill_id in skill_ids
+        ]
+    # the mission rewards page resolves names through the id index
+    return [(table_name, ALL) for table_name in registry]
+
+
+def _equipment_fingerprint(entry):
+    return entry["equip"].id, entry.get("suits"), entry.get("kits")
+
+
+def changed_equipment_entries(old_planned, new_planned) -> set:
+    """
+    keys of equipment pages planned in both versions whose collected suits
+    or kits differ, these are gathered while planning and not tracked
+    """
+    return {
+        key for key, (_, item) in new_planned.items()
+        if key[0] == "equipment" and key in old_planned
+        and _equipment_fingerprint(item[1]) != _equipment_fingerprint(old_planned[key][1][1])
+    }
@@ -0,0 +1,134 @@
+"""
+Diff two game exports and find the pages affected by the changes.
+
+Rows of every ``data_sources`` table are hashed in both exports. The older
+export is loaded on top of the newer one: rows with equal hashes reuse the
+newer row objects, so only changed rows take memory of their own. Affected
+pages are found by rendering the newer export under dependency tracking and
+matching the reads of each page against changed rows, index entries and
+validity sets.
+"""
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from gb4_wiki_gen.database import build_registry_indexes, data_sources, project_rows, \
+    table_types
+from gb4_wiki_gen.dependencies import DependencyTracker, changed_equipment_entries, \
+    implicit_reads, index_changes, skill_index_changes, skill_title_changes, validity_changes
+from gb4_wiki_gen.models import Registry
+from gb4_wiki_gen.pages import plan_pages_by_key
+from gb4_wiki_gen.pipeline import is_page
+
+log = logging.getLogger(__name__)
+
+DIFF_PAGE_TYPES = ("suit", "kit", "equipment")
+
+
+def row_hash(row):
+    return hashlib.blake2b(
+        json.dumps(row, sort_keys=True, ensure_ascii=False).encode("utf8"),
+        digest_size=16
+    ).digest()
+
+
+@dataclass
+class TableDiff:
+    name: str
+    added: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    modified: list = field(default_factory=list)
+    shared: int = 0
+
+    @property
+    def changed_keys(self):
+        return self.added + self.removed + self.modified
+
+
+@dataclass
+class AffectedPages:
+    added: dict = field(default_factory=dict)
+    removed: list = field(default_factory=list)
+    changed: dict = field(default_factory=dict)
+
+
+def load_shared(new_registry, old_dir) -> tuple[Registry, list[TableDiff]]:
+    """
+    load the export in `old_dir`, sharing rows equal to those of
+    `new_registry`, returns the old registry and the row diff per table
+    """
+    old_registry = Registry()
+    old_registry.projections = new_registry.projections
+    diffs = []
+    for path, types in data_sources.items():
+        with open(Path(old_dir) / path, "r", encoding="utf8") as fp:
+            raw = project_rows(json.load(fp)[0], old_registry.projections)
+        old_registry.categories.intern(raw)
+        name = raw["Name"]
+        new_rows = new_registry[name].data["Rows"]
+        old_rows = raw["Rows"]
+        diff = TableDiff(name)
+        for key, row in old_rows.items():
+            new_row = new_rows.get(key)
+            if new_row is None:
+                diff.removed.append(key)
+            elif row_hash(row) == row_hash(new_row):
+                old_rows[key] = new_row
+                diff.shared += 1
+            else:
+                diff.modified.append(key)
+        diff.added = [key for key in new_rows if key not in old_rows]
+        diffs.append(diff)
+
+        row_type, table_type = table_types(types)
+        table_type(old_registry, row_type, raw)
+    build_registry_indexes(old_registry)
+    return old_registry, diffs
+
+
+def changed_reads(old_registry, new_registry, diffs) -> set:
+    changed = set()
+    for diff in diffs:
+        changed.update((diff.name, key) for key in diff.changed_keys)
+        changed |= index_changes(old_registry[diff.name].index_snapshot(),
+                                 new_registry[diff.name].index_snapshot())
+    changed |= validity_changes(old_registry.validity, new_registry.validity)
+    changed |= skill_index_changes(old_registry.skill_index, new_registry.skill_index)
+    changed |= skill_title_changes(old_registry.skill_titles, new_registry.skill_titles)
+    return changed
+
+
+def affected_pages(old_registry, new_registry, diffs, wiki_namespace="Generated",
+                   page_types=DIFF_PAGE_TYPES) -> AffectedPages:
+    """
+    pages added, removed and changed between the exports, added and changed
+    pages by page key with their title in the newer export
+    """
+    old_planned = plan_pages_by_key(old_registry, wiki_namespace, page_types)
+    new_planned = plan_pages_by_key(new_registry, wiki_namespace, page_types)
+
+    tracker = DependencyTracker()
+    tracker.install()
+    titles = {}
+    try:
+        for key, (make_page, item) in new_planned.items():
+            with tracker.track(key, implicit_reads(new_registry, key, item)):
+                page = make_page(item)
+            if is_page(page):
+                titles[key] = page[0]
+    finally:
+        tracker.uninstall()
+
+    changed_keys = tracker.affected(changed_reads(old_registry, new_registry, diffs))
+    changed_keys |= changed_equipment_entries(old_planned, new_planned)
+    added_keys = new_planned.keys() - old_planned.keys()
+    return AffectedPages(
+        added={key: titles.get(key) for key in sorted(added_keys)},
+        removed=sorted(old_planned.keys() - new_planned.keys()),
+        changed={
+            key: titles.get(key)
+            for key in sorted(changed_keys - added_keys)
+        },
+    )
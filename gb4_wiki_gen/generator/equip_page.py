@@ -1,3 +1,6 @@
+from gb4_wiki_gen.cache import memoize
+from gb4_wiki_gen.categories import EQUIP_SKILL_BUCKETS
+from gb4_wiki_gen.integrity import equip_name_table
 from gb4_wiki_gen.models import DataEquipParameter, DataTableIndexError
 from gb4_wiki_gen.templates import template_env
 from gb4_wiki_gen.utils import slugify
@@ -6,12 +9,11 @@ from gb4_wiki_gen.utils import slugify
 def collect_equipment(registry):
     mslist = registry["MSList"]
     boxes = registry["ItemGunplaBox"]
+    valid_suits = registry.validity.suits
+    valid_boxes = registry.validity.boxes
     equipment = {}
     for suit in mslist:
-        # check for valid suits
-        try:
-            suit.ms_name_localized._text
-        except (DataTableIndexError, AttributeError):
+        if suit.id not in valid_suits:
             continue
 
         for equip in suit.equip_params:
@@ -21,9 +23,7 @@ def collect_equipment(registry):
             entry_suits[suit.gradeless_id] = suit.ms_name_localized._text
 
     for box in boxes:
-        try:
-            box.name_localized
-        except (DataTableIndexError, AttributeError):
+        if box.id not in valid_boxes:
             continue
 
         for equip in box.items_equip_parameters:
@@ -59,40 +59,25 @@ def make_equip_page_content(registry, entry, wiki_namespace):
     return page_slug, page_content
 
 
+@memoize("equip_data", key=lambda equip_params: equip_params.id)
 def make_equip_data(equip_params: DataEquipParameter):
     if equip_params is None:
         return None
 
-    normal_skills = []
-    ex_skills = []
-    op_skills = []
-    awaken_skills = []
+    skills = {bucket: [] for bucket in EQUIP_SKILL_BUCKETS}
+
+    if equip_params.id not in equip_params.registry.validity.equipment:
+        raise DataTableIndexError(
+            equip_name_table(equip_params.data), equip_params.parts_name)
 
     for skill_data in equip_params.skill_array_data:
-        try:
-            skill_data.ui_name_localized
-            skill_data.ui_info_localized
-            equip_params.name_localized
-        except DataTableIndexError:
+        category = skill_data.ability_cartridge_category
+        if category.bucket is None:
             continue
-        ns, ability_type = skill_data.ability_cartridge_category.split("::")
-        item = {
+        skills[category.bucket].append({
             "name": skill_data.ui_name_localized,
             "info": skill_data.ui_info_localized,
-            "ability_type": ability_type,
-        }
-        if "NML_" in ability_type:
-            normal_skills.append(item)
-
-        elif "ORIGINAL" in ability_type:
-            awaken_skills.append(item)
-
-        elif "EX" in ability_type:
-            ex_skills.append(item)
-
-        elif "OP" in ability_type:
-            op_skills.append(item)
-
-    ns, equip_type = equip_params.parts_category.split("::")
+            "ability_type": category.display,
+        })
 
-    return equip_type, equip_params.name_localized, (normal_skills, ex_skills, op_skills, awaken_skills)
+    return equip_params.parts_category.display, equip_params.name_localized, tuple(skills.values())
@@ -29,7 +29,7 @@ def make_kit_parts(kit):
     for part in kit.items_parts_parameters:
         if part is None:
             continue
-        part_type = part.other["_PerformanceGroupName"].replace("Parts", "")
+        part_type = part.other["_PerformanceGroupName"].display
         part_name = part.parts_name_localized._text
         suit = kit.registry["MSList"].primary_suit_by_part_id(part)
         suit_name = suit.ms_name_localized._text
@@ -0,0 +1,31 @@
+from gb4_wiki_gen.models import DataTableIndexError
+
+
+def make_mission_rewards_page_content(registry, wiki_namespace):
+    mission_reward_table = registry["MissionRewardTable"]
+    story_names = registry["localized_text_story_title_name"]
+
+    def get_reward_name(reward_id):
+        return registry.ids.name(reward_id, reward_id)
+
+    def get_mission_name(mission_reward_id: str) -> str:
+        try:
+            story_name_key = mission_reward_id.replace("MissionReward", "TextId")
+            return story_names[story_name_key]._text
+        except DataTableIndexError:
+            return mission_reward_id
+
+    lines = ["= Mission Rewards ="]
+    for reward_id, mission_list in mission_reward_table.reward_item_mapped.items():
+        reward_name = str(get_reward_name(reward_id)).replace("\n", " ")
+
+        lines.append(f"== {reward_name} ==")
+        for mission_id in mission_list:
+            mission_name = get_mission_name(mission_id)
+            if mission_name == mission_id:
+                lines.append(f"* {mission_name}")
+            else:
+                lines.append(f"* '''{mission_name}''' ")
+
+    page_title = f"{wiki_namespace}:Mission_Rewards"
+    return page_title, "\n".join(lines) + "\n"
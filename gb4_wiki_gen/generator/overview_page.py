@@ -0,0 +1,283 @@
+"""
+List pages aggregating all suits, kits, equipment and parts.
+
+``walk_registry`` resolves every suit, kit, equipment entry and part once
+into a small record and passes it to every view accumulating that kind, so
+all views are built in a single pass. A view groups the records it receives
+and renders one sortable wikitable per group; adding a view to
+``OVERVIEWS`` adds a page, not a pass.
+"""
+import logging
+
+from slugify import slugify
+
+from gb4_wiki_gen.generator.equip_page import collect_equipment
+from gb4_wiki_gen.generator.suit_page import make_part_skill_data
+from gb4_wiki_gen.pages import select_kit_ids, select_suit_ids
+from gb4_wiki_gen.templates import template_env
+from gb4_wiki_gen.utils import slugify as slugify_title
+
+log = logging.getLogger(__name__)
+
+GRADES = ("HG", "MG", "SD")
+UNKNOWN_GROUP = "Unknown"
+
+
+def link(page_title, text):
+    return f"[[{page_title}|{text}]]"
+
+
+class Overview:
+    """
+    one aggregate view: records of `kind` grouped by `group`, one table per
+    group with `columns`, (header, value of record) pairs
+    """
+    kind: str
+    title: str
+    heading: str
+    group_header: str
+    columns: tuple
+
+    def __init__(self):
+        self.groups = {}
+
+    def group(self, record):
+        raise NotImplementedError
+
+    def add(self, record):
+        # eg. suits without unique parts have no series
+        group = self.group(record)
+        if group is None:
+            group = UNKNOWN_GROUP
+        self.groups.setdefault(group, []).append(record)
+
+    def sort_key(self, record):
+        return record["name"]
+
+    def summary(self, records):
+        """
+        summary columns of a group besides its size
+        """
+        return {}
+
+    def render(self, wiki_namespace):
+        template = template_env.get_template("overview_page.jinja2")
+        groups = []
+        for name in sorted(self.groups):
+            records = sorted(self.groups[name], key=self.sort_key)
+            groups.append({
+                "name": name,
+                "count": len(records),
+                "summary": self.summary(records),
+                "rows": [[value(it) for _, value in self.columns] for it in records],
+            })
+        page_title = f"{wiki_namespace}:{self.title}"
+        page_content = template.render(
+            HEADING=self.heading,
+            GROUP_HEADER=self.group_header,
+            SUMMARY_HEADERS=list(groups[0]["summary"]) if groups else [],
+            COLUMNS=[header for header, _ in self.columns],
+            GROUPS=groups,
+        )
+        return page_title, page_content
+
+
+class SuitsBySeries(Overview):
+    kind = "suit"
+    title = "Suits_by_Series"
+    heading = "Suits by Series"
+    group_header = "Series"
+    columns = (
+        ("Suit", lambda it: it["link"]),
+        ("Number", lambda it: it["number"]),
+        ("Grades", lambda it: " ".join(it["grades"])),
+    )
+
+    def group(self, record):
+        return record["series"]
+
+
+class KitsByGrade(Overview):
+    kind = "kit"
+    title = "Kits_by_Grade"
+    heading = "Kits by Grade"
+    group_header = "Grade"
+    columns = (
+        ("Kit", lambda it: it["link"]),
+        ("Series", lambda it: it["series"]),
+        ("Price", lambda it: it["price"]),
+    )
+
+    def group(self, record):
+        return record["grade"]
+
+    def sort_key(self, record):
+        return record["price"], record["name"]
+
+    def summary(self, records):
+        prices = [it["price"] for it in records]
+        return {
+            "Lowest price": min(prices),
+            "Average price": round(sum(prices) / len(prices)),
+            "Highest price": max(prices),
+        }
+
+
+class EquipmentByCategory(Overview):
+    kind = "equipment"
+    title = "Equipment_by_Category"
+    heading = "Equipment by Category"
+    group_header = "Category"
+    columns = (
+        ("Equipment", lambda it: it["link"]),
+        ("Suits", lambda it: it["suits"]),
+        ("Kits", lambda it: it["kits"]),
+    )
+
+    def group(self, record):
+        return record["category"]
+
+
+class PartsBySlot(Overview):
+    kind = "part"
+    title = "Parts_by_Slot"
+    heading = "Parts by Slot"
+    group_header = "Slot"
+    columns = (
+        ("Part", lambda it: it["name"]),
+        ("Suit", lambda it: it["suit_link"]),
+        ("EX Skills", lambda it: it["skills"][0]),
+        ("OP Skills", lambda it: it["skills"][1]),
+        ("Awaken Skills", lambda it: it["skills"][2]),
+    )
+
+    def group(self, record):
+        return record["slot"]
+
+
+OVERVIEWS = (SuitsBySeries, KitsByGrade, EquipmentByCategory, PartsBySlot)
+
+
+def suit_ids(registry):
+    return [it for it in select_suit_ids(registry, ["all"]) if it in registry.validity.suits]
+
+
+def suit_record(registry, suit_id, wiki_namespace):
+    mslist = registry["MSList"]
+    suit = mslist[suit_id]
+    name = suit.ms_name_localized._text
+    page_slug = slugify(name, separator="_", lowercase=False)
+    return {
+        "name": name,
+        "link": link(f"{wiki_namespace}:{page_slug}", name),
+        "number": suit.ms_number_localized._text,
+        "series": suit.series_localized,
+        "grades": [
+            grade for grade, present in zip(GRADES, mslist.grade_variants(suit)) if present
+        ],
+    }
+
+
+def kit_ids(registry):
+    return [
+        it for it in select_kit_ids(registry, ["all"]) if it in registry.validity.priced_boxes
+    ]
+
+
+def kit_record(registry, kit_id, wiki_namespace):
+    kit = registry["ItemGunplaBox"][kit_id]
+    grade = kit.box_art_id[:2]
+    page_slug = slugify(kit.name_localized, separator="_", lowercase=False)
+    return {
+        "name": kit.name_localized,
+        "link": link(f"{wiki_namespace}:Kit_{grade}_{page_slug}", kit.name_localized),
+        "grade": grade,
+        "series": kit.gundam_series_name_localized._text,
+        "price": kit.shop_item.price,
+    }
+
+
+def equipment_ids(registry):
+    return [
+        entry for entry in collect_equipment(registry).values()
+        if entry["equip"].id in registry.validity.equipment
+    ]
+
+
+def equipment_record(registry, entry, wiki_namespace):
+    equip = entry["equip"]
+    name = equip.name_localized
+    return {
+        "name": name,
+        "link": link(f"{wiki_namespace}:{slugify_title(name)}", name),
+        "category": equip.parts_category.display,
+        "suits": len(entry.get("suits", ())),
+        "kits": len(entry.get("kits", ())),
+    }
+
+
+def part_ids(registry):
+    return sorted(registry.validity.parts)
+
+
+def part_record(registry, part_id, wiki_namespace):
+    part = registry["PartsParameter"][part_id]
+    try:
+        suit = registry["MSList"].primary_suit_by_part_id(part_id)
+    except KeyError:
+        suit = None
+    suit_link = ""
+    if suit is not None and suit.id in registry.validity.suits:
+        suit_name = suit.ms_name_localized._text
+        page_slug = slugify(suit_name, separator="_", lowercase=False)
+        suit_link = link(f"{wiki_namespace}:{page_slug}", suit_name)
+    skills = make_part_skill_data(part) or ((), (), ())
+    return {
+        "name": part.parts_name_localized._text,
+        "slot": part.other["_PerformanceGroupName"].display,
+        "suit_link": suit_link,
+        "skills": [
+            "<br>".join(it["name"] for it in bucket if it["name"]) for bucket in skills
+        ],
+    }
+
+
+# items and record factory per kind
+record_sources = {
+    "suit": (suit_ids, suit_record),
+    "kit": (kit_ids, kit_record),
+    "equipment": (equipment_ids, equipment_record),
+    "part": (part_ids, part_record),
+}
+
+
+def walk_registry(registry, wiki_namespace, overviews):
+    """
+    resolve every record once and add it to each of `overviews` of its kind,
+    kinds no overview accumulates are not walked
+    """
+    by_kind = {}
+    for overview in overviews:
+        by_kind.setdefault(overview.kind, []).append(overview)
+    for kind, kind_overviews in by_kind.items():
+        items, make_record = record_sources[kind]
+        count = 0
+        for item in items(registry):
+            try:
+                record = make_record(registry, item, wiki_namespace)
+            except Exception:
+                log.exception(f"failed making {kind} record {item}")
+                continue
+            count += 1
+            for overview in kind_overviews:
+                overview.add(record)
+        log.info(f"aggregated {count} {kind} records into {len(kind_overviews)} views")
+    return overviews
+
+
+def make_overview_pages(registry, wiki_namespace, overview_types=OVERVIEWS):
+    """
+    (title, content) of every overview page, built in one pass
+    """
+    overviews = walk_registry(registry, wiki_namespace, [it() for it in overview_types])
+    return [overview.render(wiki_namespace) for overview in overviews]
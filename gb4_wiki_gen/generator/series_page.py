@@ -0,0 +1,24 @@
+from gb4_wiki_gen.utils import slugify
+
+
+def make_series_page_content(series_item, wiki_namespace):
+    page_name = slugify(series_item._text)
+    page_title = f"{wiki_namespace}:{page_name}"
+    page_content = (
+        "<includeonly>\n"
+        '<div class="series-include">\n'
+        f"[[File:GB4_Icon_Series_{page_name}.png|left|frameless]]\n <span>[[{wiki_namespace}:{page_name}|{series_item._text}]]</span>\n"
+        "</div>\n"
+        "</includeonly>\n"
+        "<noinclude>\n"
+        f"= {series_item._text} =\n\n"
+        "[[Category:Gundam Breaker 4]]\n"
+        "[[Category:Series]]\n"
+        "</noinclude>\n"
+    )
+    return page_title, page_content
+
+
+def make_series_pages(registry, wiki_namespace):
+    for item in registry["localized_text_gundam_series"]:
+        yield make_series_page_content(item, wiki_namespace)
@@ -0,0 +1,86 @@
+from gb4_wiki_gen.skill_index import SkillCarriers
+from gb4_wiki_gen.templates import template_env
+from gb4_wiki_gen.utils import slugify
+
+
+def skill_page_ids(registry):
+    """
+    ids of localized skills granted by at least one part or equipment,
+    one per page title, ordered by ability cartridge category and name
+    """
+    return registry.skill_titles.page_ids()
+
+
+def make_skill_parts(registry, part_ids):
+    parts_table = registry["PartsParameter"]
+    mslist = registry["MSList"]
+    valid_suits = registry.validity.suits
+    parts = []
+    for part_id in part_ids:
+        if part_id not in registry.validity.parts:
+            continue
+        part = parts_table[part_id]
+        try:
+            suit = mslist.primary_suit_by_part_id(part_id)
+        except KeyError:
+            suit = None
+        parts.append({
+            "name": part.parts_name_localized._text,
+            "type": part.other["_PerformanceGroupName"].display,
+            "suit_name": suit.ms_name_localized._text if suit and suit.id in valid_suits else None,
+        })
+    return parts
+
+
+def make_skill_equipment(registry, equip_ids):
+    equip_table = registry["EquipParameter"]
+    names = {}
+    for equip_id in equip_ids:
+        if equip_id in registry.validity.equipment:
+            names.setdefault(equip_table[equip_id].name_localized, None)
+    return list(names)
+
+
+def merge_carriers(registry, skill_ids) -> SkillCarriers:
+    """
+    carriers of all `skill_ids`, in order and without duplicates
+    """
+    merged = SkillCarriers({}, {}, {}, {})
+    for skill_id in skill_ids:
+        carriers = registry.skill_index.carriers(skill_id)
+        for merged_ids, ids in zip(merged, carriers):
+            merged_ids.update(dict.fromkeys(ids))
+    return SkillCarriers(*(list(ids) for ids in merged))
+
+
+def make_skill_page_content(registry, skill_id, wiki_namespace):
+    template = template_env.get_template("skill_page.jinja2")
+    skill = registry["SkillIdInfo"][skill_id]
+    mslist = registry["MSList"]
+    boxes = registry["ItemGunplaBox"]
+    skill_name = skill.ui_name_localized
+    page_title = f"{wiki_namespace}:Skill_{slugify(skill_name)}"
+    carriers = merge_carriers(
+        registry, registry.skill_titles.skill_ids_of(slugify(skill_name)) or [skill_id]
+    )
+
+    page_content = template.render(
+        WIKI_NAMESPACE=wiki_namespace,
+        PAGE_TITLE=page_title,
+        SKILL_NAME=skill_name,
+        SKILL_INFO=skill.ui_info_localized,
+        ABILITY_TYPE=skill.ability_cartridge_category.display,
+        PARTS=make_skill_parts(registry, carriers.parts),
+        EQUIPMENT=make_skill_equipment(registry, carriers.equipment),
+        SUITS=[
+            mslist[suit_id].ms_name_localized._text
+            for suit_id in carriers.suits
+            if suit_id in registry.validity.suits
+        ],
+        KITS=[
+            (boxes[box_id].box_art_id[:2], boxes[box_id].name_localized)
+            for box_id in carriers.kits
+            if box_id in registry.validity.priced_boxes
+        ],
+    )
+    return page_title, page_content
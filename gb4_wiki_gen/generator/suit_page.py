@@ -1,32 +1,27 @@
 from slugify import slugify
 
+from gb4_wiki_gen.cache import memoize
+from gb4_wiki_gen.categories import PART_SKILL_BUCKETS
 from gb4_wiki_gen.models import DataTableIndexError, DataPartsParameter, \
     DataMSList
 from gb4_wiki_gen.templates import template_env
 
 
+@memoize("part_skill_data", key=lambda part_param: part_param.id)
 def make_part_skill_data(part_param: DataPartsParameter):
-    ex_skills = []
-    op_skills = []
-    awaken_skills = []
+    skills = {bucket: [] for bucket in PART_SKILL_BUCKETS}
 
     for skill_data in part_param.skill_array_data:
-        ns, ability_type = skill_data.ability_cartridge_category.split("::")
-        item = {
+        category = skill_data.ability_cartridge_category
+        if category.part_bucket is None:
+            continue
+        skills[category.part_bucket].append({
             "name": skill_data.ui_name_localized,
             "info": skill_data.ui_info_localized,
-            "ability_type": ability_type
-        }
-        if "ORIGINAL" in ability_type:
-            awaken_skills.append(item)
-
-        elif "EX" in ability_type:
-            ex_skills.append(item)
-
-        elif "OP" in ability_type:
-            op_skills.append(item)
-    if ex_skills or op_skills or awaken_skills:
-        return ex_skills, op_skills, awaken_skills
+            "ability_type": category.display
+        })
+    if any(skills.values()):
+        return tuple(skills.values())
     return None
 
 
@@ -44,7 +39,7 @@ def make_derive_from_data(suit):
     for part_id in suit.unique_parts_ids:
         part_id = part_id.replace("MG_", "HG_")
         for result_id, source1_id, source2_id in synthesis_table.find_derives_from(part_id):
-            part_type = part_param_table[result_id].other["_PerformanceGroupName"].replace("Parts", "")
+            part_type = part_param_table[result_id].other["_PerformanceGroupName"].display
             recipes.setdefault(part_type, []).append(
                 {
                     "result_part_name": part_param_table[result_id].parts_name_localized._text,
@@ -67,7 +62,7 @@ def make_derive_into_data(suit: DataMSList):
     for part_id in suit.unique_parts_ids:
         part_id = part_id.replace("MG_", "HG_")
         for result_id, source1_id, source2_id in synthesis_table.find_derives_into(part_id):
-            part_type = part_param_table[result_id].other["_PerformanceGroupName"].replace("Parts", "")
+            part_type = part_param_table[result_id].other["_PerformanceGroupName"].display
             if source1_id == part_id:
                 base_id = source1_id
                 material_id = source2_id
@@ -90,24 +85,22 @@ def make_derive_into_data(suit: DataMSList):
 def make_box_price(grade, suit):
     registry = suit.registry
     boxes_table = registry["ItemGunplaBox"]
+    priced_boxes = registry.validity.priced_boxes
     if not suit.id.startswith(f"{grade}_"):
-        try:
-            gradeless_id = suit.id[3:]
-            grade_suit_id = f"{grade}_{gradeless_id}"
-            suit = registry["MSList"][grade_suit_id]
-        except DataTableIndexError:
+        grade_suit_id = f"{grade}_{suit.gradeless_id}"
+        if grade_suit_id not in registry["MSList"]:
             return []
+        suit = registry["MSList"][grade_suit_id]
     boxes = []
     unique_parts_ids = suit.unique_parts_ids
     for box in boxes_table.find_by_parts_ids(unique_parts_ids):
-        try:
-            boxes.append({
-                "grade": grade,
-                "name": box.name_localized,
-                "price": box.shop_item.price
-            })
-        except DataTableIndexError:
-            pass
+        if box.id not in priced_boxes:
+            continue
+        boxes.append({
+            "grade": grade,
+            "name": box.name_localized,
+            "price": box.shop_item.price
+        })
     return boxes
 
 
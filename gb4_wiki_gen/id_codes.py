@@ -0,0 +1,49 @@
+"""
+Registry-wide dictionary of compact integer codes for string ids.
+
+Table indexes store the codes of part, suit and box ids in ``array``
+columns instead of tuples and lists of strings, and decode them back to ids
+only when a lookup returns. Codes are assigned on first use and never
+reused, so they stay valid while tables are reloaded in watch mode. Codes
+are local to one registry, compare decoded ids across registries.
+"""
+from array import array
+
+
+def int_array(values=()) -> array:
+    return array("i", values)
+
+
+class IdCodes:
+    def __init__(self):
+        self._codes = {}
+        self._ids = []
+
+    def code(self, id) -> int:
+        """
+        code of `id`, assigning the next free code to unseen ids
+        """
+        code = self._codes.get(id)
+        if code is None:
+            code = self._codes[id] = len(self._ids)
+            self._ids.append(id)
+        return code
+
+    def get(self, id):
+        """
+        code of `id`, or None for ids that were never assigned one
+        """
+        return self._codes.get(id)
+
+    def decode(self, code):
+        return self._ids[code]
+
+    def decode_all(self, codes) -> list:
+        ids = self._ids
+        return [ids[code] for code in codes]
+
+    def __contains__(self, id):
+        return id in self._codes
+
+    def __len__(self):
+        return len(self._ids)
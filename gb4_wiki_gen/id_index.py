@@ -0,0 +1,115 @@
+"""
+Registry-wide index of row ids.
+
+Maps any id to the tables that own it and the kind of entity, and to its
+localized name, so callers resolve an id with a single lookup instead of
+probing tables one after another.
+"""
+from typing import NamedTuple
+
+from gb4_wiki_gen.integrity import equip_name_table
+
+
+class IdOwner(NamedTuple):
+    table: str
+    kind: str
+
+
+table_kinds = {
+    "MSList": "suit",
+    "PartsParameter": "part",
+    "EquipParameter": "equipment",
+    "SkillIdInfo": "skill",
+    "ItemGunplaBox": "kit",
+    "ShopGoodsTable": "shop_goods",
+    "DerivedSynthesizeParameter": "derive",
+    "MissionRewardTable": "mission_reward",
+    "MissionListTable": "mission",
+    "PartsIdList": "part_id_list",
+    "AbilityCartridge": "ability_cartridge",
+    "AbilityInfo": "ability",
+    "AbilityPerformance": "ability_performance",
+    "EquipAttachParameter": "equip_attach",
+    "EquipPerformance": "equip_performance",
+}
+
+# localized tables keyed by the id they name, in order of precedence when an
+# id appears in more than one
+name_tables = (
+    "localized_text_preset_character_name",
+    "localized_text_parts_name",
+    "localized_text_weapon_name",
+    "localized_text_shield_name",
+    "localized_text_bparts_name",
+    "localized_text_gundam_series",
+    "localized_text_ability_cartridge_name",
+)
+
+
+class IdIndex:
+    def __init__(self, registry):
+        self._owners = {}
+        self._names = {}
+        self.init_owners(registry)
+        self.init_names(registry)
+
+    def init_owners(self, registry):
+        for table_name, table in registry.items():
+            if table_name.startswith("localized_text_"):
+                owner = IdOwner(table_name, "text")
+            else:
+                owner = IdOwner(table_name, table_kinds.get(table_name, "row"))
+            for key in table.keys():
+                self._owners.setdefault(key, []).append(owner)
+
+    def init_names(self, registry):
+        names = self._names
+        for table_name in name_tables:
+            for key, row in registry[table_name].rows.items():
+                names.setdefault(key, row["_text"])
+
+        # entities whose name is keyed by a field rather than their own id
+        parts_names = registry["localized_text_parts_name"].rows
+        for part_id, row in registry["PartsParameter"].rows.items():
+            text = parts_names.get(row["_PartsName"])
+            if text is not None:
+                names.setdefault(part_id, text["_text"])
+
+        for equip_id, row in registry["EquipParameter"].rows.items():
+            text = registry[equip_name_table(row)].rows.get(row["_PartsName"])
+            if text is not None:
+                names.setdefault(equip_id, text["_text"])
+
+        skill_names = registry["localized_text_skill_name"].rows
+        for skill_id, row in registry["SkillIdInfo"].rows.items():
+            for item in row["_UiInfoArray"][:1]:
+                text = skill_names.get(item["_TextId"])
+                if text is not None:
+                    names.setdefault(skill_id, text["_text"])
+
+        suit_names = registry["localized_text_preset_character_name"].rows
+        for box_id, row in registry["ItemGunplaBox"].rows.items():
+            text = suit_names.get(row["_BoxArtId"].rstrip("_"))
+            if text is not None:
+                names.setdefault(box_id, text["_text"])
+
+    def __contains__(self, id):
+        return id in self._owners
+
+    def __len__(self):
+        return len(self._owners)
+
+    def owners(self, id) -> list[IdOwner]:
+        return self._owners.get(id, [])
+
+    def kinds(self, id) -> set[str]:
+        return {owner.kind for owner in self.owners(id)}
+
+    def name(self, id, default=None):
+        return self._names.get(id, default)
+
+    def names(self):
+        """
+        (id, localized name) of every named id
+        """
+        return self._names.items()
@@ -0,0 +1,165 @@
+"""
+Referential integrity pass over a loaded registry.
+
+Computes which suits, boxes, parts, equipment and skills have complete
+localized and reference data, so generators can check membership in a set
+instead of probing properties for ``DataTableIndexError``. Every reference
+that points at a missing row is collected for reporting.
+"""
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class DanglingReference:
+    table: str
+    row_id: str
+    field: str
+    target_table: str
+    key: str
+
+
+@dataclass
+class Validity:
+    # suits with a localized name
+    suits: set = field(default_factory=set)
+    # boxes with a localized name
+    boxes: set = field(default_factory=set)
+    # named boxes with a shop price
+    priced_boxes: set = field(default_factory=set)
+    # parts with a localized part name
+    parts: set = field(default_factory=set)
+    # equipment with a localized weapon or shield name
+    equipment: set = field(default_factory=set)
+    # skills with localized ui name and info
+    skills: set = field(default_factory=set)
+    dangling: list = field(default_factory=list)
+
+    def summary(self):
+        return {
+            "suits": len(self.suits),
+            "boxes": len(self.boxes),
+            "priced_boxes": len(self.priced_boxes),
+            "parts": len(self.parts),
+            "equipment": len(self.equipment),
+            "skills": len(self.skills),
+            "dangling": len(self.dangling),
+        }
+
+
+SUIT_PART_FIELDS = ("_head", "_body", "_armR", "_armL", "_leg", "_backpack")
+SUIT_EQUIP_FIELDS = tuple(f"_equip{i}" for i in range(8))
+
+
+def equip_name_table(equip_row):
+    if equip_row["_PartsCategory"] == "MS_EQUIP_CATEGORY::SHIELD":
+        return "localized_text_shield_name"
+    return "localized_text_weapon_name"
+
+
+class IntegrityCheck:
+    def __init__(self, registry):
+        self.registry = registry
+        self.rows = {name: table.rows for name, table in registry.items()}
+        self.validity = Validity()
+
+    def ref(self, table, row_id, field_name, target_table, key):
+        """
+        check a reference, record it when dangling, returns whether it resolves
+        """
+        if key in self.rows[target_table]:
+            return True
+        self.validity.dangling.append(
+            DanglingReference(table, row_id, field_name, target_table, key)
+        )
+        return False
+
+    def run(self):
+        self.check_skills()
+        self.check_parts()
+        self.check_equipment()
+        self.check_suits()
+        self.check_boxes()
+        self.check_derives()
+        return self.validity
+
+    def check_skills(self):
+        for skill_id, row in self.rows["SkillIdInfo"].items():
+            text_ids = [it["_TextId"] for it in row["_UiInfoArray"]]
+            if not text_ids:
+                continue
+            # ui_name_localized/ui_info_localized only read the first entry
+            has_name = self.ref("SkillIdInfo", skill_id, "_UiInfoArray._TextId",
+                                "localized_text_skill_name", text_ids[0])
+            has_info = self.ref("SkillIdInfo", skill_id, "_UiInfoArray._TextId",
+                                "localized_text_skill_info", text_ids[0])
+            if has_name and has_info:
+                self.validity.skills.add(skill_id)
+
+    def check_skill_array(self, table, row_id, row):
+        for it in row["_SkillArray"]:
+            self.ref(table, row_id, "_SkillArray._SkillId", "SkillIdInfo", it["_SkillId"])
+
+    def check_parts(self):
+        for part_id, row in self.rows["PartsParameter"].items():
+            self.check_skill_array("PartsParameter", part_id, row)
+            self.ref("PartsParameter", part_id, "_Other._GundamSeriesName",
+                     "localized_text_gundam_series", row["_Other"]["_GundamSeriesName"])
+            if self.ref("PartsParameter", part_id, "_PartsName",
+                        "localized_text_parts_name", row["_PartsName"]):
+                self.validity.parts.add(part_id)
+
+    def check_equipment(self):
+        for equip_id, row in self.rows["EquipParameter"].items():
+            self.check_skill_array("EquipParameter", equip_id, row)
+            if self.ref("EquipParameter", equip_id, "_PartsName",
+                        equip_name_table(row), row["_PartsName"]):
+                self.validity.equipment.add(equip_id)
+
+    def check_suits(self):
+        for suit_id, row in self.rows["MSList"].items():
+            self.ref("MSList", suit_id, "id", "localized_text_ms_number", suit_id)
+            for field_name in SUIT_PART_FIELDS:
+                part_id = row[field_name]
+                if part_id == "None":
+                    continue
+                self.ref("MSList", suit_id, field_name, "PartsParameter", part_id)
+                self.ref("MSList", suit_id, field_name, "localized_text_parts_name", part_id)
+            for field_name in SUIT_EQUIP_FIELDS:
+                equip_id = row[field_name]
+                if equip_id != "None":
+                    self.ref("MSList", suit_id, field_name, "EquipParameter", equip_id)
+            if self.ref("MSList", suit_id, "id",
+                        "localized_text_preset_character_name", suit_id):
+                self.validity.suits.add(suit_id)
+
+    def check_boxes(self):
+        for box_id, row in self.rows["ItemGunplaBox"].items():
+            suit_id = row["_BoxArtId"].rstrip("_")
+            self.ref("ItemGunplaBox", box_id, "_BoxArtId", "MSList", suit_id)
+            self.ref("ItemGunplaBox", box_id, "_GundamSeriesName",
+                     "localized_text_gundam_series", row["_GundamSeriesName"])
+            for item_id in row["_ItemArray"]:
+                if item_id not in self.rows["EquipParameter"]:
+                    self.ref("ItemGunplaBox", box_id, "_ItemArray", "PartsParameter", item_id)
+            named = self.ref("ItemGunplaBox", box_id, "_BoxArtId",
+                             "localized_text_preset_character_name", suit_id)
+            priced = self.ref("ItemGunplaBox", box_id, "_ItemId",
+                              "ShopGoodsTable", row["_ItemId"])
+            if named:
+                self.validity.boxes.add(box_id)
+                if priced:
+                    self.validity.priced_boxes.add(box_id)
+
+    def check_derives(self):
+        for row_id, row in self.rows["DerivedSynthesizeParameter"].items():
+            self.ref("DerivedSynthesizeParameter", row_id, "_TargetPartsId",
+                     "MSList", row["_TargetPartsId"])
+            for it in row["_SynthesizeRecipeArray"]:
+                self.ref("DerivedSynthesizeParameter", row_id,
+                         "_SynthesizeRecipeArray._SrcPartsId1", "MSList", it["_SrcPartsId1"])
+                self.ref("DerivedSynthesizeParameter", row_id,
+                         "_SynthesizeRecipeArray._SrcPartsId2", "MSList", it["_SrcPartsId2"])
+
+
+def check_integrity(registry) -> Validity:
+    return IntegrityCheck(registry).run()
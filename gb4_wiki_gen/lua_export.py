@@ -0,0 +1,292 @@
+"""
+Scribunto data modules of the resolved suit, part, equipment, skill and kit
+data.
+
+Rows of every kind are serialized to Lua table constructors, sorted by id and
+split into chunks of at most ``max_bytes``: ``Module:<prefix>/<Kind>/<n>``.
+``Module:<prefix>/<Kind>`` maps each id to its chunk, and the accessor
+``Module:<prefix>`` reads rows through ``mw.loadData``, so page templates only
+name the row they show: ``{{#invoke:<prefix>|field|Suit|HG_exia|name}}``.
+A data update edits the few chunks whose rows changed instead of every page.
+"""
+import logging
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+from gb4_wiki_gen.categories import EQUIP_SKILL_BUCKETS, PART_SKILL_BUCKETS
+from gb4_wiki_gen.generator.equip_page import collect_equipment, make_equip_data
+from gb4_wiki_gen.generator.suit_page import make_box_price, make_derive_from_data, \
+    make_derive_into_data
+from gb4_wiki_gen.pages import select_kit_ids, select_suit_ids
+from gb4_wiki_gen.templates import fix_tags, template_env
+
+log = logging.getLogger(__name__)
+
+# chunks stay far below $wgMaxArticleSize (2MB) and below the size at which
+# editing a module gets slow
+MAX_CHUNK_BYTES = 256 * 1024
+LUA_KINDS = ("Suit", "Part", "Equipment", "Skill", "Kit")
+
+_lua_keywords = {
+    "and", "break", "do", "else", "elseif", "end", "false", "for", "function",
+    "goto", "if", "in", "local", "nil", "not", "or", "repeat", "return", "then",
+    "true", "until", "while",
+}
+_identifier = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_lua_escapes = {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_unsafe = re.compile(r'[\\"\x00-\x1f\x7f]')
+
+
+def lua_string(value) -> str:
+    return '"' + _unsafe.sub(
+        lambda m: _lua_escapes.get(m.group(), f"\\{ord(m.group()):03d}"), value
+    ) + '"'
+
+
+def lua_key(key) -> str:
+    if isinstance(key, str) and _identifier.fullmatch(key) and key not in _lua_keywords:
+        return key
+    return f"[{lua_value(key)}]"
+
+
+def lua_value(value) -> str:
+    """
+    compact Lua constructor of `value`, None fields of dicts are left out
+    """
+    if value is None:
+        return "nil"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return lua_string(value)
+    if isinstance(value, dict):
+        return "{" + ",".join(
+            f"{lua_key(key)}={lua_value(it)}" for key, it in value.items() if it is not None
+        ) + "}"
+    if isinstance(value, (list, tuple)):
+        return "{" + ",".join(lua_value(it) for it in value) + "}"
+    raise TypeError(f"no Lua value for {type(value).__name__}")
+
+
+class LuaModule(NamedTuple):
+    title: str
+    text: str
+
+
+def equip_key(equip):
+    """
+    key of the equipment row, left and right hand variants share one row
+    like they share one equipment page
+    """
+    return equip.parts_name.rstrip("L")
+
+
+def skill_ids(skill_array_data, buckets, bucket_attr):
+    skills = {bucket: [] for bucket in buckets}
+    for skill in skill_array_data:
+        bucket = getattr(skill.ability_cartridge_category, bucket_attr)
+        if bucket is not None:
+            skills[bucket].append(skill.id)
+    return {bucket: ids for bucket, ids in skills.items() if ids}
+
+
+def suit_row(registry, suit_id):
+    mslist = registry["MSList"]
+    suit = mslist[suit_id]
+    unique_part_ids = suit.unique_parts_ids
+    parts = []
+    for slot, part_id in (
+            ("Head", suit.head), ("Body", suit.body), ("ArmR", suit.arm_r),
+            ("ArmL", suit.arm_l), ("Leg", suit.leg), ("Backpack", suit.backpack)):
+        if part_id is not None:
+            parts.append({"slot": slot, "id": part_id, "unique": part_id in unique_part_ids})
+    grades = [
+        grade for grade, present in zip(("HG", "MG", "SD"), mslist.grade_variants(suit))
+        if present
+    ]
+    return {
+        "name": suit.ms_name_localized._text,
+        "number": suit.ms_number_localized._text,
+        "series": suit.series_localized,
+        "grades": grades,
+        "boxes": [
+            box for grade in ("HG", "MG", "SD") for box in make_box_price(grade, suit)
+        ],
+        "parts": parts,
+        "equipment": list(dict.fromkeys(equip_key(it) for it in suit.equip_params)),
+        "derive_from": make_derive_from_data(suit) or None,
+        "derive_into": make_derive_into_data(suit) or None,
+    }
+
+
+def part_row(registry, part_id):
+    part = registry["PartsParameter"][part_id]
+    try:
+        suit = registry["MSList"].primary_suit_by_part_id(part_id)
+    except KeyError:
+        suit = None
+    return {
+        "name": part.parts_name_localized._text,
+        "type": part.other["_PerformanceGroupName"].display,
+        "suit": suit.id if suit is not None else None,
+        "skills": skill_ids(part.skill_array_data, PART_SKILL_BUCKETS, "part_bucket"),
+    }
+
+
+def equipment_row(registry, entry):
+    equip_type, equip_name, _ = make_equip_data(entry["equip"])
+    return {
+        "name": equip_name,
+        "type": equip_type,
+        "skills": skill_ids(entry["equip"].skill_array_data, EQUIP_SKILL_BUCKETS, "bucket"),
+        "suits": list(entry.get("suits", {})),
+        "kits": [
+            {"grade": grade, "name": name} for grade, name in entry.get("kits", {}).values()
+        ],
+    }
+
+
+def skill_row(registry, skill_id):
+    skill = registry["SkillIdInfo"][skill_id]
+    carriers = registry.skill_index.carriers(skill_id)
+    validity = registry.validity
+    equip_table = registry["EquipParameter"]
+    return {
+        "name": skill.ui_name_localized,
+        "info": fix_tags(skill.ui_info_localized),
+        "type": skill.ability_cartridge_category.display,
+        "parts": [it for it in carriers.parts if it in validity.parts],
+        "equipment": list(dict.fromkeys(
+            equip_key(equip_table[it]) for it in carriers.equipment if it in validity.equipment
+        )),
+        "suits": [it for it in carriers.suits if it in validity.suits],
+        "kits": [it for it in carriers.kits if it in validity.priced_boxes],
+    }
+
+
+def kit_row(registry, kit_id):
+    kit = registry["ItemGunplaBox"][kit_id]
+    return {
+        "name": kit.name_localized,
+        "grade": kit.box_art_id[:2],
+        "price": kit.shop_item.price,
+        "series": kit.gundam_series_name_localized._text,
+        "parts": [it.id for it in kit.items_parts_parameters if it is not None],
+        "equipment": list(dict.fromkeys(
+            equip_key(it) for it in kit.items_equip_parameters if it is not None
+        )),
+    }
+
+
+def collect_rows(registry):
+    """
+    (id, row factory) per kind, with the same selection as the pages
+    """
+    validity = registry.validity
+    suit_ids = select_suit_ids(registry, ["all"])
+    # suits, kits and skills refer to parts of every grade
+    part_ids = sorted(validity.parts)
+    equipment = collect_equipment(registry)
+    kit_ids = [
+        it for it in select_kit_ids(registry, ["all"])
+        if it not in validity.boxes or it in validity.priced_boxes
+    ]
+    return {
+        "Suit": ((it, lambda it=it: suit_row(registry, it)) for it in suit_ids),
+        "Part": ((it, lambda it=it: part_row(registry, it)) for it in part_ids),
+        "Equipment": (
+            (key, lambda entry=entry: equipment_row(registry, entry))
+            for key, entry in equipment.items()
+        ),
+        "Skill": ((it, lambda it=it: skill_row(registry, it)) for it in registry.skill_titles.skill_ids),
+        "Kit": ((it, lambda it=it: kit_row(registry, it)) for it in kit_ids),
+    }
+
+
+def serialize_rows(kind, rows):
+    """
+    "[id]={...}," lines of `rows` sorted by id, rows failing to resolve are
+    logged and left out like pages failing to render
+    """
+    lines = []
+    for row_id, make_row in rows:
+        try:
+            row = make_row()
+        except Exception:
+            log.exception(f"failed making {kind} row {row_id}")
+            continue
+        lines.append((row_id, f"{lua_key(row_id)}={lua_value(row)},"))
+    lines.sort(key=lambda it: it[0])
+    return lines
+
+
+# "return {\n" ... "}\n" around the lines of a chunk
+_chunk_overhead = len("return {\n}\n")
+
+
+def chunk_lines(lines, max_bytes):
+    """
+    split (id, line) pairs into chunks of at most `max_bytes` as a module,
+    a line longer than that gets a chunk of its own
+    """
+    chunks = []
+    chunk = []
+    size = _chunk_overhead
+    for row_id, line in lines:
+        line_size = len(line.encode("utf8")) + 1
+        if chunk and size + line_size > max_bytes:
+            chunks.append(chunk)
+            chunk = []
+            size = _chunk_overhead
+        if _chunk_overhead + line_size > max_bytes:
+            log.warning(f"{row_id} takes {line_size} bytes, more than a chunk")
+        chunk.append((row_id, line))
+        size += line_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def kind_modules(prefix, kind, lines, max_bytes):
+    """
+    data chunks of `kind` and the index module mapping ids to chunk numbers
+    """
+    chunk_numbers = {}
+    for number, chunk in enumerate(chunk_lines(lines, max_bytes), 1):
+        rows = "\n".join(line for _, line in chunk)
+        yield LuaModule(f"{prefix}/{kind}/{number}", f"return {{\n{rows}\n}}\n")
+        for row_id, _ in chunk:
+            chunk_numbers[row_id] = number
+    index = "\n".join(
+        f"{lua_key(row_id)}={number}," for row_id, number in chunk_numbers.items()
+    )
+    yield LuaModule(f"{prefix}/{kind}", f"return {{\ncount={len(chunk_numbers)},\nchunks={{\n{index}\n}},\n}}\n")
+
+
+def lua_modules(registry, wiki_namespace="Generated", max_bytes=MAX_CHUNK_BYTES):
+    """
+    the accessor module, then the chunks and index of every kind
+    """
+    prefix = f"Module:{wiki_namespace}"
+    template = template_env.get_template("lua_accessor.jinja2")
+    yield LuaModule(prefix, template.render(MODULE_PREFIX=prefix, KINDS=LUA_KINDS))
+    for kind, rows in collect_rows(registry).items():
+        yield from kind_modules(prefix, kind, serialize_rows(kind, rows), max_bytes)
+
+
+def module_path(output_dir, title) -> Path:
+    """
+    "Module:Generated/Suit/1" is written to "<output_dir>/Generated/Suit/1.lua"
+    """
+    return Path(output_dir, *title.split(":", 1)[1].split("/")).with_suffix(".lua")
+
+
+def write_modules(modules, output_dir):
+    for module in modules:
+        path = module_path(output_dir, module.title)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(module.text, encoding="utf8")
+        yield module, path
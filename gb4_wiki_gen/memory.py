@@ -0,0 +1,180 @@
+"""
+Memory accounting of a loaded registry.
+
+``registry_sizes`` walks the registry and reports the deep size of the raw
+rows and of every index attribute per table, of the registry-wide indexes
+and of the run-scoped caches. Objects reachable from more than one place are
+counted once, for the first place walked: rows before indexes before caches,
+so an index only accounts for what it adds on top of the rows.
+
+``measure_stages`` traces allocations with ``tracemalloc`` while loading,
+planning and rendering, reporting the memory retained by and the peak of
+each stage. Sizes are compared with budgets in MB by key, see
+``over_budget``.
+"""
+import sys
+import tracemalloc
+from array import array
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+
+from gb4_wiki_gen import templates
+from gb4_wiki_gen.database import load_data
+from gb4_wiki_gen.models import DataTable, Registry
+from gb4_wiki_gen.pages import plan_all_pages
+from gb4_wiki_gen.pipeline import is_page
+
+MB = 2 ** 20
+
+_leaf_types = (str, bytes, int, float, complex, bool, type(None), array)
+# shared objects referenced from everywhere, measured on their own or not at all
+_opaque_types = (Registry, DataTable, type, ModuleType, FunctionType, MethodType,
+                 BuiltinFunctionType)
+# attributes of tables that are not indexes
+_table_attrs = {"data", "registry", "row_type"}
+# registry attributes holding registry-wide indexes
+_registry_attrs = ("validity", "ids", "skill_index", "skill_titles", "id_codes")
+
+
+def deep_size(obj, seen=None) -> int:
+    """
+    size of `obj` and everything reachable from it in bytes, skipping ids in
+    `seen` and adding the ids it counts to `seen`
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _opaque_types):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, _leaf_types):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+            continue
+        if isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+            continue
+        if hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(obj, name):
+                    stack.append(getattr(obj, name))
+    return size
+
+
+def table_indexes(table) -> dict:
+    return {
+        name: value for name, value in vars(table).items()
+        if name not in _table_attrs
+    }
+
+
+def registry_sizes(registry) -> dict:
+    """
+    deep sizes in bytes by key: ``rows.<table>``, ``index.<table>.<attr>``,
+    ``registry.<attr>``, ``cache.<name>`` and ``total``
+    """
+    seen = set()
+    sizes = {}
+    for name, table in registry.items():
+        sizes[f"rows.{name}"] = deep_size(table.data, seen)
+    for name, table in registry.items():
+        for attr, value in table_indexes(table).items():
+            sizes[f"index.{name}.{attr}"] = deep_size(value, seen)
+    for attr in _registry_attrs:
+        sizes[f"registry.{attr}"] = deep_size(getattr(registry, attr, None), seen)
+    caches = dict(registry.caches or {})
+    caches["fragments"] = templates.fragment_cache
+    for name, cache in caches.items():
+        sizes[f"cache.{name}"] = deep_size(cache, seen)
+    sizes["total"] = sum(sizes.values())
+    return sizes
+
+
+def grouped_sizes(sizes) -> dict:
+    """
+    sizes summed by section (rows, index, registry, cache) and by table
+    """
+    groups = {}
+    for key, size in sizes.items():
+        if key == "total":
+            continue
+        section, name = key.split(".", 1)
+        groups[section] = groups.get(section, 0) + size
+        if section == "index":
+            table = f"table.{name.split('.', 1)[0]}"
+        elif section == "rows":
+            table = f"table.{name}"
+        else:
+            continue
+        groups[table] = groups.get(table, 0) + size
+    return groups
+
+
+def _render_all(plan) -> int:
+    """
+    render every planned page, returns the size of the rendered pages
+    """
+    size = 0
+    for make_page, items in plan.values():
+        for item in items:
+            page = make_page(item)
+            if is_page(page):
+                size += sys.getsizeof(page[1])
+    return size
+
+
+def measure_stages(dir_path, wiki_namespace="Generated", full_rows=False):
+    """
+    load, plan and render all pages under tracemalloc, returns the registry
+    and the retained and peak bytes per stage, ``pages`` is the size the
+    rendered pages would take if all were kept
+    """
+    stages = {}
+    tracemalloc.start()
+    try:
+        def stage(name, fn):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            result = fn()
+            current, peak = tracemalloc.get_traced_memory()
+            stages[f"stage.{name}.retained"] = current - before
+            stages[f"stage.{name}.peak"] = peak - before
+            return result
+
+        registry = stage("load", lambda: load_data(dir_path, full_rows))
+        plan = stage("plan", lambda: plan_all_pages(registry, wiki_namespace))
+        stages["pages"] = stage("render", lambda: _render_all(plan))
+    finally:
+        tracemalloc.stop()
+    return registry, stages
+
+
+def over_budget(sizes, budgets) -> list:
+    """
+    (key, size, budget) of every size above its budget, budgets are in MB
+    """
+    return [
+        (key, sizes[key], budget)
+        for key, budget in budgets.items()
+        if key in sizes and sizes[key] > budget * MB
+    ]
+
+
+def parse_budgets(values) -> dict:
+    """
+    budgets from "key=MB" strings
+    """
+    budgets = {}
+    for value in values:
+        key, sep, megabytes = value.partition("=")
+        if not sep:
+            raise ValueError(f"expected key=MB, got {value!r}")
+        budgets[key.strip()] = float(megabytes)
+    return budgets
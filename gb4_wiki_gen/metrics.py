@@ -0,0 +1,312 @@
+"""
+Run metrics: counters and latency histograms.
+
+Disabled by default, like profiling: ``count``, ``observe`` and ``timer``
+cost nothing until ``enable()``. The pipeline counts planned, rendered,
+skipped, uploaded and failed pages, every planned item once as done when its
+last stage finished, and records render and upload latency, the API client
+counts retries by reason. ``Progress`` prints a live progress line with an
+ETA from these counters and ``MetricsWriter`` writes a JSON or
+Prometheus text-format file periodically and at the end of the run.
+"""
+import json
+import os
+import sys
+import threading
+from bisect import bisect_left
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter, time
+
+PREFIX = "gb4_"
+# upper bounds in seconds, +Inf is implied
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0, 30.0)
+
+_null_timer = nullcontext()
+_metrics = None
+
+
+def _label_key(labels) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> dict:
+        """
+        observations at or below each bound, by bound as Prometheus prints it
+        """
+        counts = {}
+        total = 0
+        for bound, count in zip((*LATENCY_BUCKETS, float("inf")), self.buckets):
+            total += count
+            counts["+Inf" if bound == float("inf") else repr(bound)] = total
+        return counts
+
+
+class Timer:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.observe(self.name, perf_counter() - self.start, **self.labels)
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time()
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def timer(self, name, **labels):
+        return Timer(self, name, labels)
+
+    def total(self, name) -> float:
+        """
+        sum of the counter `name` over all labels
+        """
+        with self._lock:
+            return sum(value for (key, _), value in self.counters.items() if key == name)
+
+    def snapshot(self) -> dict:
+        """
+        all metrics as JSON-serializable data
+        """
+        def entries(items, value):
+            grouped = {}
+            for (name, labels), it in sorted(items):
+                grouped.setdefault(name, []).append({"labels": dict(labels), **value(it)})
+            return grouped
+
+        with self._lock:
+            elapsed = time() - self.started
+            return {
+                "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+                "elapsed_seconds": round(elapsed, 3),
+                "counters": entries(self.counters.items(), lambda it: {"value": it}),
+                "histograms": entries(self.histograms.items(), lambda it: {
+                    "count": it.count, "sum": round(it.sum, 6), "buckets": it.cumulative(),
+                }),
+            }
+
+    def prometheus(self) -> str:
+        """
+        all metrics in the Prometheus text exposition format
+        """
+        def labels_text(labels, **extra):
+            labels = {**dict(labels), **extra}
+            if not labels:
+                return ""
+            values = ",".join(
+                f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                for key, value in labels.items()
+            )
+            return f"{{{values}}}"
+
+        lines = []
+        typed = set()
+
+        def declare(name, metric_type):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {PREFIX}{name} {metric_type}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                declare(name, "counter")
+                lines.append(f"{PREFIX}{name}{labels_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                declare(name, "histogram")
+                for bound, count in histogram.cumulative().items():
+                    lines.append(f"{PREFIX}{name}_bucket{labels_text(labels, le=bound)} {count}")
+                lines.append(f"{PREFIX}{name}_sum{labels_text(labels)} {histogram.sum:.6f}")
+                lines.append(f"{PREFIX}{name}_count{labels_text(labels)} {histogram.count}")
+            lines.append(f"# TYPE {PREFIX}run_start_timestamp_seconds gauge")
+            lines.append(f"{PREFIX}run_start_timestamp_seconds {self.started:.3f}")
+            lines.append(f"# TYPE {PREFIX}run_elapsed_seconds gauge")
+            lines.append(f"{PREFIX}run_elapsed_seconds {time() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+
+def write_metrics(metrics, path):
+    """
+    write a snapshot to `path`, JSON for ``.json`` files and Prometheus text
+    otherwise, replacing the file atomically for readers polling it
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        text = json.dumps(metrics.snapshot(), indent=2)
+    else:
+        text = metrics.prometheus()
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(text, encoding="utf8")
+    os.replace(tmp_path, path)
+
+
+class Periodic:
+    """
+    call `fn` every `interval` seconds in a daemon thread until stopped
+    """
+    def __init__(self, interval, fn, name):
+        self.interval = interval
+        self.fn = fn
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.fn()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class MetricsWriter(Periodic):
+    def __init__(self, metrics, path, interval):
+        super().__init__(interval, lambda: write_metrics(metrics, path), "metrics-writer")
+
+
+def format_seconds(seconds) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+class Progress(Periodic):
+    """
+    progress of the pages planned so far, with rate and ETA, redrawn in place
+    on a terminal and printed as lines otherwise
+    """
+    def __init__(self, metrics, interval=1.0, stream=None):
+        super().__init__(interval, self.show, "progress")
+        self.metrics = metrics
+        self.stream = stream or sys.stderr
+        self.start_time = perf_counter()
+        self.interactive = self.stream.isatty()
+
+    def line(self) -> str:
+        metrics = self.metrics
+        planned = metrics.total("pages_planned_total")
+        # counted once per item, when its last stage finished
+        done = metrics.total("pages_done_total")
+        uploaded = metrics.total("pages_uploaded_total")
+        failed = metrics.total("pages_failed_total")
+        elapsed = perf_counter() - self.start_time
+        rate = done / elapsed if elapsed > 0 else 0.0
+        line = f"{done:.0f}/{planned:.0f} pages"
+        if planned:
+            line += f" {min(done / planned, 1.0):.0%}"
+        line += f", {uploaded:.0f} uploaded, {failed:.0f} failed, {rate:.1f}/s"
+        if rate > 0 and planned > done:
+            line += f", ETA {format_seconds((planned - done) / rate)}"
+        return line
+
+    def show(self):
+        if self.interactive:
+            self.stream.write(f"\r\x1b[K{self.line()}")
+        else:
+            self.stream.write(f"{self.line()}\n")
+        self.stream.flush()
+
+    def stop(self):
+        super().stop()
+        self.show()
+        if self.interactive:
+            self.stream.write("\n")
+
+
+def enable() -> Metrics:
+    global _metrics
+    _metrics = Metrics()
+    return _metrics
+
+
+def disable():
+    global _metrics
+    metrics, _metrics = _metrics, None
+    return metrics
+
+
+def current():
+    return _metrics
+
+
+def count(name, amount=1, **labels):
+    """
+    add `amount` to the counter `name`, no-op while metrics are disabled
+    """
+    if _metrics is not None:
+        _metrics.count(name, amount, **labels)
+
+
+def observe(name, seconds, **labels):
+    if _metrics is not None:
+        _metrics.observe(name, seconds, **labels)
+
+
+def planned(items):
+    """
+    count `items` as planned pages, all at once for sized collections and
+    one by one as they are taken otherwise, returns the items to iterate
+    """
+    if _metrics is None:
+        return items
+    if hasattr(items, "__len__"):
+        _metrics.count("pages_planned_total", len(items))
+        return items
+    return _counted(items)
+
+
+def _counted(items):
+    for item in items:
+        count("pages_planned_total")
+        yield item
+
+
+def timer(name, **labels):
+    """
+    context manager observing its duration, no-op while metrics are disabled
+    """
+    if _metrics is None:
+        return _null_timer
+    return _metrics.timer(name, **labels)
@@ -0,0 +1,275 @@
+"""
+Local mirror of the generated wiki namespace.
+
+The first sync lists every page of the namespace with ``list=allpages`` and
+downloads the latest revisions in batches of ``prop=revisions``. Later syncs
+read ``list=recentchanges`` since the last sync and only download the pages
+edited, created, moved or deleted since. Pages are kept in an sqlite3 file,
+so comparing rendered pages with the wiki, skipping unchanged uploads and
+finding pages edited by others run offline.
+"""
+import hashlib
+import logging
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from gb4_wiki_gen.pipeline import CONFLICT, UNCHANGED
+
+log = logging.getLogger(__name__)
+
+# titles per prop=revisions request, the API limit for content queries
+REVISIONS_BATCH = 50
+# recentchanges are pruned after $wgRCMaxAge, 90 days by default
+RC_MAX_AGE = timedelta(days=90)
+
+
+def content_sha1(content) -> str:
+    """
+    sha1 of page content as reported by the revision ``sha1`` property
+    """
+    return hashlib.sha1(content.encode("utf8")).hexdigest()
+
+
+class MirrorPage(NamedTuple):
+    title: str
+    pageid: int
+    revid: int
+    timestamp: str
+    user: str
+    sha1: str
+    content: str
+
+
+class MirrorStore:
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                title TEXT PRIMARY KEY,
+                pageid INTEGER,
+                revid INTEGER,
+                timestamp TEXT,
+                user TEXT,
+                sha1 TEXT,
+                content TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+    def close(self):
+        self.db.close()
+
+    def get_meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def put(self, pages):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)", pages)
+
+    def delete(self, titles):
+        self.db.executemany("DELETE FROM pages WHERE title = ?", ((it,) for it in titles))
+
+    def commit(self):
+        self.db.commit()
+
+    def get(self, title) -> MirrorPage:
+        row = self.db.execute("SELECT * FROM pages WHERE title = ?", (title,)).fetchone()
+        return MirrorPage(*row) if row else None
+
+    def titles(self) -> set:
+        return {it for it, in self.db.execute("SELECT title FROM pages")}
+
+    def revisions(self) -> dict:
+        """
+        (sha1, user) of the mirrored revision by title, without content
+        """
+        return {
+            title: (sha1, user)
+            for title, sha1, user in self.db.execute("SELECT title, sha1, user FROM pages")
+        }
+
+    def contents(self):
+        """
+        (title, content) of every mirrored page
+        """
+        return self.db.execute("SELECT title, content FROM pages")
+
+    def __len__(self):
+        return self.db.execute("SELECT count(*) FROM pages").fetchone()[0]
+
+
+class SyncResult(NamedTuple):
+    full: bool
+    updated: int
+    deleted: int
+
+
+class WikiMirror:
+    """
+    keeps a `MirrorStore` in sync with the pages titled "`namespace`:..."
+    on the wiki, which is either a real namespace or a title prefix in the
+    main namespace
+    """
+    def __init__(self, client, store, namespace="Generated"):
+        self.client = client
+        self.store = store
+        self.namespace = namespace
+        self.prefix = f"{namespace}:"
+        self.namespace_id = client.namespaces().get(namespace)
+
+    def title_filter(self) -> dict:
+        if self.namespace_id is not None:
+            return {"apnamespace": self.namespace_id}
+        return {"apnamespace": 0, "apprefix": self.prefix}
+
+    def list_titles(self):
+        params = {"list": "allpages", "aplimit": "max", **self.title_filter()}
+        for response_data in self.client.query(params):
+            for page in response_data["query"]["allpages"]:
+                yield page["title"]
+
+    def fetch(self, titles):
+        """
+        latest revisions of `titles` in batches, titles of missing pages are
+        returned separately
+        """
+        pages = []
+        missing = []
+        titles = list(titles)
+        for start in range(0, len(titles), REVISIONS_BATCH):
+            params = {
+                "prop": "revisions",
+                "titles": "|".join(titles[start:start + REVISIONS_BATCH]),
+                "rvprop": "ids|timestamp|user|sha1|content",
+                "rvslots": "main",
+            }
+            for response_data in self.client.query(params):
+                for page in response_data["query"]["pages"]:
+                    if page.get("missing") or page.get("invalid"):
+                        missing.append(page["title"])
+                        continue
+                    # continued responses repeat pages without revisions
+                    if not page.get("revisions"):
+                        continue
+                    revision = page["revisions"][0]
+                    pages.append(MirrorPage(
+                        page["title"], page["pageid"], revision["revid"],
+                        revision["timestamp"], revision.get("user"), revision.get("sha1"),
+                        revision["slots"]["main"].get("content"),
+                    ))
+            log.info(f"fetched {min(start + REVISIONS_BATCH, len(titles))}/{len(titles)} pages")
+        return pages, missing
+
+    def server_time(self) -> str:
+        response_data = next(self.client.query({"meta": "siteinfo", "curtimestamp": 1}))
+        return response_data["curtimestamp"]
+
+    def changed_titles(self, since):
+        """
+        titles edited, created, moved or deleted since the timestamp `since`
+        """
+        params = {
+            "list": "recentchanges",
+            "rcstart": since,
+            "rcdir": "newer",
+            "rcprop": "title|timestamp|ids|loginfo",
+            "rclimit": "max",
+            "rctype": "edit|new|log",
+            "rcnamespace": self.namespace_id if self.namespace_id is not None else 0,
+        }
+        titles = set()
+        for response_data in self.client.query(params):
+            for change in response_data["query"]["recentchanges"]:
+                titles.add(change["title"])
+                target = change.get("logparams", {}).get("target_title")
+                if target is not None:
+                    titles.add(target)
+        return {it for it in titles if it.startswith(self.prefix)}
+
+    def needs_full_sync(self, last_sync) -> bool:
+        if last_sync is None or self.store.get_meta("namespace") != self.namespace:
+            return True
+        last_sync_time = datetime.fromisoformat(last_sync.replace("Z", "+00:00"))
+        return datetime.now(timezone.utc) - last_sync_time > RC_MAX_AGE
+
+    def sync(self, full=False) -> SyncResult:
+        """
+        bring the store up to date, a full download on the first sync, when
+        `full` is set or when the last sync is older than recentchanges keep
+        """
+        last_sync = self.store.get_meta("last_sync")
+        full = full or self.needs_full_sync(last_sync)
+        sync_time = self.server_time()
+        if full:
+            titles = set(self.list_titles())
+            log.info(f"full sync of {len(titles)} pages in {self.prefix}")
+            deleted = self.store.titles() - titles
+        else:
+            titles = self.changed_titles(last_sync)
+            log.info(f"{len(titles)} pages changed in {self.prefix} since {last_sync}")
+            deleted = set()
+
+        pages, missing = self.fetch(sorted(titles))
+        deleted.update(missing)
+        self.store.put(pages)
+        self.store.delete(deleted)
+        self.store.set_meta("namespace", self.namespace)
+        self.store.set_meta("last_sync", sync_time)
+        self.store.commit()
+        return SyncResult(full, len(pages), len(deleted))
+
+
+class PageStatus(NamedTuple):
+    new: list
+    unchanged: list
+    changed: list
+    # changed pages whose latest revision was not made by the bot
+    conflicts: list
+
+
+def compare_pages(revisions, pages, bot_user) -> PageStatus:
+    """
+    compare rendered (title, content) `pages` with the mirrored `revisions`
+    of ``MirrorStore.revisions``, conflicts are only detected with a
+    `bot_user`
+    """
+    status = PageStatus([], [], [], [])
+    for page_title, page_content in pages:
+        mirrored = revisions.get(page_title)
+        if mirrored is None:
+            status.new.append(page_title)
+        elif mirrored[0] == content_sha1(page_content):
+            status.unchanged.append(page_title)
+        elif bot_user is not None and mirrored[1] != bot_user:
+            status.conflicts.append(page_title)
+        else:
+            status.changed.append(page_title)
+    return status
+
+
+def mirror_upload(upload_page, revisions, bot_user):
+    """
+    wrap `upload_page` to skip pages equal to their mirrored revision and
+    pages last edited by someone other than `bot_user` (if given), these
+    return UNCHANGED and CONFLICT
+    """
+    def upload(page_title, page_content):
+        mirrored = revisions.get(page_title)
+        if mirrored is not None:
+            if mirrored[0] == content_sha1(page_content):
+                log.debug(f"unchanged, not uploading {page_title}")
+                return UNCHANGED
+            if bot_user is not None and mirrored[1] != bot_user:
+                log.warning(f"last edited by {mirrored[1]}, not uploading {page_title}")
+                return CONFLICT
+        return upload_page(page_title, page_content)
+    return upload
@@ -3,6 +3,9 @@ from dataclasses import dataclass
 from itertools import zip_longest
 from typing import Mapping, Iterable
 
+from gb4_wiki_gen.cache import MemoCache, memoize
+from gb4_wiki_gen.categories import Categories
+from gb4_wiki_gen.id_codes import IdCodes, int_array
 from gb4_wiki_gen.utils import is_sequence
 
 
@@ -59,6 +62,37 @@ class UReferenceObjectArray:
         ]
 
 
+class Registry(dict):
+    """
+    data tables by name, plus run-scoped caches shared by all generators,
+    the validity sets of the integrity check, the registry-wide id index,
+    the reverse skill index and skill page titles, the row projections and
+    category enums applied while loading, the integer codes of ids used by
+    table indexes and the name search index
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.projections = None
+        self.categories = Categories()
+        self.id_codes = IdCodes()
+        self.caches = {}
+        self.validity = None
+        self.ids = None
+        self.skill_index = None
+        self.skill_titles = None
+        self.names = None
+
+    def cache(self, name) -> MemoCache:
+        cache = self.caches.get(name)
+        if cache is None:
+            cache = self.caches.setdefault(name, MemoCache(name))
+        return cache
+
+    def clear_caches(self):
+        for cache in (self.caches or {}).values():
+            cache.clear()
+
+
 class DataTableIndexError(Exception):
     def __init__(self, table_name, key):
         super().__init__(f"table {table_name!r} missing key {key!r}")
@@ -69,6 +103,14 @@ class DataTableIndexError(Exception):
         return f"DataTableIndexError(table_name={self.table_name}, key={self.key})"
 
 
+class ProjectedFieldError(AttributeError):
+    def __init__(self, row_type, attr):
+        super().__init__(f"{row_type} field {attr!r} is dropped by the field projection, "
+                         f"load with --full-rows to read it")
+        self.row_type = row_type
+        self.attr = attr
+
+
 class DataTable:
     def __init__(self, registry, row_type, data):
         self.data = data
@@ -104,37 +146,77 @@ class DataTable:
             return
         return self.row_type(self.registry, row, id)
 
+    def index_snapshot(self) -> dict:
+        """
+        index entries by lookup key, grouped by index name; comparing
+        snapshots before and after a reload shows which lookups changed
+        """
+        return {}
+
 
 class MSListTable(DataTable):
     def __init__(self, registry, row_type, data):
         super().__init__(registry, row_type, data)
         self.init_suit_id_by_part_id()
         self.init_primary_suit_by_part_id()
+        self.init_grade_variants()
 
     def init_suit_id_by_part_id(self):
         """
         prepares lookup of suit_ids via part_id
         some parts are shared between suits
         """
+        codes = self.registry.id_codes
         self._suit_id_by_part_id = {}
         for item_id, part_id in self.parts_ids_iter:
-            self._suit_id_by_part_id.setdefault(part_id, []).append(item_id)
+            suit_codes = self._suit_id_by_part_id.get(codes.code(part_id))
+            if suit_codes is None:
+                suit_codes = self._suit_id_by_part_id[codes.code(part_id)] = int_array()
+            suit_codes.append(codes.code(item_id))
 
     def init_primary_suit_by_part_id(self):
         """
         some parts are shared between suits, stores which suit is considered the
         primary suit based on part_id digits
         """
+        codes = self.registry.id_codes
         self._primary_suit_by_part_id = {}
-        for item_id, part_id in self.parts_ids_iter:
-            suits = self.suits_by_part_id(part_id)
-            if len(suits) == 1:
-                self._primary_suit_by_part_id[part_id] = suits[0]
-            else:
-                for suit in suits:
-                    if part_id is not None and part_id[:-1] in suit.id:
-                        self._primary_suit_by_part_id[part_id] = suit
-                        break
+        for part_code, suit_codes in self._suit_id_by_part_id.items():
+            if len(suit_codes) == 1:
+                self._primary_suit_by_part_id[part_code] = suit_codes[0]
+                continue
+            part_id = codes.decode(part_code)
+            for suit_code in suit_codes:
+                if part_id is not None and part_id[:-1] in codes.decode(suit_code):
+                    self._primary_suit_by_part_id[part_code] = suit_code
+                    break
+
+    def init_grade_variants(self):
+        """
+        prepares the grades each suit exists in, as HG, MG, SD bits by suit
+        """
+        self._grade_variants = {}
+        codes = self.registry.id_codes
+        for suit_id in self.keys():
+            gradeless_id = suit_id[3:]
+            self._grade_variants[codes.code(suit_id)] = (
+                (f"HG_{gradeless_id}" in self.rows) << 2
+                | (f"MG_{gradeless_id}" in self.rows) << 1
+                | (f"SD_{gradeless_id}" in self.rows)
+            )
+
+    def index_snapshot(self):
+        codes = self.registry.id_codes
+        return {
+            "MSList#part": {
+                codes.decode(part_code): (
+                    tuple(codes.decode_all(suit_codes)),
+                    codes.decode(self._primary_suit_by_part_id[part_code])
+                    if part_code in self._primary_suit_by_part_id else None
+                )
+                for part_code, suit_codes in self._suit_id_by_part_id.items()
+            }
+        }
 
     @property
     def parts_ids_iter(self):
@@ -147,26 +229,37 @@ class MSListTable(DataTable):
             part_id = part.id
         except Exception:
             part_id = part
-        return self._primary_suit_by_part_id[part_id]
+        try:
+            suit_code = self._primary_suit_by_part_id[self.registry.id_codes.get(part_id)]
+        except KeyError:
+            raise KeyError(part_id) from None
+        # decoded without a tracked lookup, like the index entry it comes from
+        suit_id = self.registry.id_codes.decode(suit_code)
+        return self.row_type(self.registry, self.rows[suit_id], suit_id)
 
     def suits_by_part_id(self, part) -> list["DataMSList"]:
         try:
             part_id = part.id
         except Exception:
             part_id = part
-        suit_ids = self._suit_id_by_part_id[part_id]
-        return [self[suit_id] for suit_id in suit_ids]
+        codes = self.registry.id_codes
+        try:
+            suit_codes = self._suit_id_by_part_id[codes.get(part_id)]
+        except KeyError:
+            raise KeyError(part_id) from None
+        return [self[suit_id] for suit_id in codes.decode_all(suit_codes)]
 
     def grade_variants(self, suit) -> tuple[bool, bool, bool]:
         try:
             suit_id = suit.id
         except Exception:
             suit_id = suit
-        gradeless_id = suit_id[3:]
-        hg = f"HG_{gradeless_id}" in self
-        mg = f"MG_{gradeless_id}" in self
-        sd = f"SD_{gradeless_id}" in self
-        return hg, mg, sd
+        variants = self._grade_variants.get(self.registry.id_codes.get(suit_id))
+        if variants is None:
+            gradeless_id = suit_id[3:]
+            return (f"HG_{gradeless_id}" in self, f"MG_{gradeless_id}" in self,
+                    f"SD_{gradeless_id}" in self)
+        return bool(variants & 4), bool(variants & 2), bool(variants & 1)
 
 
 class DerivedSynthesizeParameterTable(DataTable):
@@ -175,8 +268,14 @@ class DerivedSynthesizeParameterTable(DataTable):
         self.init_implicit_recipes_from_parts_sharing()
 
     def init_implicit_recipes_from_parts_sharing(self):
+        """
+        prepares the recipes as (target, source1, source2) part id codes,
+        flattened into one array, and the positions of the recipes by target
+        and by source part
+        """
         mslist = self.registry["MSList"]
-        self._recipes = set()
+        codes = self.registry.id_codes
+        recipes = {}
 
         for item in self:
             if item.target_parts_id not in mslist:
@@ -192,24 +291,63 @@ class DerivedSynthesizeParameterTable(DataTable):
                 ))
                 # looking up the actual parts will generate (invalid) recipes
                 # where parts are shared between suits, exclude those
-                self._recipes.update(
-                    it for it in parts_recipes
+                recipes.update(
+                    (tuple(codes.code(part_id) for part_id in it), None)
+                    for it in parts_recipes
                     if None not in it and it[0] != it[1] != it[2]
                 )
 
+        self._recipes = int_array()
+        self._recipes_by_target = {}
+        self._recipes_by_source = {}
+        for position, (target, source1, source2) in enumerate(recipes):
+            self._recipes.extend((target, source1, source2))
+            self._recipe_positions(self._recipes_by_target, target).append(position)
+            self._recipe_positions(self._recipes_by_source, source1).append(position)
+            if source2 != source1:
+                self._recipe_positions(self._recipes_by_source, source2).append(position)
+
+    @staticmethod
+    def _recipe_positions(index, part_code):
+        positions = index.get(part_code)
+        if positions is None:
+            positions = index[part_code] = int_array()
+        return positions
+
+    def _decode_recipes(self, positions) -> list:
+        codes = self.registry.id_codes
+        recipes = self._recipes
+        return [
+            tuple(codes.decode_all(recipes[position * 3:position * 3 + 3]))
+            for position in positions
+        ]
+
+    def index_snapshot(self):
+        codes = self.registry.id_codes
+        positions_by_part_id = {}
+        for index in (self._recipes_by_target, self._recipes_by_source):
+            for part_code, positions in index.items():
+                positions_by_part_id.setdefault(codes.decode(part_code), []).extend(positions)
+        return {
+            "DerivedSynthesizeParameter#part": {
+                part_id: frozenset(self._decode_recipes(positions))
+                for part_id, positions in positions_by_part_id.items()
+            }
+        }
+
     def find_derives_from(self, part_id):
-        result = set()
-        for target, source1, source2 in self._recipes:
-            if target == part_id:
-                result.add((target, source1, source2))
-        return result
+        """
+        (target, source1, source2) recipes resulting in `part_id`, in table order
+        """
+        part_code = self.registry.id_codes.get(part_id)
+        return self._decode_recipes(self._recipes_by_target.get(part_code, ()))
 
     def find_derives_into(self, part_id):
-        result = set()
-        for target, source1, source2 in self._recipes:
-            if source1 == part_id or source2 == part_id:
-                result.add((target, source1, source2))
-        return result
+        """
+        (target, source1, source2) recipes using `part_id`, in table order
+        """
+        part_code = self.registry.id_codes.get(part_id)
+        return self._decode_recipes(self._recipes_by_source.get(part_code, ()))
 
 
 class MissionRewardTable(DataTable):
@@ -255,23 +393,65 @@ class ItemGunplaBoxTable(DataTable):
     def __init__(self, registry, row_type, data):
         super().__init__(registry, row_type, data)
         self.init_box_art_id_lookup(data)
+        self.init_box_ids_by_item_id()
 
     def init_box_art_id_lookup(self, data):
+        codes = self.registry.id_codes
         self._box_art_id = {}
         for item in self:
-            self._box_art_id[item.box_art_id] = item
+            self._box_art_id[item.box_art_id] = codes.code(item.id)
+
+    def init_box_ids_by_item_id(self):
+        """
+        prepares lookup of boxes containing an item (part or equipment),
+        boxes are stored by position so lookups return them in table order
+        """
+        codes = self.registry.id_codes
+        self._box_codes = int_array()
+        self._box_positions_by_item_id = {}
+        for position, item in enumerate(self):
+            self._box_codes.append(codes.code(item.id))
+            for item_id in set(item.item_array):
+                positions = self._box_positions_by_item_id.get(codes.code(item_id))
+                if positions is None:
+                    positions = self._box_positions_by_item_id[codes.code(item_id)] = int_array()
+                positions.append(position)
+
+    def _box(self, box_code):
+        # decoded without a tracked lookup, like the index entry it comes from
+        box_id = self.registry.id_codes.decode(box_code)
+        return self.row_type(self.registry, self.rows[box_id], box_id)
+
+    def index_snapshot(self):
+        codes = self.registry.id_codes
+        return {
+            "ItemGunplaBox#item": {
+                codes.decode(item_code): tuple(
+                    codes.decode(self._box_codes[position]) for position in positions
+                )
+                for item_code, positions in self._box_positions_by_item_id.items()
+            },
+            "ItemGunplaBox#box_art": {
+                box_art_id: codes.decode(box_code)
+                for box_art_id, box_code in self._box_art_id.items()
+            },
+        }
 
     def find_by_suit_id(self, suit_id):
-        return self._box_art_id.get(f"{suit_id}_")
+        box_code = self._box_art_id.get(f"{suit_id}_")
+        if box_code is None:
+            return None
+        return self._box(box_code)
 
     def find_by_parts_ids(self, parts_ids):
-        parts_ids = set(parts_ids)
-        results = []
-        for box in self:
-            items_set = set(box.item_array)
-            if items_set.intersection(parts_ids):
-                results.append(box)
-        return results
+        codes = self.registry.id_codes
+        positions = set()
+        for part_id in parts_ids:
+            positions.update(self._box_positions_by_item_id.get(codes.get(part_id), ()))
+        return [
+            self[codes.decode(self._box_codes[position])]
+            for position in sorted(positions)
+        ]
 
     def __getitem__(self, item):
         if isinstance(item, DataMSList):
@@ -299,9 +479,25 @@ class BaseRowType:
             return self.data[name]
 
 
+def _is_projected(row) -> bool:
+    """
+    whether the fields of `row` not marked with ``project`` were dropped
+    """
+    if getattr(row.registry, "projections", None) is None:
+        return False
+    return any(
+        isinstance(it, UField) and it.project for it in vars(type(row)).values()
+    )
+
+
 class UField:
-    def __init__(self, attr: str = None):
+    def __init__(self, attr: str = None, project=False):
+        """
+        `project` keeps the field in projected rows (see ``row_projection``),
+        a dict also projects the nested object
+        """
         self._attr = attr
+        self.project = project
 
     def __set_name__(self, owner, name):
         if self._attr is None:
@@ -315,7 +511,12 @@ class UField:
     def __get__(self, obj, obj_type=None):
         if obj is None:
             return None
-        value = obj.data[self._attr]
+        try:
+            value = obj.data[self._attr]
+        except KeyError:
+            if self.project or not _is_projected(obj):
+                raise
+            raise ProjectedFieldError(type(obj).__name__, self._attr) from None
         if value == "None":
             return None
         return value
@@ -379,6 +580,7 @@ class DataMSList:
         return (self.head, self.body, self.arm_r, self.arm_l, self.leg, self.backpack)
 
     @property
+    @memoize("unique_parts_ids", key=lambda suit: suit.id)
     def unique_parts_ids(self):
         mstable = self.registry["MSList"]
         return [
@@ -459,14 +661,21 @@ class DataItemGunplaBox:
         return localized[self.suit_id]._text
 
 
-@dataclass(frozen=True)
+def _projected_row_repr(row):
+    # the fields of projected rows are mostly dropped, the id identifies the row
+    return f"{type(row).__name__}(id={row.id!r})"
+
+
+@dataclass(frozen=True, repr=False)
 class DataPartsParameter:
     registry: Mapping
     data: Mapping
     id: str
 
-    parts_name: UField = UField()
-    parts_category: UField = UField()
+    __repr__ = _projected_row_repr
+
+    parts_name: UField = UField(project=True)
+    parts_category: UField = UField(project=True)
     inner_parts_array: UField = UField()
     equip_attach_type_name: UField = UField()
     model_id: UField = UField()
@@ -474,13 +683,13 @@ class DataPartsParameter:
     move_motion_type: UField = UField()
     motion_priority: UField = UField()
     is_motion_fixed: UField = UField()
-    skill_array: UField = UField()
+    skill_array: UField = UField(project=True)
     muzzle_array: UField = UField()
     skill_parts_info_array: UField = UField()
     parts_animation: UField = UField()
     hidden_info: UField = UField()
     ability_array: UField = UField()
-    other: UField = UField()
+    other: UField = UField(project={"_GundamSeriesName": None, "_PerformanceGroupName": None})
 
     parts_name_localized: UReference = UReference(attr="_PartsName", table="localized_text_parts_name")
     skill_array_data: UReferenceObjectArray = UReferenceObjectArray(
@@ -491,20 +700,22 @@ class DataPartsParameter:
         return self.other["_GundamSeriesName"]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, repr=False)
 class DataSkillIdInfoData:
     registry: Mapping
     data: Mapping
     id: str
 
-    ui_info_array: UField = UField()
+    __repr__ = _projected_row_repr
+
+    ui_info_array: UField = UField(project=True)
     skill_range: UField = UField()
     skill_power: UField = UField()
     skill_permission_rank: UField = UField()
     skill_permission_flag_array: UField = UField()
     is_enemy_disable: UField = UField()
     ai_cool_time: UField = UField()
-    ability_cartridge_category: UField = UField()
+    ability_cartridge_category: UField = UField(project=True)
     attack_data_id_for_parameter_display: UField = UField()
     hyper_trance_id: UField = UField()
 
@@ -534,14 +745,16 @@ class DataSkillIdInfoData:
             return None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, repr=False)
 class DataEquipParameter:
     registry: Mapping
     data: Mapping
     id: str
 
-    parts_name: UField = UField()
-    parts_category: UField = UField()
+    __repr__ = _projected_row_repr
+
+    parts_name: UField = UField(project=True)
+    parts_category: UField = UField(project=True)
     equip_type: UField = UField()
     inner_flag: UField = UField()
     inner_parts_array: UField = UField()
@@ -557,7 +770,7 @@ class DataEquipParameter:
     attach_rotation_arm_left: UField = UField()
     root_locator_name: UField = UField()
     motion_type: UField = UField()
-    skill_array: UField = UField()
+    skill_array: UField = UField(project=True)
     muzzle_array: UField = UField()
     skill_parts_info_array: UField = UField()
     parts_animation: UField = UField()
@@ -0,0 +1,166 @@
+"""
+Fuzzy lookup of ids by localized name.
+
+Every name of the registry-wide id index (suits, parts, weapons, shields,
+skills, kits, series ...) is split into trigrams of its lowercased words.
+A search counts the trigrams each name shares with the query through the
+posting arrays of the query trigrams, and ranks names by trigram
+similarity, exact and substring matches first.
+"""
+import heapq
+import logging
+import re
+from collections import Counter
+from itertools import chain
+from typing import NamedTuple
+
+from gb4_wiki_gen.id_codes import int_array
+
+log = logging.getLogger(__name__)
+
+# matches scoring lower are not used to resolve command arguments
+MIN_SCORE = 0.3
+# candidates ranked by trigram similarity per requested match
+CANDIDATES = 5
+# kinds of entities preferred for ids owned by several tables and among
+# equally similar names
+kind_priority = ("suit", "kit", "part", "equipment", "skill", "series")
+
+
+def kind_rank(kind) -> int:
+    try:
+        return kind_priority.index(kind)
+    except ValueError:
+        return len(kind_priority)
+
+
+_separators = re.compile(r"[\W_]+")
+
+
+def normalize(text) -> str:
+    return " ".join(_separators.split(text.casefold())).strip()
+
+
+def trigrams(text) -> set:
+    """
+    trigrams of each word padded like ``pg_trgm``, "  ex", " exi", "exi" ...
+    """
+    grams = set()
+    for word in normalize(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameMatch(NamedTuple):
+    id: str
+    name: str
+    kind: str
+    score: float
+
+
+class NameIndex:
+    def __init__(self, id_index):
+        self.id_index = id_index
+        self._ids = []
+        self._names = []
+        self._normalized = []
+        self._kinds = []
+        self._sizes = []
+        self._postings = {}
+        for id, name in id_index.names():
+            grams = trigrams(name)
+            if not grams:
+                continue
+            entry = len(self._ids)
+            self._ids.append(id)
+            self._names.append(name)
+            self._normalized.append(normalize(name))
+            self._kinds.append(self.kind(id))
+            self._sizes.append(len(grams))
+            for gram in grams:
+                postings = self._postings.get(gram)
+                if postings is None:
+                    postings = self._postings[gram] = int_array()
+                postings.append(entry)
+
+    def kind(self, id):
+        """
+        kind of the entity owning `id`, "text" for ids only naming a text
+        """
+        kinds = [owner.kind for owner in self.id_index.owners(id) if owner.kind != "text"]
+        return min(kinds, key=kind_rank, default="text")
+
+    def __len__(self):
+        return len(self._ids)
+
+    def search(self, text, kinds=None, limit=10) -> list[NameMatch]:
+        """
+        names most similar to `text`, optionally only of entities of `kinds`,
+        best first, then by kind and id among equal scores
+        """
+        query = trigrams(text)
+        if not query:
+            return []
+        shared = Counter(chain.from_iterable(
+            self._postings.get(gram, ()) for gram in query
+        ))
+        query_size = len(query)
+        sizes = self._sizes
+        scored = [
+            (count / (query_size + sizes[entry] - count), entry)
+            for entry, count in shared.items()
+        ]
+        if kinds:
+            scored = [it for it in scored if self._kinds[it[1]] in kinds]
+        # exact and substring matches are ranked up among the best candidates
+        # only, they share most trigrams with the query anyway
+        normalized = normalize(text)
+        matches = []
+        for score, entry in heapq.nlargest(limit * CANDIDATES, scored):
+            name = self._normalized[entry]
+            if name == normalized:
+                score = 1.0
+            elif normalized in name:
+                score = (1.0 + score) / 2
+            kind = self._kinds[entry]
+            matches.append(NameMatch(self._ids[entry], self._names[entry], kind, score))
+        matches.sort(key=lambda match: (-match.score, kind_rank(match.kind), match.id))
+        return matches[:limit]
+
+
+def name_index(registry) -> NameIndex:
+    """
+    the name index of `registry`, built on first use and again after the
+    id index is rebuilt
+    """
+    names = registry.names
+    if names is None or names.id_index is not registry.ids:
+        names = registry.names = NameIndex(registry.ids)
+    return names
+
+
+def resolve_ids(registry, values, table_name, kinds):
+    """
+    ids of `table_name` for command arguments: each value is an id, ids
+    separated by spaces, or a name searched among entities of `kinds`.
+    Values matching neither are passed on unchanged.
+    """
+    table = registry[table_name]
+    ids = []
+    for value in values:
+        parts = value.split(" ")
+        if all(it in table for it in parts):
+            ids.extend(parts)
+            continue
+        matches = name_index(registry).search(value, kinds, limit=2)
+        if not matches or matches[0].score < MIN_SCORE:
+            log.warning(f"no id or name matches {value!r}")
+            ids.extend(parts)
+            continue
+        match = matches[0]
+        if len(matches) > 1 and matches[1].score == match.score and matches[1].name != match.name:
+            log.warning(f"{value!r} is ambiguous, also matches {matches[1].id} {matches[1].name}")
+        log.info(f"{value!r} resolved to {match.id} {match.name}")
+        ids.append(match.id)
+    return ids
@@ -0,0 +1,145 @@
+"""
+Page factories per page type, shared by the CLI commands, build-all,
+export-xml and watch mode.
+"""
+import logging
+from functools import partial
+
+from gb4_wiki_gen import metrics, profiling
+from gb4_wiki_gen.generator.equip_page import collect_equipment, make_equip_page_content
+from gb4_wiki_gen.generator.kit_page import make_kit_page_content
+from gb4_wiki_gen.generator.mission_page import make_mission_rewards_page_content
+from gb4_wiki_gen.generator.series_page import make_series_page_content
+from gb4_wiki_gen.generator.skill_page import make_skill_page_content, skill_page_ids
+from gb4_wiki_gen.generator.suit_page import make_suit_page_content
+from gb4_wiki_gen.name_search import resolve_ids
+from gb4_wiki_gen.pipeline import PipelineResult, RenderFailure, is_page, render_page
+
+log = logging.getLogger(__name__)
+
+PAGE_TYPES = ("series", "equipment", "kit", "suit", "skills", "missions")
+
+
+def page_key(page_type, item):
+    """
+    stable identity of a planned page, independent of its title
+    """
+    if page_type == "equipment":
+        return page_type, item[0]
+    if page_type == "series":
+        return page_type, item.id
+    if page_type == "missions":
+        return page_type, "Mission_Rewards"
+    return page_type, item
+
+
+def plan_all_pages(registry, wiki_namespace):
+    """
+    page factories and items per page type, data shared between page types
+    (equipment collection, memoized skill tables, suit and box indexes) is
+    computed once per registry
+    """
+    equipment = collect_equipment(registry)
+    return {
+        "series": (
+            partial(make_series_page_content, wiki_namespace=wiki_namespace),
+            registry["localized_text_gundam_series"]
+        ),
+        "equipment": (
+            partial(try_make_equip_page, registry, wiki_namespace=wiki_namespace),
+            equipment.items()
+        ),
+        "kit": (
+            partial(try_make_kit_page, registry, wiki_namespace=wiki_namespace),
+            select_kit_ids(registry, ["all"])
+        ),
+        "suit": (
+            partial(try_make_suit_page, registry, wiki_namespace=wiki_namespace),
+            select_suit_ids(registry, ["all"])
+        ),
+        "skills": (
+            partial(try_make_skill_page, registry, wiki_namespace=wiki_namespace),
+            skill_page_ids(registry)
+        ),
+        "missions": (
+            lambda _: make_mission_rewards_page_content(registry, wiki_namespace),
+            [None]
+        ),
+    }
+
+
+def plan_pages_by_key(registry, wiki_namespace, page_types=PAGE_TYPES):
+    """
+    planned pages by page key, with the factory and item to render them
+    """
+    planned = {}
+    for page_type, (make_page, items) in plan_all_pages(registry, wiki_namespace).items():
+        if page_type not in page_types:
+            continue
+        for item in items:
+            planned[page_key(page_type, item)] = make_page, item
+    return planned
+
+
+def render_pages(make_page, items, on_page=None) -> PipelineResult:
+    """
+    render pages without uploading, passing each one to `on_page` if given,
+    pages passed on are finished by whoever uploads them
+    """
+    result = PipelineResult()
+    for item in metrics.planned(items):
+        page = render_page(make_page, item, result, finished=on_page is None)
+        if page is not None and on_page is not None:
+            on_page(page)
+    return result
+
+
+def select_suit_ids(registry, suit_id):
+    if "all" in suit_id:
+        return [it for it in registry["MSList"].keys() if "HG_" in it]
+    return resolve_ids(registry, suit_id, "MSList", {"suit"})
+
+
+def select_kit_ids(registry, kit_id):
+    if "all" in kit_id:
+        return list(registry["ItemGunplaBox"].keys())
+    return resolve_ids(registry, kit_id, "ItemGunplaBox", {"kit"})
+
+
+def make_pages(make_page, items):
+    for item in items:
+        page = make_page(item)
+        if is_page(page):
+            yield page
+
+
+def try_make_page(page_type, make_page_content, registry, item, wiki_namespace):
+    """
+    render a page with `make_page_content(registry, item, wiki_namespace)`,
+    failures are logged and returned as RenderFailure
+    """
+    try:
+        with profiling.stage(f"page.{page_type}"):
+            return make_page_content(registry, item, wiki_namespace)
+    except Exception as e:
+        label = str(page_key(page_type, item)[1])
+        log.exception(f"failed making {page_type} page {label}")
+        return RenderFailure(label, e)
+
+
+def _make_kit_page(registry, kit_id, wiki_namespace):
+    validity = registry.validity
+    if kit_id in validity.boxes and kit_id not in validity.priced_boxes:
+        # kits not sold in the shop get no page
+        return None
+    return make_kit_page_content(registry, kit_id, wiki_namespace)
+
+
+def _make_equip_page(registry, equip_item, wiki_namespace):
+    return make_equip_page_content(registry, equip_item[1], wiki_namespace)
+
+
+try_make_suit_page = partial(try_make_page, "suit", make_suit_page_content)
+try_make_kit_page = partial(try_make_page, "kit", _make_kit_page)
+try_make_equip_page = partial(try_make_page, "equipment", _make_equip_page)
+try_make_skill_page = partial(try_make_page, "skills", make_skill_page_content)
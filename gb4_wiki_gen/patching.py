@@ -0,0 +1,83 @@
+"""
+Reversible monkeypatches of methods and mapping items.
+
+The profiler and the dependency tracker both wrap table lookups, possibly at
+the same time when ``--profile`` is combined with ``watch``. A patch that is
+undone while a later patch still wraps it is turned into a pass-through
+instead of being removed, so patches can be undone in any order. Undoing the
+later patch then removes the pass-through as well.
+"""
+from functools import wraps
+
+# original by wrapper of patches undone while they were still wrapped
+_passthrough = {}
+
+
+class Patch:
+    __slots__ = ("owner", "attr", "original", "own", "wrapper", "active")
+
+    def __init__(self, owner, attr, original, own):
+        self.owner = owner
+        self.attr = attr
+        self.original = original
+        # whether owner defined attr itself, an inherited attr is restored
+        # by deleting the patched one
+        self.own = own
+        self.wrapper = None
+        self.active = True
+
+    def current(self):
+        if isinstance(self.owner, dict):
+            return self.owner.get(self.attr)
+        return vars(self.owner).get(self.attr)
+
+    def restore(self):
+        self.active = False
+        if self.current() is not self.wrapper:
+            # wrapped again since, the wrapper stays and passes calls through
+            _passthrough[self.wrapper] = self.original
+            return
+        original = self.original
+        while original in _passthrough:
+            original = _passthrough.pop(original)
+        if isinstance(self.owner, dict):
+            self.owner[self.attr] = original
+        elif self.own:
+            setattr(self.owner, self.attr, original)
+        else:
+            delattr(self.owner, self.attr)
+
+
+class Patches:
+    def __init__(self):
+        self._patches = []
+
+    def wrap(self, owner, attr, make_wrapper):
+        """
+        replace owner.attr (function or mapping item) with
+        `make_wrapper(original)` until ``restore``
+        """
+        if isinstance(owner, dict):
+            patch = Patch(owner, attr, owner[attr], True)
+        else:
+            patch = Patch(owner, attr, getattr(owner, attr), attr in vars(owner))
+        original = patch.original
+        wrapped = make_wrapper(original)
+
+        @wraps(original)
+        def wrapper(*args, **kwargs):
+            if patch.active:
+                return wrapped(*args, **kwargs)
+            return original(*args, **kwargs)
+
+        patch.wrapper = wrapper
+        if isinstance(owner, dict):
+            owner[attr] = wrapper
+        else:
+            setattr(owner, attr, wrapper)
+        self._patches.append(patch)
+
+    def restore(self):
+        for patch in reversed(self._patches):
+            patch.restore()
+        self._patches.clear()
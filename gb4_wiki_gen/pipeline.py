@@ -0,0 +1,203 @@
+"""
+Streaming render-to-upload pipeline.
+
+Render workers take items from a shared iterator and put finished pages into
+a bounded queue, upload workers drain it. A full queue blocks rendering, so
+at most ``queue_size`` rendered pages are held in memory, and the first
+upload starts as soon as the first page is rendered.
+"""
+import logging
+import threading
+from dataclasses import dataclass, field
+from queue import Queue
+from typing import NamedTuple
+
+from gb4_wiki_gen import metrics
+
+log = logging.getLogger(__name__)
+
+_done = object()
+
+# returned by upload_page for pages it did not upload as they are unchanged
+# or were edited by someone else, counted apart from items without a page
+UNCHANGED = "unchanged"
+CONFLICT = "conflict"
+
+
+def error_type(error) -> str:
+    """
+    API error code or exception class name, the label failures are counted by
+    """
+    if error is None:
+        return "unknown"
+    return getattr(error, "code", None) or type(error).__name__
+
+
+class RenderFailure:
+    """
+    returned by page factories for items whose page failed to render, None
+    stays the result for items that intentionally get no page
+    """
+    __slots__ = ("label", "error")
+
+    def __init__(self, label, error):
+        self.label = label
+        self.error = error
+
+    def __repr__(self):
+        return f"RenderFailure({self.label!r}, {self.error!r})"
+
+
+def was_uploaded(outcome) -> bool:
+    """
+    whether the return value of upload_page means the page was uploaded
+    """
+    return outcome is not False and outcome not in (UNCHANGED, CONFLICT)
+
+
+def is_page(page) -> bool:
+    """
+    whether a page factory returned a (title, content) page
+    """
+    return page is not None and not isinstance(page, RenderFailure)
+
+
+class Failure(NamedTuple):
+    page: str
+    # "render" or "upload"
+    stage: str
+
+
+@dataclass
+class PipelineResult:
+    rendered: int = 0
+    skipped: int = 0
+    uploaded: int = 0
+    unchanged: int = 0
+    conflicts: int = 0
+    failed: list = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+        metrics.count(f"pages_{attr}_total")
+        if attr != "rendered":
+            # every outcome but rendered is the last one of its item
+            metrics.count("pages_done_total")
+
+    def fail(self, page_title, error=None, stage="upload"):
+        with self._lock:
+            self.failed.append(Failure(page_title, stage))
+        metrics.count("pages_failed_total", stage=stage, error=error_type(error))
+        metrics.count("pages_done_total")
+
+
+def render_page(make_page, item, result, finished=True):
+    """
+    render the page of `item`, counting it as rendered, skipped or failed in
+    `result`, returns the page or None. Rendered pages passed on for upload
+    are not `finished` yet.
+    """
+    try:
+        with metrics.timer("page_render_seconds"):
+            page = make_page(item)
+    except Exception as e:
+        log.exception(f"failed rendering {item}")
+        page = RenderFailure(str(item), e)
+    if page is None:
+        result.count("skipped")
+        return None
+    if isinstance(page, RenderFailure):
+        result.fail(page.label, page.error, stage="render")
+        return None
+    result.count("rendered")
+    if finished:
+        metrics.count("pages_done_total")
+    return page
+
+
+def _upload_worker(pages, upload_page, result):
+    while (page := pages.get()) is not _done:
+        page_title, page_content = page
+        try:
+            with metrics.timer("page_upload_seconds"):
+                uploaded = upload_page(page_title, page_content)
+            if uploaded is False:
+                result.count("skipped")
+            elif uploaded == UNCHANGED:
+                result.count("unchanged")
+            elif uploaded == CONFLICT:
+                result.count("conflicts")
+            else:
+                result.count("uploaded")
+        except Exception as e:
+            log.exception(f"failed uploading {page_title}")
+            result.fail(page_title, e)
+
+
+def _uploaders(pages, upload_page, result, upload_workers):
+    return [
+        threading.Thread(target=_upload_worker, args=(pages, upload_page, result),
+                         name=f"upload-{i}", daemon=True)
+        for i in range(upload_workers)
+    ]
+
+
+def stream_pages(make_page, items, upload_page, *, render_workers=1,
+                 upload_workers=4, queue_size=32) -> PipelineResult:
+    """
+    render pages from `items` with `make_page(item)` and pass them to
+    `upload_page(page_title, page_content)` while rendering continues.
+    `make_page` returns None for items that should be skipped, `upload_page`
+    returns False for pages it chose not to upload, both count as skipped.
+    Pages it did not upload as UNCHANGED or CONFLICT are counted as such,
+    pages failing to render or upload as failed.
+    """
+    result = PipelineResult()
+    pages = Queue(maxsize=queue_size)
+    items_iter = iter(metrics.planned(items))
+    items_lock = threading.Lock()
+
+    def next_item():
+        with items_lock:
+            return next(items_iter, _done)
+
+    def render_worker():
+        while (item := next_item()) is not _done:
+            page = render_page(make_page, item, result, finished=False)
+            if page is not None:
+                pages.put(page)
+
+    uploaders = _uploaders(pages, upload_page, result, upload_workers)
+    renderers = [
+        threading.Thread(target=render_worker, name=f"render-{i}", daemon=True)
+        for i in range(render_workers)
+    ]
+    for thread in uploaders + renderers:
+        thread.start()
+    for thread in renderers:
+        thread.join()
+    for _ in uploaders:
+        pages.put(_done)
+    for thread in uploaders:
+        thread.join()
+    return result
+
+
+def upload_pages(pages, upload_page, result=None, *, upload_workers=4) -> PipelineResult:
+    """
+    upload rendered `pages` with `upload_workers` threads, taking the pages
+    in order, counted into `result`
+    """
+    result = result if result is not None else PipelineResult()
+    queue = Queue()
+    for page in pages:
+        queue.put(page)
+    uploaders = _uploaders(queue, upload_page, result, upload_workers)
+    for thread in uploaders:
+        queue.put(_done)
+        thread.start()
+    for thread in uploaders:
+        thread.join()
+    return result
@@ -0,0 +1,138 @@
+"""
+Per-stage wall time and call count recording.
+
+Disabled by default. Coarse stages are marked with ``stage(key)`` which
+returns a shared no-op context manager while disabled. Hot paths (table
+lookups, reference resolution, template rendering, ``fix_tags``, uploads) are
+only wrapped by ``enable()``, so they cost nothing while profiling is off.
+"""
+import cProfile
+import threading
+from collections import defaultdict
+from contextlib import nullcontext
+from time import perf_counter
+
+from gb4_wiki_gen.patching import Patches
+
+_null_stage = nullcontext()
+_profiler = None
+
+
+class Stage:
+    __slots__ = ("profiler", "key", "start")
+
+    def __init__(self, profiler, key):
+        self.profiler = profiler
+        self.key = key
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.add(self.key, perf_counter() - self.start)
+
+
+class Profiler:
+    def __init__(self, cprofile=False):
+        self.timings = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self._lock = threading.Lock()
+        self._patches = Patches()
+
+    def add(self, key, elapsed):
+        with self._lock:
+            self.timings[key] += elapsed
+            self.counts[key] += 1
+
+    def stage(self, key):
+        return Stage(self, key)
+
+    def wrap(self, owner, attr, key_fn):
+        """
+        replace owner.attr (function or mapping item) with a timed wrapper,
+        `key_fn` receives the call arguments and returns the stage key
+        """
+        def make_wrapper(original):
+            def timed(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    self.add(key_fn(*args, **kwargs), perf_counter() - start)
+            return timed
+
+        self._patches.wrap(owner, attr, make_wrapper)
+
+    def restore(self):
+        self._patches.restore()
+
+    def summary(self):
+        lines = [f"{'stage':<60} {'calls':>9} {'total s':>10} {'mean ms':>10}"]
+        for key in sorted(self.timings):
+            total = self.timings[key]
+            count = self.counts[key]
+            lines.append(
+                f"{key:<60} {count:>9} {total:>10.4f} {total / count * 1000:>10.4f}"
+            )
+        return "\n".join(lines)
+
+
+def _instrument(profiler):
+    import jinja2
+    from gb4_wiki_gen.models import DataTable, UReference, UReferenceObjectArray
+    from gb4_wiki_gen.templates import template_env
+    from gb4_wiki_gen.wiki_client import ApiSession
+
+    def lookup_key(table, *args, **kwargs):
+        return f"lookup.{table.data['Name']}"
+
+    def resolve_key(descriptor, *args, **kwargs):
+        return f"resolve.{descriptor._data_table_key}"
+
+    def render_key(template, *args, **kwargs):
+        return f"render.{template.name}"
+
+    profiler.wrap(DataTable, "__getitem__", lookup_key)
+    profiler.wrap(DataTable, "get", lookup_key)
+    profiler.wrap(UReference, "__get__", resolve_key)
+    profiler.wrap(UReferenceObjectArray, "__get__", resolve_key)
+    profiler.wrap(jinja2.Template, "render", render_key)
+    profiler.wrap(template_env.filters, "fix_tags", lambda *args, **kwargs: "filter.fix_tags")
+    profiler.wrap(ApiSession, "edit", lambda *args, **kwargs: "upload.edit")
+
+
+def enable(cprofile=False) -> Profiler:
+    """
+    start recording, optionally also run the cProfile profiler
+    """
+    global _profiler
+    profiler = Profiler(cprofile)
+    _instrument(profiler)
+    _profiler = profiler
+    if profiler.cprofile is not None:
+        profiler.cprofile.enable()
+    return profiler
+
+
+def disable():
+    """
+    stop recording and remove hot path instrumentation, returns the profiler
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        if profiler.cprofile is not None:
+            profiler.cprofile.disable()
+        profiler.restore()
+    return profiler
+
+
+def stage(key):
+    """
+    context manager timing a stage, no-op while profiling is disabled
+    """
+    if _profiler is None:
+        return _null_stage
+    return _profiler.stage(key)
@@ -0,0 +1,74 @@
+"""
+Debug queries over a loaded registry, returning plain data shared by the
+debug commands and the preview server.
+"""
+
+
+def derives_into(registry, part_id):
+    """
+    recipes using `part_id` as source, as (id name) strings of
+    (target, source1, source2)
+    """
+    derive_table = registry["DerivedSynthesizeParameter"]
+    part_name_table = registry["localized_text_parts_name"]
+    recipes_named = []
+    for t, s1, s2 in derive_table.find_derives_into(part_id):
+        t_name = part_name_table[t]._text
+        s1_name = part_name_table[s1]._text
+        s2_name = part_name_table[s2]._text
+        recipes_named.append((
+            f"{t} {t_name}", f"{s1} {s1_name}", f"{s2} {s2_name}"
+        ))
+    return recipes_named
+
+
+def suits_grades(registry):
+    """
+    (hg, mg, sd) variant flags by suit id
+    """
+    mslist = registry["MSList"]
+    return {suit.id: mslist.grade_variants(suit) for suit in mslist}
+
+
+def suits_localized(registry):
+    """
+    main id, parts ids, name and priced gunpla box per suit, None where
+    missing
+    """
+    boxes = registry["ItemGunplaBox"]
+    validity = registry.validity
+    suits = []
+    for suit in registry["MSList"]:
+        box = boxes.find_by_suit_id(suit.id)
+        if box is not None and box.id in validity.priced_boxes:
+            box_id = box.id
+            shop_price = box.shop_item.price
+        else:
+            box_id = None
+            shop_price = None
+        if suit.id in validity.suits:
+            name = " ".join(suit.ms_name_localized._text.split())
+        else:
+            name = None
+        suits.append({
+            "id": suit.id,
+            "parts_ids": list(suit.parts_ids),
+            "name": name,
+            "box_id": box_id,
+            "shop_price": shop_price,
+        })
+    return suits
+
+
+def resolve(registry, id):
+    """
+    localized name and owning tables of an id, None for unknown ids
+    """
+    owners = registry.ids.owners(id)
+    if not owners:
+        return None
+    return {
+        "id": id,
+        "name": registry.ids.name(id),
+        "owners": [{"kind": owner.kind, "table": owner.table} for owner in owners],
+    }
@@ -0,0 +1,210 @@
+"""
+Local preview server keeping a loaded registry warm between requests.
+
+Serves rendered wikitext per page and JSON for the debug queries:
+
+    GET /suit/<suit_id>            GET /api/derives-into/<part_id>
+    GET /kit/<kit_id>              GET /api/suits-grades
+    GET /equipment/<equip_id>      GET /api/suits-localized
+    GET /series/<series_id>        GET /api/resolve/<id>
+    GET /missions                  GET /api/integrity
+                                   GET /api/find/<text>
+                                   GET /api/stats
+
+``/api/stats`` reports request count and latency per endpoint.
+"""
+import inspect
+import json
+import logging
+import threading
+from dataclasses import asdict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+from urllib.parse import quote, unquote, urlsplit
+
+from gb4_wiki_gen import queries
+from gb4_wiki_gen.generator.equip_page import collect_equipment, make_equip_page_content
+from gb4_wiki_gen.generator.kit_page import make_kit_page_content
+from gb4_wiki_gen.generator.mission_page import make_mission_rewards_page_content
+from gb4_wiki_gen.generator.series_page import make_series_page_content
+from gb4_wiki_gen.generator.suit_page import make_suit_page_content
+from gb4_wiki_gen.models import DataTableIndexError
+from gb4_wiki_gen.name_search import name_index
+
+log = logging.getLogger(__name__)
+
+
+class NotFound(Exception):
+    pass
+
+
+class LatencyCounter:
+    """
+    request count and latency per endpoint
+    """
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, elapsed, failed=False):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {
+                "requests": 0, "failed": 0, "total_ms": 0.0, "max_ms": 0.0,
+            })
+            elapsed_ms = elapsed * 1000
+            stats["requests"] += 1
+            stats["failed"] += failed
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def summary(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    **stats,
+                    "mean_ms": stats["total_ms"] / stats["requests"],
+                }
+                for endpoint, stats in sorted(self._stats.items())
+            }
+
+
+class PreviewApp:
+    """
+    endpoint handlers over a loaded registry, pages render on request, the
+    registry caches stay warm across requests
+    """
+    def __init__(self, registry, wiki_namespace="Generated"):
+        self.registry = registry
+        self.wiki_namespace = wiki_namespace
+        self.latency = LatencyCounter()
+        self.equipment = collect_equipment(registry)
+        # equipment pages are keyed by name, also accept EquipParameter ids
+        self.equipment_keys = {
+            entry["equip"].id: key for key, entry in self.equipment.items()
+        }
+        self.pages = {
+            "suit": self.suit_page,
+            "kit": self.kit_page,
+            "equipment": self.equipment_page,
+            "series": self.series_page,
+            "missions": self.missions_page,
+        }
+        self.api = {
+            "derives-into": lambda part_id: queries.derives_into(registry, part_id),
+            "suits-grades": lambda: queries.suits_grades(registry),
+            "suits-localized": lambda: queries.suits_localized(registry),
+            "resolve": self.resolve,
+            "integrity": self.integrity,
+            "find": self.find,
+            "stats": self.latency.summary,
+        }
+
+    def suit_page(self, suit_id):
+        return make_suit_page_content(self.registry, suit_id, self.wiki_namespace)
+
+    def kit_page(self, kit_id):
+        return make_kit_page_content(self.registry, kit_id, self.wiki_namespace)
+
+    def equipment_page(self, equip_id):
+        entry = self.equipment.get(self.equipment_keys.get(equip_id, equip_id))
+        if entry is None:
+            raise NotFound(f"unknown equipment {equip_id!r}")
+        return make_equip_page_content(self.registry, entry, self.wiki_namespace)
+
+    def series_page(self, series_id):
+        series_item = self.registry["localized_text_gundam_series"][series_id]
+        return make_series_page_content(series_item, self.wiki_namespace)
+
+    def missions_page(self):
+        return make_mission_rewards_page_content(self.registry, self.wiki_namespace)
+
+    def resolve(self, id):
+        resolved = queries.resolve(self.registry, id)
+        if resolved is None:
+            raise NotFound(f"unknown id {id!r}")
+        return resolved
+
+    def find(self, text):
+        return [match._asdict() for match in name_index(self.registry).search(text)]
+
+    def integrity(self):
+        validity = self.registry.validity
+        return {
+            "summary": validity.summary(),
+            "dangling": [asdict(ref) for ref in validity.dangling],
+        }
+
+    def route(self, path):
+        """
+        endpoint name, handler and arguments for a request path
+        """
+        parts = [unquote(it) for it in urlsplit(path).path.split("/") if it]
+        if parts[:1] == ["api"] and len(parts) > 1 and parts[1] in self.api:
+            endpoint, handler, args = f"api.{parts[1]}", self.api[parts[1]], parts[2:]
+        elif parts and parts[0] in self.pages:
+            endpoint, handler, args = f"page.{parts[0]}", self.pages[parts[0]], parts[1:]
+        else:
+            raise NotFound(f"no endpoint for {path!r}")
+        if len(args) != len(inspect.signature(handler).parameters):
+            raise NotFound(f"no endpoint for {path!r}")
+        return endpoint, handler, args
+
+
+def make_handler(app):
+    class PreviewHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            start = perf_counter()
+            endpoint = "unknown"
+            failed = True
+            try:
+                endpoint, handler, args = app.route(self.path)
+                result = handler(*args)
+                failed = False
+            except (NotFound, DataTableIndexError) as e:
+                self.send_json({"error": str(e)}, HTTPStatus.NOT_FOUND)
+            except Exception as e:
+                log.exception(f"failed handling {self.path}")
+                self.send_json({"error": repr(e)}, HTTPStatus.INTERNAL_SERVER_ERROR)
+            else:
+                if endpoint.startswith("page."):
+                    self.send_page(*result)
+                else:
+                    self.send_json(result)
+            finally:
+                app.latency.add(endpoint, perf_counter() - start, failed)
+
+        def send_page(self, page_title, page_content):
+            body = page_content.encode("utf8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("X-Page-Title", quote(page_title))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_json(self, data, status=HTTPStatus.OK):
+            body = json.dumps(data, indent=2, ensure_ascii=False).encode("utf8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            log.debug(f"{self.address_string()} {format % args}")
+
+    return PreviewHandler
+
+
+def serve(registry, host="127.0.0.1", port=8000, wiki_namespace="Generated"):
+    app = PreviewApp(registry, wiki_namespace)
+    server = ThreadingHTTPServer((host, port), make_handler(app))
+    log.info(f"serving previews on http://{host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return app
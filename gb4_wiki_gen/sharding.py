@@ -0,0 +1,125 @@
+"""
+Deterministic sharding of page generation.
+
+Every page key is assigned to one of N shards by a stable hash, so N
+processes or hosts started with ``--shard 1/N`` ... ``--shard N/N`` render and
+upload disjoint slices without coordinating. Each shard can write a manifest
+of its results, ``merge_manifests`` combines them into one report.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+import click
+
+
+def stable_hash(key: str) -> int:
+    """
+    hash of a page key that is the same across processes and hosts, unlike
+    ``hash()`` which is salted per process
+    """
+    return int.from_bytes(
+        hashlib.blake2b(key.encode("utf8"), digest_size=8).digest(), "big"
+    )
+
+
+class Shard(NamedTuple):
+    # 1-based, as passed on the command line
+    index: int
+    count: int
+
+    def __str__(self):
+        return f"{self.index}/{self.count}"
+
+    def contains(self, key) -> bool:
+        return stable_hash(str(key)) % self.count == self.index - 1
+
+    def select(self, items, key=lambda item: item):
+        return [item for item in items if self.contains(key(item))]
+
+
+class ShardType(click.ParamType):
+    name = "shard"
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, Shard):
+            return value
+        try:
+            index, count = (int(it) for it in value.split("/"))
+        except ValueError:
+            self.fail(f"expected i/N, got {value!r}", param, ctx)
+        if not 1 <= index <= count:
+            self.fail(f"shard index must be within 1..{count}, got {index}", param, ctx)
+        return Shard(index, count)
+
+
+def write_manifest(path, shard, command, report):
+    """
+    write the results of one shard, `report` maps page types to
+    (PipelineResult, seconds)
+    """
+    manifest = {
+        "shard": str(shard) if shard is not None else "1/1",
+        "command": command,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "page_types": {
+            page_type: {
+                "rendered": result.rendered,
+                "skipped": result.skipped,
+                "uploaded": result.uploaded,
+                "unchanged": result.unchanged,
+                "conflicts": result.conflicts,
+                "failed": [failure._asdict() for failure in result.failed],
+                "seconds": seconds,
+            }
+            for page_type, (result, seconds) in report.items()
+        },
+    }
+    with open(path, "w", encoding="utf8") as fp:
+        json.dump(manifest, fp, indent=2)
+
+
+def merge_manifests(manifests):
+    """
+    combine shard manifests, counts are summed and render and upload
+    failures collected per page type, `seconds` is the sum over shards and
+    `wall_seconds` the slowest shard, raises ValueError for malformed
+    manifests or different shard counts
+    """
+    merged = {"shards": [], "missing_shards": [], "duplicate_shards": [], "page_types": {}}
+    counts = set()
+    for manifest in manifests:
+        try:
+            _, count = (int(it) for it in manifest["shard"].split("/"))
+        except (KeyError, AttributeError, ValueError):
+            raise ValueError(f"invalid shard {manifest.get('shard')!r}") from None
+        counts.add(count)
+        if manifest["shard"] in merged["shards"]:
+            merged["duplicate_shards"].append(manifest["shard"])
+        merged["shards"].append(manifest["shard"])
+        try:
+            for page_type, stats in manifest["page_types"].items():
+                total = merged["page_types"].setdefault(page_type, {
+                    "rendered": 0, "skipped": 0, "uploaded": 0, "unchanged": 0,
+                    "conflicts": 0, "failed": [],
+                    "seconds": 0.0, "wall_seconds": 0.0,
+                })
+                for attr in ("rendered", "skipped", "uploaded", "unchanged", "conflicts"):
+                    total[attr] += stats[attr]
+                total["failed"].extend(stats["failed"])
+                total["seconds"] += stats["seconds"]
+                total["wall_seconds"] = max(total["wall_seconds"], stats["seconds"])
+        except KeyError as e:
+            raise ValueError(f"malformed manifest of shard {manifest['shard']}: "
+                             f"missing {e}") from None
+
+    if len(counts) > 1:
+        raise ValueError(f"manifests of different shard counts: {sorted(counts)}")
+    if counts:
+        count = counts.pop()
+        merged["missing_shards"] = [
+            f"{index}/{count}" for index in range(1, count + 1)
+            if f"{index}/{count}" not in merged["shards"]
+        ]
+    return merged
@@ -0,0 +1,119 @@
+"""
+Reverse index from skill id to the parts, equipment, suits and kits that
+grant the skill.
+
+``skill_array_data`` only resolves from a part or equipment to its skills,
+the index is built in one pass over the raw rows so lookups in the other
+direction do not scan every ``PartsParameter`` and ``EquipParameter`` row.
+"""
+from typing import NamedTuple
+
+from gb4_wiki_gen.integrity import SUIT_EQUIP_FIELDS, SUIT_PART_FIELDS
+from gb4_wiki_gen.utils import slugify
+
+
+class SkillCarriers(NamedTuple):
+    parts: list
+    equipment: list
+    suits: list
+    kits: list
+
+
+_no_carriers = SkillCarriers([], [], [], [])
+
+
+class SkillIndex:
+    def __init__(self, registry):
+        self._skills_by_item = {}
+        self._carriers = {}
+        self.init_items(registry)
+        self.init_suits(registry)
+        self.init_kits(registry)
+
+    def _carriers_for(self, skill_id) -> SkillCarriers:
+        carriers = self._carriers.get(skill_id)
+        if carriers is None:
+            carriers = self._carriers[skill_id] = SkillCarriers([], [], [], [])
+        return carriers
+
+    def init_items(self, registry):
+        for table_name, attr in (("PartsParameter", "parts"), ("EquipParameter", "equipment")):
+            for item_id, row in registry[table_name].rows.items():
+                skill_ids = list(dict.fromkeys(it["_SkillId"] for it in row["_SkillArray"]))
+                self._skills_by_item[item_id] = skill_ids
+                for skill_id in skill_ids:
+                    getattr(self._carriers_for(skill_id), attr).append(item_id)
+
+    def skills_of_items(self, item_ids):
+        skill_ids = {}
+        for item_id in item_ids:
+            for skill_id in self._skills_by_item.get(item_id, ()):
+                skill_ids[skill_id] = None
+        return skill_ids
+
+    def init_suits(self, registry):
+        for suit_id, row in registry["MSList"].rows.items():
+            item_ids = [row[it] for it in SUIT_PART_FIELDS + SUIT_EQUIP_FIELDS]
+            for skill_id in self.skills_of_items(item_ids):
+                self._carriers_for(skill_id).suits.append(suit_id)
+
+    def init_kits(self, registry):
+        for box_id, row in registry["ItemGunplaBox"].rows.items():
+            for skill_id in self.skills_of_items(row["_ItemArray"]):
+                self._carriers_for(skill_id).kits.append(box_id)
+
+    def __contains__(self, skill_id):
+        return skill_id in self._carriers
+
+    def __iter__(self):
+        return iter(self._carriers)
+
+    def __len__(self):
+        return len(self._carriers)
+
+    def carriers(self, skill_id) -> SkillCarriers:
+        return self._carriers.get(skill_id, _no_carriers)
+
+    def skills(self, item_id) -> list:
+        """
+        skill ids of a part or equipment
+        """
+        return self._skills_by_item.get(item_id, [])
+
+
+class SkillTitles:
+    """
+    page title slugs of the valid skills in the skill index, skills sharing
+    a name share a title and page
+    """
+    def __init__(self, registry):
+        skills_table = registry["SkillIdInfo"]
+        skills = [
+            skills_table[skill_id]
+            for skill_id in registry.skill_index
+            if skill_id in registry.validity.skills
+        ]
+        skills.sort(key=lambda skill: (skill.ability_cartridge_category, skill.ui_name_localized))
+        # ordered by ability cartridge category and name
+        self.skill_ids = [skill.id for skill in skills]
+        self._titles = {}
+        self._skill_ids_by_title = {}
+        for skill in skills:
+            title = slugify(skill.ui_name_localized)
+            self._titles[skill.id] = title
+            self._skill_ids_by_title.setdefault(title, []).append(skill.id)
+
+    def __iter__(self):
+        return iter(self._skill_ids_by_title)
+
+    def title(self, skill_id):
+        return self._titles.get(skill_id)
+
+    def skill_ids_of(self, title) -> list:
+        return self._skill_ids_by_title.get(title, [])
+
+    def page_ids(self) -> list:
+        """
+        first skill id of each title, in page order
+        """
+        return [skill_ids[0] for skill_ids in self._skill_ids_by_title.values()]
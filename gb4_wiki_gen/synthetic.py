@@ -0,0 +1,466 @@
+"""
+Generate synthetic, referentially consistent GB4 exports.
+
+The generated directory has the same layout and JSON structure as the FModel
+output listed in ``database.data_sources``, row counts scale linearly with
+``scale``. Data is deterministic for a given ``scale`` and ``seed``.
+"""
+import json
+import random
+from pathlib import Path
+
+from gb4_wiki_gen.database import data_sources
+
+# row counts at scale 1, roughly the size of the real exports
+BASE_COUNTS = {
+    "suits": 260,
+    "series": 40,
+    "equipment": 420,
+    "skills": 1300,
+    "missions": 120,
+    "filler": 200,
+}
+
+GRADE_VARIANT_RATE = {"MG": 0.12, "SD": 0.10}
+SHARED_PART_RATE = 0.12
+MISSING_NAME_RATE = 0.03
+MISSING_SKILL_TEXT_RATE = 0.02
+BOX_RATE = 0.85
+SHOP_GOODS_RATE = 0.92
+DERIVE_RATE = 0.55
+
+PART_SLOTS = (
+    ("_head", "Head"),
+    ("_body", "Body"),
+    ("_armR", "ArmR"),
+    ("_armL", "ArmL"),
+    ("_leg", "Leg"),
+    ("_backpack", "Backpack"),
+)
+
+EQUIP_CATEGORIES = (
+    "RIFLE", "MACHINE_GUN", "BAZOOKA", "SABER", "AXE", "LANCE", "SHIELD",
+    "DUAL_SABER", "BLADE", "HAMMER",
+)
+
+PART_SKILL_CATEGORIES = (
+    "EX_MELEE", "EX_SHOOT", "EX_SUPPORT", "OP_ATTACK", "OP_DEFENSE",
+    "OP_SUPPORT", "ORIGINAL",
+)
+
+EQUIP_SKILL_CATEGORIES = (
+    "NML_MELEE", "NML_SHOOT", "EX_MELEE", "EX_SHOOT", "OP_ATTACK",
+    "OP_SUPPORT", "ORIGINAL",
+)
+
+NAME_WORDS = (
+    "Gundam", "Zaku", "Gouf", "Dom", "Gelgoog", "Astray", "Strike", "Freedom",
+    "Justice", "Exia", "Dynames", "Kyrios", "Virtue", "Barbatos", "Lupus",
+    "Rex", "Aerial", "Calibarn", "Unicorn", "Banshee", "Sinanju", "Nu",
+    "Sazabi", "Hyaku", "Shiki", "Zeta", "Mk-II", "Wing", "Deathscythe",
+    "Heavyarms", "Sandrock", "Altron", "Epyon", "Tallgeese", "Turn",
+    "Destiny", "Impulse", "Infinite", "Legend", "Providence", "Red", "Blue",
+    "Frame", "Custom", "Kai", "Zero", "Full", "Armor", "Type", "Commander",
+)
+
+
+def _name(rng, words=2):
+    return " ".join(rng.choice(NAME_WORDS) for _ in range(words))
+
+
+def _table(name, rows):
+    return [{
+        "Type": "DataTable",
+        "Name": name,
+        "Class": "UScriptClass'DataTable'",
+        "Properties": {
+            "RowStruct": {
+                "ObjectName": f"Class'{name}Data'",
+                "ObjectPath": f"/Script/GB4/{name}Data",
+            }
+        },
+        "Rows": rows,
+    }]
+
+
+def _text(value):
+    return {"_text": value}
+
+
+def _skill_array(skill_ids):
+    return [
+        {"_SkillId": skill_id, "_Level": 1, "_IsHidden": False}
+        for skill_id in skill_ids
+    ]
+
+
+def _muzzle_array(rng, count):
+    return [
+        {
+            "_MuzzleName": f"muzzle_{i:02d}",
+            "_Location": {
+                "X": rng.uniform(-50, 50),
+                "Y": rng.uniform(-50, 50),
+                "Z": rng.uniform(-50, 50),
+            },
+            "_Rotation": {
+                "Pitch": rng.uniform(-180, 180),
+                "Yaw": rng.uniform(-180, 180),
+                "Roll": rng.uniform(-180, 180),
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def _parts_animation(rng):
+    return {
+        f"_Anim{i:02d}": {
+            "_AssetPathName": f"/Game/GB4/Anim/Parts/A_{rng.randrange(10**8):08d}",
+            "_SubPathString": "",
+            "_BlendTime": rng.random(),
+        }
+        for i in range(rng.randrange(2, 8))
+    }
+
+
+def _rotation(rng):
+    return {
+        "Pitch": rng.uniform(-180, 180),
+        "Yaw": rng.uniform(-180, 180),
+        "Roll": rng.uniform(-180, 180),
+    }
+
+
+class SyntheticExport:
+    def __init__(self, scale=1, seed=0):
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.tables = {}
+        self.counts = {
+            key: max(1, int(count * scale))
+            for key, count in BASE_COUNTS.items()
+        }
+
+    def build(self):
+        self.make_series()
+        self.make_skills()
+        self.make_equipment()
+        self.make_suits()
+        self.make_boxes()
+        self.make_derives()
+        self.make_missions()
+        self.make_filler()
+        return self.tables
+
+    def make_series(self):
+        rng = self.rng
+        self.series_ids = [
+            f"GUNDAM_SERIES_{i:04d}" for i in range(self.counts["series"])
+        ]
+        self.tables["localized_text_gundam_series"] = {
+            series_id: _text(f"Mobile Suit {_name(rng)} {i}")
+            for i, series_id in enumerate(self.series_ids)
+        }
+
+    def make_skills(self):
+        rng = self.rng
+        skill_rows = {}
+        skill_names = {}
+        skill_infos = {}
+        self.part_skill_ids = []
+        self.equip_skill_ids = []
+        for i in range(self.counts["skills"]):
+            skill_id = f"SKILL_{i:06d}"
+            text_id = f"SKILL_TEXT_{i:06d}"
+            if i % 2:
+                category = rng.choice(PART_SKILL_CATEGORIES)
+                self.part_skill_ids.append(skill_id)
+            else:
+                category = rng.choice(EQUIP_SKILL_CATEGORIES)
+                self.equip_skill_ids.append(skill_id)
+            skill_rows[skill_id] = {
+                "_UiInfoArray": [{"_TextId": text_id, "_Level": 1}],
+                "_SkillRange": rng.randrange(0, 3000),
+                "_SkillPower": rng.randrange(0, 500),
+                "_SkillPermissionRank": rng.randrange(0, 5),
+                "_SkillPermissionFlagArray": [],
+                "_IsEnemyDisable": False,
+                "_AiCoolTime": rng.random() * 10,
+                "_AbilityCartridgeCategory": f"EAbilityCartridgeCategory::{category}",
+                "_AttackDataIdForParameterDisplay": "None",
+                "_HyperTranceId": "None",
+            }
+            if rng.random() < MISSING_SKILL_TEXT_RATE:
+                continue
+            skill_names[text_id] = _text(f"{_name(rng, 1)} {category.title()} {i}")
+            skill_infos[text_id] = _text(
+                f"Increases <Blue>{_name(rng, 1)}</> by {rng.randrange(1, 50)}%."
+                f"<SkillInfoIcon_{rng.randrange(5)}>"
+            )
+        self.tables["SkillIdInfo"] = skill_rows
+        self.tables["localized_text_skill_name"] = skill_names
+        self.tables["localized_text_skill_info"] = skill_infos
+
+    def make_equipment(self):
+        rng = self.rng
+        rows = {}
+        weapon_names = {}
+        shield_names = {}
+        self.equip_ids = []
+        for i in range(self.counts["equipment"]):
+            category = rng.choice(EQUIP_CATEGORIES)
+            names = shield_names if category == "SHIELD" else weapon_names
+            base_id = f"EQ_{category}_{i:06d}"
+            name = f"{_name(rng)} {category.replace('_', ' ').title()} {i}"
+            variants = [base_id]
+            if rng.random() < 0.1:
+                variants.append(f"{base_id}L")
+            for equip_id in variants:
+                self.equip_ids.append(equip_id)
+                names[equip_id] = _text(name)
+                rows[equip_id] = self.make_equip_row(equip_id, category)
+        self.tables["EquipParameter"] = rows
+        self.tables["localized_text_weapon_name"] = weapon_names
+        self.tables["localized_text_shield_name"] = shield_names
+
+    def make_equip_row(self, equip_id, category):
+        rng = self.rng
+        skills = rng.sample(self.equip_skill_ids, rng.randrange(1, 6))
+        return {
+            "_PartsName": equip_id,
+            "_PartsCategory": f"MS_EQUIP_CATEGORY::{category}",
+            "_EquipType": f"EEquipType::{category}",
+            "_InnerFlag": False,
+            "_InnerPartsArray": [],
+            "_ModelIdArmRight": f"WP_{rng.randrange(10**6):06d}_R",
+            "_ModelIdArmLeft": f"WP_{rng.randrange(10**6):06d}_L",
+            "_SubModelIdArmRight": "None",
+            "_SubModelIdArmLeft": "None",
+            "_MirrorTypeArmRight": "EMirrorType::NONE",
+            "_MirrorTypeArmLeft": "EMirrorType::MIRROR_X",
+            "_AttachPositionArmRight": _rotation(rng),
+            "_AttachPositionArmLeft": _rotation(rng),
+            "_AttachRotationArmRight": _rotation(rng),
+            "_AttachRotationArmLeft": _rotation(rng),
+            "_RootLocatorName": "root",
+            "_MotionType": f"EMotionType::{category}",
+            "_SkillArray": _skill_array(skills),
+            "_MuzzleArray": _muzzle_array(rng, rng.randrange(0, 4)),
+            "_SkillPartsInfoArray": [],
+            "_PartsAnimation": _parts_animation(rng),
+            "_HiddenInfo": {"_IsHidden": False, "_HiddenFlag": "None"},
+            "_AbilityArray": [],
+            "_Other": {"_GundamSeriesName": rng.choice(self.series_ids)},
+        }
+
+    def make_part_row(self, part_id, group_name, series_id):
+        rng = self.rng
+        skills = rng.sample(self.part_skill_ids, rng.randrange(0, 5))
+        return {
+            "_PartsName": part_id,
+            "_PartsCategory": f"MS_PARTS_CATEGORY::{group_name.upper()}",
+            "_InnerPartsArray": [],
+            "_EquipAttachTypeName": "None",
+            "_ModelId": f"MS_{rng.randrange(10**6):06d}",
+            "_FormMotionType": "EFormMotionType::HUMAN",
+            "_MoveMotionType": "EMoveMotionType::NORMAL",
+            "_MotionPriority": rng.randrange(0, 10),
+            "_IsMotionFixed": False,
+            "_SkillArray": _skill_array(skills),
+            "_MuzzleArray": _muzzle_array(rng, rng.randrange(0, 6)),
+            "_SkillPartsInfoArray": [],
+            "_PartsAnimation": _parts_animation(rng),
+            "_HiddenInfo": {"_IsHidden": False, "_HiddenFlag": "None"},
+            "_AbilityArray": [
+                {"_AbilityId": f"ABILITY_{rng.randrange(10**4):04d}", "_Value": rng.random()}
+                for _ in range(rng.randrange(0, 4))
+            ],
+            "_Other": {
+                "_GundamSeriesName": series_id,
+                "_PerformanceGroupName": f"{group_name}Parts",
+            },
+        }
+
+    def make_suits(self):
+        rng = self.rng
+        suits = {}
+        parts = {}
+        part_names = {}
+        suit_names = {}
+        ms_numbers = {}
+        self.suit_ids = []
+        self.suit_series = {}
+        self.suit_equip = {}
+        previous = None
+        for i in range(self.counts["suits"]):
+            series_id = rng.choice(self.series_ids)
+            name = f"{_name(rng)} {i}"
+            number = f"{rng.choice('RXMGZ')}{rng.choice('XSM')}-{i:04d}"
+            grades = ["HG"] + [
+                grade for grade, rate in GRADE_VARIANT_RATE.items()
+                if rng.random() < rate
+            ]
+            equip = rng.sample(self.equip_ids, rng.randrange(0, 4))
+            shared = previous is not None and rng.random() < SHARED_PART_RATE
+            for grade in grades:
+                suit_id = f"{grade}_{i:06d}0"
+                row = {}
+                for slot, (field, group_name) in enumerate(PART_SLOTS, 1):
+                    part_id = f"{grade}_{i:06d}{slot}"
+                    if shared and grade == "HG" and field in ("_armL", "_backpack"):
+                        row[field] = suits[previous][field]
+                        continue
+                    row[field] = part_id
+                    parts[part_id] = self.make_part_row(part_id, group_name, series_id)
+                    part_names[part_id] = _text(f"{name} {group_name}")
+                for slot in range(8):
+                    row[f"_equip{slot}"] = equip[slot] if slot < len(equip) else "None"
+                suits[suit_id] = row
+                self.suit_ids.append(suit_id)
+                self.suit_series[suit_id] = series_id
+                self.suit_equip[suit_id] = equip
+                ms_numbers[suit_id] = _text(number)
+                if rng.random() >= MISSING_NAME_RATE:
+                    suit_names[suit_id] = _text(name)
+            previous = f"HG_{i:06d}0"
+        self.tables["MSList"] = suits
+        self.tables["PartsParameter"] = parts
+        self.tables["localized_text_parts_name"] = part_names
+        self.tables["localized_text_preset_character_name"] = suit_names
+        self.tables["localized_text_ms_number"] = ms_numbers
+        self.tables["PartsIdList"] = {
+            part_id: {"_PartsId": part_id, "_SortId": i}
+            for i, part_id in enumerate(parts)
+        }
+
+    def make_boxes(self):
+        rng = self.rng
+        suits = self.tables["MSList"]
+        boxes = {}
+        goods = {}
+        for i, suit_id in enumerate(self.suit_ids):
+            if rng.random() >= BOX_RATE:
+                continue
+            box_id = f"GunplaBox_{suit_id}"
+            goods_id = f"ShopGoods_{i:06d}"
+            suit = suits[suit_id]
+            boxes[box_id] = {
+                "_ItemId": goods_id,
+                "_BoxArtId": f"{suit_id}_",
+                "_GundamSeriesName": self.suit_series[suit_id],
+                "_ItemArray": [
+                    suit[field] for field, _ in PART_SLOTS
+                ] + self.suit_equip[suit_id],
+            }
+            if rng.random() < SHOP_GOODS_RATE:
+                goods[goods_id] = {
+                    "_Price": rng.randrange(5, 200) * 100,
+                    "_Category": "EShopCategory::GUNPLA",
+                    "_ReleaseFlag": "None",
+                }
+        self.tables["ItemGunplaBox"] = boxes
+        self.tables["ShopGoodsTable"] = goods
+
+    def make_derives(self):
+        rng = self.rng
+        suit_names = self.tables["localized_text_preset_character_name"]
+        hg_suit_ids = [
+            it for it in self.suit_ids
+            if it.startswith("HG_") and it in suit_names
+        ]
+        rows = {}
+        for suit_id in hg_suit_ids:
+            if rng.random() >= DERIVE_RATE:
+                continue
+            rows[suit_id] = {
+                "_TargetPartsId": suit_id,
+                "_SynthesizeRecipeArray": [
+                    {
+                        "_SrcPartsId1": rng.choice(hg_suit_ids),
+                        "_SrcPartsId2": rng.choice(hg_suit_ids),
+                    }
+                    for _ in range(rng.randrange(1, 3))
+                ],
+            }
+        self.tables["DerivedSynthesizeParameter"] = rows
+
+    def make_missions(self):
+        rng = self.rng
+        reward_ids = (
+            self.suit_ids
+            + list(self.tables["PartsParameter"])
+            + self.equip_ids
+        )
+        rewards = {}
+        missions = {}
+        story_names = {}
+        for i in range(self.counts["missions"]):
+            mission_key = f"MissionReward_{i:05d}"
+            story_names[f"TextId_{i:05d}"] = _text(f"Mission {_name(rng, 3)}")
+            missions[f"Mission_{i:05d}"] = {
+                "_OperationMissionId": f"Operation_{i // 10:04d}",
+                "_MissionComments": f"Defeat {_name(rng)}",
+            }
+            for grade in "ABCDS":
+                rewards[f"{mission_key}_{grade}"] = {
+                    "_RewardItemInfoArray": [
+                        {"_RewardItemId": rng.choice(reward_ids), "_Num": 1}
+                        for _ in range(rng.randrange(1, 5))
+                    ]
+                }
+        self.tables["MissionRewardTable"] = rewards
+        self.tables["MissionListTable"] = missions
+        self.tables["localized_text_story_title_name"] = story_names
+
+    def make_filler(self):
+        rng = self.rng
+        count = self.counts["filler"]
+        cartridge_ids = [f"CARTRIDGE_{i:05d}" for i in range(count)]
+        self.tables["localized_text_ability_cartridge_name"] = {
+            it: _text(_name(rng)) for it in cartridge_ids
+        }
+        self.tables["localized_text_ability_cartridge_info"] = {
+            it: _text(f"{_name(rng, 4)}.") for it in cartridge_ids
+        }
+        self.tables["localized_text_bparts_name"] = {
+            f"BPARTS_{i:05d}": _text(f"{_name(rng)} Builder Part") for i in range(count)
+        }
+        self.tables["AbilityCartridge"] = {
+            it: {"_SkillId": rng.choice(self.part_skill_ids), "_Rarity": rng.randrange(5)}
+            for it in cartridge_ids
+        }
+        self.tables["AbilityInfo"] = {
+            f"ABILITY_{i:04d}": {"_Value": rng.random(), "_Type": "EAbilityType::ARMOR"}
+            for i in range(count)
+        }
+        self.tables["AbilityPerformance"] = {
+            f"ABILITY_{i:04d}": {"_Performance": [rng.random() for _ in range(8)]}
+            for i in range(count)
+        }
+        self.tables["EquipAttachParameter"] = {
+            f"ATTACH_{i:04d}": {"_Position": _rotation(rng), "_Rotation": _rotation(rng)}
+            for i in range(count)
+        }
+        self.tables["EquipPerformance"] = {
+            equip_id: {"_Performance": [rng.random() for _ in range(8)]}
+            for equip_id in self.equip_ids
+        }
+
+
+def generate(dir_path, scale=1, seed=0):
+    """
+    write a synthetic export for all ``data_sources`` into dir_path,
+    returns row counts per table
+    """
+    tables = SyntheticExport(scale, seed).build()
+    counts = {}
+    for path in data_sources:
+        name = Path(path).stem
+        rows = tables[name]
+        target = Path(dir_path) / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "w", encoding="utf8") as fp:
+            json.dump(_table(name, rows), fp, indent=2)
+        counts[name] = len(rows)
+    return counts
@@ -1,7 +1,10 @@
+import hashlib
+import json
 import re
 from itertools import zip_longest
 
 import jinja2
+from gb4_wiki_gen.cache import MemoCache
 from gb4_wiki_gen.utils import slugify
 
 
@@ -39,4 +42,74 @@ template_env.filters["fix_tags"] = fix_tags
 def tabulate(value):
     return zip_longest(*value, fillvalue=None)
 
-template_env.filters["tabulate"] = tabulate
\ No newline at end of file
+template_env.filters["tabulate"] = tabulate
+
+# rendered fragments by hash of template source and inputs, identical skill
+# tables on suit, kit and equipment pages are rendered once
+fragment_cache = MemoCache("fragments")
+# keys rendered or reused in this run, only those are persisted
+_used_fragments = set()
+# long running processes (watch, preview-server) start over from this size,
+# a full build of the real export uses a few thousand
+MAX_FRAGMENTS = 50_000
+
+
+def _source_hash(template):
+    source_hash = getattr(template, "fragment_source_hash", None)
+    if source_hash is None:
+        source, _, _ = template_env.loader.get_source(template_env, template.name)
+        source_hash = hashlib.blake2b(source.encode("utf8"), digest_size=16).hexdigest()
+        # templates reloaded after a change are new objects without the hash
+        template.fragment_source_hash = source_hash
+    return source_hash
+
+
+def fragment(name, **context):
+    """
+    render ``fragments/<name>.jinja2`` with `context`, cached by content
+    """
+    template = template_env.get_template(f"fragments/{name}.jinja2")
+    inputs = json.dumps(context, sort_keys=True, ensure_ascii=False, default=repr)
+    key = hashlib.blake2b(
+        f"{_source_hash(template)}:{inputs}".encode("utf8"), digest_size=16
+    ).hexdigest()
+    if len(fragment_cache) >= MAX_FRAGMENTS:
+        reset_fragments()
+    _used_fragments.add(key)
+    return fragment_cache.get_or_compute(key, lambda: template.render(**context))
+
+
+def reset_fragments():
+    """
+    drop all cached fragments, eg. before rebuilding pages from changed data
+    """
+    fragment_cache.clear()
+    _used_fragments.clear()
+
+
+template_env.globals["fragment"] = fragment
+
+
+def load_fragments(path):
+    """
+    preload fragments persisted by ``save_fragments``, returns their count
+    """
+    try:
+        with open(path, "r", encoding="utf8") as fp:
+            fragments = json.load(fp)
+    except FileNotFoundError:
+        return 0
+    fragment_cache.preload(fragments.items())
+    return len(fragments)
+
+
+def save_fragments(path):
+    """
+    persist the fragments used in this run, stale ones are dropped
+    """
+    fragments = {
+        key: value for key, value in fragment_cache.items()
+        if key in _used_fragments
+    }
+    with open(path, "w", encoding="utf8") as fp:
+        json.dump(fragments, fp, ensure_ascii=False)
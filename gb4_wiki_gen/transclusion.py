@@ -0,0 +1,223 @@
+"""
+Transclusion edges between generated pages and purging stale dependents.
+
+Suit pages transclude kit, equipment and other suit pages, kit pages
+transclude suit pages. MediaWiki refreshes the pages transcluding an edited
+page through its job queue, which can lag far behind a bulk upload.
+``TransclusionGraph`` records the ``{{...}}`` transclusions of every rendered
+page and of the part other pages transclude, pages are uploaded with
+transcluded pages first and ``UploadLog`` records when each upload started
+and finished. Afterwards only dependents that were not saved after all pages
+they show are purged with ``action=purge&forcelinkupdate``, in batches of
+``PURGE_BATCH`` titles.
+"""
+import logging
+import re
+import threading
+
+from gb4_wiki_gen import metrics
+from gb4_wiki_gen.pipeline import was_uploaded
+
+log = logging.getLogger(__name__)
+
+# titles per action=purge request, the API limit for users without apihighlimits
+PURGE_BATCH = 50
+
+# "{{Title|..." and "{{ Title }}", not "{{{parameter}}}" or "{{#parserfunction:"
+_transclusion = re.compile(r"(?<!\{)\{\{(?!\{)\s*([^{}|#<>\[\]\n]+?)\s*(?=\||\}\})")
+_noinclude = re.compile(r"<noinclude>.*?(?:</noinclude>|$)", re.S)
+_onlyinclude = re.compile(r"<onlyinclude>(.*?)</onlyinclude>", re.S)
+
+
+def title_key(title) -> str:
+    """
+    title as MediaWiki stores it, underscores and an upper case first letter
+    """
+    title = title.strip().replace(" ", "_")
+    return title[:1].upper() + title[1:]
+
+
+def transclusions(content) -> set:
+    """
+    titles transcluded by `content`, names without namespace are templates
+    """
+    titles = set()
+    for name in _transclusion.findall(content):
+        if name.startswith(":"):
+            # {{:Title}} transcludes a page of the main namespace
+            titles.add(title_key(name[1:]))
+        elif ":" in name:
+            titles.add(title_key(name))
+        else:
+            titles.add(f"Template:{title_key(name)}")
+    return titles
+
+
+def included_text(content) -> str:
+    """
+    the part of `content` other pages get when transcluding it
+    """
+    parts = _onlyinclude.findall(content)
+    if parts:
+        content = "".join(parts)
+    return _noinclude.sub("", content)
+
+
+class TransclusionGraph:
+    """
+    pages transcluded by each page, all of them as shown on the page and
+    those in the part other pages transclude, for the generated pages this is
+    empty as their transclusions are all in <noinclude>
+    """
+    def __init__(self):
+        self.transcludes = {}
+        self.transcluded_by = {}
+        self.includes = {}
+        self.included_by = {}
+
+    def _set_edges(self, page_title, targets, edges, reverse):
+        for target in edges.pop(page_title, ()):
+            reverse[target].discard(page_title)
+        targets.discard(page_title)
+        edges[page_title] = targets
+        for target in targets:
+            reverse.setdefault(target, set()).add(page_title)
+
+    def add(self, page_title, page_content):
+        """
+        record the transclusions of a page, replacing those recorded before
+        """
+        page_title = title_key(page_title)
+        self._set_edges(page_title, transclusions(page_content),
+                        self.transcludes, self.transcluded_by)
+        self._set_edges(page_title, transclusions(included_text(page_content)),
+                        self.includes, self.included_by)
+
+    def __contains__(self, page_title):
+        return title_key(page_title) in self.transcludes
+
+    def _reachable(self, titles, edges) -> set:
+        seen = set()
+        stack = [title_key(it) for it in titles]
+        while stack:
+            for title in edges.get(stack.pop(), ()):
+                if title not in seen:
+                    seen.add(title)
+                    stack.append(title)
+        return seen
+
+    def dependents(self, titles) -> set:
+        """
+        pages showing any of `titles`, transcluded directly or through the
+        included part of other pages
+        """
+        titles = {title_key(it) for it in titles}
+        changed = titles | self._reachable(titles, self.included_by)
+        return {
+            page for title in changed for page in self.transcluded_by.get(title, ())
+        }
+
+    def dependencies(self, page_title) -> set:
+        """
+        pages shown on `page_title`, the inverse of ``dependents``
+        """
+        direct = self.transcludes.get(title_key(page_title), set())
+        return direct | self._reachable(direct, self.includes)
+
+    def order(self, pages) -> list:
+        """
+        (title, content) `pages` with transcluded pages before the pages
+        transcluding them, pages in cycles keep their relative order
+        """
+        by_key = {title_key(page[0]): page for page in pages}
+        waiting = {
+            key: {it for it in self.transcludes.get(key, ()) if it in by_key} - {key}
+            for key in by_key
+        }
+        ordered = []
+        while waiting:
+            ready = [key for key, targets in waiting.items() if not targets]
+            if not ready:
+                # break a cycle at the first page still waiting
+                ready = [next(iter(waiting))]
+            for key in ready:
+                del waiting[key]
+                ordered.append(by_key[key])
+            done = set(ready)
+            for targets in waiting.values():
+                targets -= done
+        return ordered
+
+
+class UploadLog:
+    """
+    order in which uploads started and finished, to tell which dependents
+    were saved after the pages they transclude
+    """
+    def __init__(self):
+        self.started = {}
+        self.finished = {}
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def _tick(self):
+        with self._lock:
+            self._clock += 1
+            return self._clock
+
+    def wrap(self, upload_page):
+        """
+        `upload_page` recording its uploads, pages it did not upload are not
+        recorded
+        """
+        def upload(page_title, page_content):
+            started = self._tick()
+            uploaded = upload_page(page_title, page_content)
+            if was_uploaded(uploaded):
+                key = title_key(page_title)
+                self.started[key] = started
+                self.finished[key] = self._tick()
+            return uploaded
+        return upload
+
+    def is_fresh(self, page_title, dependencies) -> bool:
+        """
+        whether `page_title` was saved after every uploaded page among its
+        `dependencies` was saved
+        """
+        started = self.started.get(title_key(page_title))
+        if started is None:
+            return False
+        return all(
+            started > self.finished[it] for it in dependencies if it in self.finished
+        )
+
+
+def stale_dependents(graph, upload_log) -> list:
+    """
+    pages transcluding uploaded pages that were not saved after them
+    """
+    stale = [
+        title for title in graph.dependents(upload_log.finished)
+        if not upload_log.is_fresh(title, graph.dependencies(title))
+    ]
+    return sorted(stale)
+
+
+def purge_pages(client, titles) -> int:
+    """
+    purge `titles` with forcelinkupdate in batches, returns the number of
+    pages purged
+    """
+    purged = 0
+    titles = list(titles)
+    for start in range(0, len(titles), PURGE_BATCH):
+        batch = titles[start:start + PURGE_BATCH]
+        for page in client.purge(batch):
+            if page.get("purged"):
+                purged += 1
+            else:
+                log.warning(f"not purged: {page.get('title')}")
+        metrics.count("pages_purged_total", len(batch))
+        log.debug(f"purged {min(start + PURGE_BATCH, len(titles))}/{len(titles)} pages")
+    return purged
@@ -0,0 +1,198 @@
+"""
+Watch mode: keep the registry loaded, poll the export and the templates for
+changes and regenerate only the pages affected by them.
+
+Pages are written as wikitext files below the output directory, one file per
+page title, namespaces become directories.
+"""
+import json
+import logging
+import time
+from pathlib import Path
+
+from gb4_wiki_gen.database import data_sources, load_data, reload_tables
+from gb4_wiki_gen.dependencies import DependencyTracker, changed_equipment_entries, \
+    implicit_reads, index_changes, row_changes, skill_index_changes, skill_title_changes, \
+    validity_changes
+from gb4_wiki_gen.pages import plan_pages_by_key
+from gb4_wiki_gen.pipeline import is_page
+from gb4_wiki_gen.templates import reset_fragments
+
+log = logging.getLogger(__name__)
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+
+# page types rendered from a template, other templates (shared fragments)
+# affect every one of them
+template_page_types = {
+    "suit_page.jinja2": "suit",
+    "kit_page.jinja2": "kit",
+    "equip_page.jinja2": "equipment",
+    "skill_page.jinja2": "skills",
+}
+
+
+def _mtimes(paths):
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtimes[path] = None
+    return mtimes
+
+
+class WatchSession:
+    def __init__(self, dir_path, output_dir, wiki_namespace="Generated",
+                 registry=None, echo=None):
+        self.dir_path = Path(dir_path)
+        self.output_dir = Path(output_dir)
+        self.wiki_namespace = wiki_namespace
+        self.registry = registry if registry is not None else load_data(dir_path)
+        self.echo = echo
+        self.tracker = DependencyTracker()
+        self.planned = {}
+        self.titles = {}
+        self._source_paths = {
+            self.dir_path / path: path for path in data_sources
+        }
+        self._source_mtimes = _mtimes(self._source_paths)
+        self._template_mtimes = _mtimes(TEMPLATES_DIR.rglob("*.jinja2"))
+        # sources that failed to load, retried with the next change
+        self._failed_sources = set()
+
+    def plan(self):
+        return plan_pages_by_key(self.registry, self.wiki_namespace)
+
+    def page_path(self, page_title):
+        return self.output_dir / f"{page_title.replace(':', '/')}.wiki"
+
+    def render(self, keys):
+        rendered = 0
+        for key in keys:
+            make_page, item = self.planned[key]
+            with self.tracker.track(key, implicit_reads(self.registry, key, item)):
+                page = make_page(item)
+            if not is_page(page):
+                self.remove(key)
+                continue
+            page_title, page_content = page
+            old_title = self.titles.get(key)
+            if old_title is not None and old_title != page_title:
+                self.page_path(old_title).unlink(missing_ok=True)
+            self.titles[key] = page_title
+            path = self.page_path(page_title)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(page_content, encoding="utf8")
+            if self.echo is not None:
+                self.echo(f"== {page_title} ==\n{page_content}")
+            rendered += 1
+        return rendered
+
+    def remove(self, key):
+        title = self.titles.pop(key, None)
+        if title is not None:
+            self.page_path(title).unlink(missing_ok=True)
+
+    def build(self):
+        start = time.perf_counter()
+        self.planned = self.plan()
+        rendered = self.render(list(self.planned))
+        log.info(f"initial build: {rendered} pages written to {self.output_dir} "
+                 f"in {time.perf_counter() - start:.2f}s")
+
+    def poll(self):
+        """
+        changed source paths (relative to the export) and template names
+        """
+        source_mtimes = _mtimes(self._source_paths)
+        sources = [
+            self._source_paths[path] for path, mtime in source_mtimes.items()
+            if mtime != self._source_mtimes[path]
+        ]
+        template_mtimes = _mtimes(TEMPLATES_DIR.rglob("*.jinja2"))
+        templates = [
+            path.relative_to(TEMPLATES_DIR).as_posix()
+            for path, mtime in template_mtimes.items()
+            if mtime != self._template_mtimes.get(path)
+        ]
+        self._source_mtimes = source_mtimes
+        self._template_mtimes = template_mtimes
+        return sources, templates
+
+    def update(self, sources, templates):
+        start = time.perf_counter()
+        registry = self.registry
+        changed = set()
+        if sources:
+            old_tables = dict(registry)
+            old_validity = registry.validity
+            old_ids = registry.ids
+            old_skill_index = registry.skill_index
+            old_skill_titles = registry.skill_titles
+            try:
+                names = reload_tables(registry, self.dir_path, sources)
+            except Exception:
+                # keep the previous tables until the export loads again
+                registry.update(old_tables)
+                registry.validity, registry.ids = old_validity, old_ids
+                registry.skill_index = old_skill_index
+                registry.skill_titles = old_skill_titles
+                raise
+            for name in names:
+                old_table, new_table = old_tables[name], registry[name]
+                changed |= row_changes(name, old_table.rows, new_table.rows)
+                changed |= index_changes(old_table.index_snapshot(),
+                                         new_table.index_snapshot())
+            changed |= validity_changes(old_validity, registry.validity)
+            changed |= skill_index_changes(old_skill_index, registry.skill_index)
+            changed |= skill_title_changes(old_skill_titles, registry.skill_titles)
+
+        old_planned = self.planned
+        self.planned = self.plan()
+        keys = self.tracker.affected(changed)
+        keys.update(self.planned.keys() - old_planned.keys())
+        keys.update(changed_equipment_entries(old_planned, self.planned))
+        page_types = set()
+        for name in templates:
+            if name in template_page_types:
+                page_types.add(template_page_types[name])
+            else:
+                page_types.update(template_page_types.values())
+        keys.update(key for key in self.planned if key[0] in page_types)
+
+        for key in old_planned.keys() - self.planned.keys():
+            self.tracker.forget(key)
+            self.remove(key)
+        # fragments of the previous data would only pile up
+        reset_fragments()
+        rendered = self.render(sorted(key for key in keys if key in self.planned))
+        log.info(f"{len(changed)} changed rows and index entries, "
+                 f"{rendered} pages regenerated, "
+                 f"{len(old_planned.keys() - self.planned.keys())} removed "
+                 f"in {time.perf_counter() - start:.2f}s")
+
+    def run(self, interval=1.0):
+        self.tracker.install()
+        try:
+            self.build()
+            log.info(f"watching {self.dir_path} and {TEMPLATES_DIR}")
+            while True:
+                time.sleep(interval)
+                sources, templates = self.poll()
+                if not sources and not templates:
+                    continue
+                log.info(f"changed: {', '.join(sources + templates)}")
+                sources = sorted(self._failed_sources.union(sources))
+                try:
+                    self.update(sources, templates)
+                    self._failed_sources.clear()
+                except json.JSONDecodeError as e:
+                    # the exporter may still be writing
+                    log.warning(f"skipping update, incomplete export file: {e}")
+                    self._failed_sources.update(sources)
+                except Exception:
+                    log.exception("skipping update, failed loading changed tables")
+                    self._failed_sources.update(sources)
+        finally:
+            self.tracker.uninstall()
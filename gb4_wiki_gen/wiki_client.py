@@ -1,8 +1,46 @@
+import logging
+import time
 import requests
+from pathlib import Path
 from urllib.parse import urljoin
 
+from gb4_wiki_gen import metrics
+
+log = logging.getLogger(__name__)
+
+# API error codes and HTTP statuses worth repeating the request for
+RETRY_ERROR_CODES = {"maxlag", "ratelimited", "readonly", "internal_api_error_DBQueryError"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ApiError(Exception):
+    """
+    error response of the API, with its code for metrics and retries
+    """
+    def __init__(self, error):
+        super().__init__(f"{error.get('code')}: {error.get('info')}")
+        self.code = error.get("code")
+
+
+def retry_reason(response):
+    """
+    reason to retry the request of `response`, None when it should not be
+    """
+    if response.status_code in RETRY_STATUSES:
+        return f"http_{response.status_code}"
+    if response.status_code != 200:
+        return None
+    try:
+        code = response.json().get("error", {}).get("code")
+    except ValueError:
+        return None
+    return code if code in RETRY_ERROR_CODES else None
+
 
 class ApiSession(requests.Session):
+    max_retries = 3
+    retry_delay = 5.0
+
     def __init__(self, base_url=None):
         super().__init__()
         self.base_url = base_url
@@ -93,14 +131,142 @@ class ApiSession(requests.Session):
         response_data = response.json()
         return response_data["query"]["tokens"]["csrftoken"]
 
+    def query(self, params):
+        """
+        run action=query with `params`, following continuation, yields every
+        response
+        """
+        request_data = {
+            "action": "query",
+            "format": "json",
+            "formatversion": 2,
+            **params,
+        }
+        while True:
+            response = self.get("api.php", params=request_data)
+            response.raise_for_status()
+            response_data = response.json()
+            if "error" in response_data:
+                raise Exception(f"query failed: {response_data['error']}")
+            if "query" in response_data:
+                yield response_data
+            if "continue" not in response_data:
+                break
+            request_data = {**request_data, **response_data["continue"]}
+
+    def namespaces(self) -> dict:
+        """
+        namespace ids by canonical and local name
+        """
+        response_data = next(self.query({"meta": "siteinfo", "siprop": "namespaces"}))
+        namespaces = {}
+        for namespace in response_data["query"]["namespaces"].values():
+            namespaces[namespace["name"]] = namespace["id"]
+            if namespace.get("canonical"):
+                namespaces[namespace["canonical"]] = namespace["id"]
+        return namespaces
+
+    def post_retrying(self, action, request_data, **kwargs):
+        """
+        post `request_data`, retrying after rate limits, replication lag and
+        temporary server errors up to `max_retries` times, waiting as long as
+        Retry-After asks or doubling the wait from `retry_delay` seconds
+        """
+        for attempt in range(self.max_retries + 1):
+            response = self.post("api.php", data=request_data, **kwargs)
+            reason = retry_reason(response)
+            if reason is None or attempt == self.max_retries:
+                return response
+            metrics.count("api_retries_total", action=action, reason=reason)
+            delay = response.headers.get("Retry-After", "")
+            delay = float(delay) if delay.isdigit() else self.retry_delay * 2 ** attempt
+            log.warning(f"{action} failed with {reason}, retrying in {delay:g}s")
+            time.sleep(delay)
+
     def edit(self, csrf_token, title, text, summary="Page edit via API"):
         request_data = {
             "action": "edit",
+            "format": "json",
             "token": csrf_token,
             "title": title,
             "text": text,
             "summary": summary
         }
-        response = self.post("api.php", data=request_data)
+        response = self.post_retrying("edit", request_data)
+        response.raise_for_status()
+        response_data = response.json()
+        if "error" in response_data:
+            raise ApiError(response_data["error"])
+        return response
+
+    def import_xml(self, csrf_token, path, summary="Page import via API",
+                   interwiki_prefix="gb4_wiki_gen"):
+        """
+        upload an XML dump with action=import, the account needs the
+        `importupload` right
+        """
+        request_data = {
+            "action": "import",
+            "format": "json",
+            "token": csrf_token,
+            "summary": summary,
+            "interwikiprefix": interwiki_prefix,
+            "assignknownusers": 1,
+        }
+        with open(path, "rb") as fp:
+            response = self.post(
+                "api.php",
+                data=request_data,
+                files={"xml": (Path(path).name, fp)},
+            )
         response.raise_for_status()
-        return response
\ No newline at end of file
+        response_data = response.json()
+        if "error" in response_data:
+            raise Exception(f"import failed: {response_data['error']}")
+        return response_data["import"]
+
+    def upload(self, csrf_token, filename, path, comment="File upload via API",
+               text=None):
+        """
+        upload the file at `path` as `filename`, replacing the current version
+        of an existing file, `text` is the description page of new files
+        """
+        request_data = {
+            "action": "upload",
+            "format": "json",
+            "token": csrf_token,
+            "filename": filename,
+            "comment": comment,
+            "ignorewarnings": 1,
+        }
+        if text is not None:
+            request_data["text"] = text
+        # read into memory so retries send the file again
+        content = Path(path).read_bytes()
+        response = self.post_retrying(
+            "upload", request_data, files={"file": (Path(path).name, content)})
+        response.raise_for_status()
+        response_data = response.json()
+        if "error" in response_data:
+            raise ApiError(response_data["error"])
+        return response_data["upload"]
+
+    def purge(self, titles, forcelinkupdate=True):
+        """
+        purge the parser cache of `titles`, with `forcelinkupdate` also
+        updating their links tables, returns the purge result of each page
+        """
+        request_data = {
+            "action": "purge",
+            "format": "json",
+            "formatversion": 2,
+            "titles": "|".join(titles),
+        }
+        if forcelinkupdate:
+            request_data["forcelinkupdate"] = 1
+        response = self.post_retrying("purge", request_data)
+        response.raise_for_status()
+        response_data = response.json()
+        if "error" in response_data:
+            raise ApiError(response_data["error"])
+        return response_data["purge"]